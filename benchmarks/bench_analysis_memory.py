@@ -0,0 +1,62 @@
+"""
+Analysis Memory Benchmark
+Peak and retained memory per analyze_image call, by visualization mode
+
+Usage:
+    python benchmarks/bench_analysis_memory.py --display-size 480
+"""
+
+import argparse
+import io
+import os
+import sys
+import tracemalloc
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.disease_detection_service import DiseaseDetectionService
+from utils.synthetic_leaves import generate_synthetic_leaf
+
+MODES = {
+    # Equivalent of the old always-on, full-size visualization
+    'eager_full': lambda f, size: _render(DiseaseDetectionService.analyze_image(f), None),
+    'lazy_display': lambda f, size: _render(DiseaseDetectionService.analyze_image(f), size),
+    'lazy_unused': lambda f, size: DiseaseDetectionService.analyze_image(f),
+    'no_visualize': lambda f, size: DiseaseDetectionService.analyze_image(f, visualize=False)
+}
+
+
+def _render(result, max_side):
+    result['visualization'].render(max_side=max_side)
+    return result
+
+
+def measure(mode, payload, display_size):
+    """Return (peak MB, retained MB) for one analysis"""
+    tracemalloc.start()
+    result = MODES[mode](io.BytesIO(payload), display_size)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak / 1e6, retained / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--display-size', type=int, default=480)
+    args = parser.parse_args()
+
+    image, _ = generate_synthetic_leaf(size=(1600, 1200), green=0.6, yellow=0.2, brown=0.05, spot_count=20)
+    payload = cv2.imencode('.png', image)[1].tobytes()
+
+    print(f"{'mode':<14} {'peak MB':>8} {'retained MB':>12}")
+    for mode in MODES:
+        measure(mode, payload, args.display_size)  # warm imports/caches
+        peak, retained = measure(mode, payload, args.display_size)
+        print(f"{mode:<14} {peak:>8.2f} {retained:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Disease Classifier Backend Benchmark
+Per-image latency and batched throughput on CPU, rule-based vs GBM
+
+Usage:
+    python benchmarks/bench_disease_backends.py --images 64 --batch-sizes 1 8 32
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.disease_classifier import get_backend
+from utils.synthetic_leaves import generate_corpus
+
+
+def bench_backend(name, images, batch_sizes, repeats=3):
+    """Time one backend over the corpus for each batch size"""
+    t0 = time.perf_counter()
+    backend = get_backend(name, wait=True)
+    backend.warmup()
+    load_s = time.perf_counter() - t0
+
+    rows = []
+    for batch_size in batch_sizes:
+        latencies = []
+        for _ in range(repeats):
+            for start in range(0, len(images), batch_size):
+                batch = images[start:start + batch_size]
+                t = time.perf_counter()
+                backend.predict_batch(batch)
+                latencies.append((time.perf_counter() - t) / len(batch))
+
+        per_image_ms = np.array(latencies) * 1000
+        rows.append({
+            'backend': name,
+            'batch_size': batch_size,
+            'p50_ms': np.percentile(per_image_ms, 50),
+            'p95_ms': np.percentile(per_image_ms, 95),
+            'throughput': 1000 / per_image_ms.mean()
+        })
+
+    return load_s, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=64)
+    parser.add_argument('--size', type=int, default=640)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--backends', nargs='+', default=['rule', 'gbm'])
+    args = parser.parse_args()
+
+    images = [s['image'] for s in generate_corpus(args.images, sizes=((args.size, args.size),), seed=1)]
+
+    print(f"{args.images} images @ {args.size}x{args.size}, CPU only")
+    print(f"{'backend':<8} {'batch':>5} {'p50 ms':>8} {'p95 ms':>8} {'img/s':>8}")
+    for name in args.backends:
+        load_s, rows = bench_backend(name, images, args.batch_sizes)
+        for row in rows:
+            print(f"{row['backend']:<8} {row['batch_size']:>5} {row['p50_ms']:>8.2f} "
+                  f"{row['p95_ms']:>8.2f} {row['throughput']:>8.1f}")
+        print(f"{name:<8} load+warmup: {load_s:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
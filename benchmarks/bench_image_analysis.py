@@ -0,0 +1,196 @@
+"""
+Image Analysis Benchmark Suite
+Per-stage timing, peak memory and ground-truth accuracy on a synthetic leaf corpus
+
+Usage:
+    python benchmarks/bench_image_analysis.py --images 30 --sizes 320 640 1280
+    python benchmarks/bench_image_analysis.py --json bench_output.json
+    python benchmarks/bench_image_analysis.py --baseline bench_output.json
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.image_processing import (
+    process_uploaded_image,
+    analyze_leaf_color,
+    detect_spots,
+    calculate_texture_score,
+    create_visualization
+)
+from utils.synthetic_leaves import generate_corpus
+
+STAGES = [
+    'process_uploaded_image',
+    'analyze_leaf_color',
+    'detect_spots',
+    'calculate_texture_score',
+    'create_visualization'
+]
+
+# Ground-truth fields checked for correctness
+TRUTH_FIELDS = [
+    'green_percentage',
+    'yellow_percentage',
+    'brown_percentage',
+    'spot_density_percentage'
+]
+
+# A stage is flagged when its p50 is this much slower than the baseline
+REGRESSION_TOLERANCE = 0.20
+
+
+def _timed(func, *args, **kwargs):
+    """
+    Run func once, return (result, seconds, peak bytes)
+
+    Peak memory covers numpy/OpenCV arrays traced by tracemalloc;
+    PIL's internal decode buffers are not included.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run_sample(image, truth):
+    """Time every stage for one image and compare with ground truth"""
+    timings = {}
+    peaks = {}
+
+    payload = io.BytesIO(cv2.imencode('.png', image)[1].tobytes())
+    _, timings['process_uploaded_image'], peaks['process_uploaded_image'] = _timed(
+        process_uploaded_image, payload
+    )
+
+    color, timings['analyze_leaf_color'], peaks['analyze_leaf_color'] = _timed(analyze_leaf_color, image)
+    spots, timings['detect_spots'], peaks['detect_spots'] = _timed(detect_spots, image)
+    _, timings['calculate_texture_score'], peaks['calculate_texture_score'] = _timed(
+        calculate_texture_score, image
+    )
+    _, timings['create_visualization'], peaks['create_visualization'] = _timed(
+        create_visualization, image, color, spots
+    )
+
+    measured = {
+        'green_percentage': color['green_percentage'],
+        'yellow_percentage': color['yellow_percentage'],
+        'brown_percentage': color['brown_percentage'],
+        'spot_density_percentage': spots['spot_density_percentage']
+    }
+    errors = {field: abs(measured[field] - truth[field]) for field in TRUTH_FIELDS}
+    errors['spot_count_exact'] = float(spots['spot_count'] == truth['spot_count'])
+
+    return timings, peaks, errors
+
+
+def run_suite(n_images, sizes, seed=42):
+    """
+    Run the full suite
+
+    Returns:
+        dict keyed by "WxH" with per-stage stats and accuracy
+    """
+    report = {}
+
+    for size in sizes:
+        timings = {stage: [] for stage in STAGES}
+        peaks = {stage: [] for stage in STAGES}
+        errors = {field: [] for field in TRUTH_FIELDS + ['spot_count_exact']}
+
+        for sample in generate_corpus(n_images, sizes=(size,), seed=seed):
+            t, p, e = run_sample(sample['image'], sample['truth'])
+            for stage in STAGES:
+                timings[stage].append(t[stage] * 1000)
+                peaks[stage].append(p[stage] / 1e6)
+            for field, value in e.items():
+                errors[field].append(value)
+
+        stages = {}
+        for stage in STAGES:
+            ms = np.array(timings[stage])
+            stages[stage] = {
+                'p50_ms': round(float(np.percentile(ms, 50)), 3),
+                'p95_ms': round(float(np.percentile(ms, 95)), 3),
+                'p99_ms': round(float(np.percentile(ms, 99)), 3),
+                'peak_mb': round(float(np.max(peaks[stage])), 2)
+            }
+
+        accuracy = {f"{field}_max_abs_err": round(float(np.max(errors[field])), 3) for field in TRUTH_FIELDS}
+        accuracy['spot_count_exact_rate'] = round(float(np.mean(errors['spot_count_exact'])), 3)
+
+        report[f"{size[0]}x{size[1]}"] = {'stages': stages, 'accuracy': accuracy}
+
+    return report
+
+
+def compare_with_baseline(report, baseline):
+    """List stages whose p50 regressed beyond REGRESSION_TOLERANCE"""
+    regressions = []
+    for size_key, data in report.items():
+        base = baseline.get(size_key)
+        if not base:
+            continue
+        for stage, stats in data['stages'].items():
+            base_p50 = base['stages'].get(stage, {}).get('p50_ms')
+            if base_p50 and stats['p50_ms'] > base_p50 * (1 + REGRESSION_TOLERANCE):
+                regressions.append(
+                    f"{size_key} {stage}: {base_p50:.2f} ms -> {stats['p50_ms']:.2f} ms"
+                )
+    return regressions
+
+
+def print_report(report):
+    for size_key, data in report.items():
+        print(f"\n=== {size_key} ===")
+        print(f"{'stage':<26} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'peak MB':>8}")
+        for stage, stats in data['stages'].items():
+            print(f"{stage:<26} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} "
+                  f"{stats['p99_ms']:>8.2f} {stats['peak_mb']:>8.2f}")
+        print("accuracy vs ground truth:")
+        for key, value in data['accuracy'].items():
+            print(f"  {key:<40} {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=30, help="Images per resolution")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[320, 640, 1280], help="Square image sizes")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help="Write the report to this JSON file")
+    parser.add_argument('--baseline', help="Compare p50 timings with a previous JSON report")
+    args = parser.parse_args()
+
+    report = run_suite(args.images, [(s, s) for s in args.sizes], seed=args.seed)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare_with_baseline(report, json.load(f))
+        if regressions:
+            print("\nREGRESSIONS:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Monte Carlo Benchmark
+Chunked simulation throughput, peak memory and seeded reproducibility across process counts
+
+Usage:
+    python benchmarks/bench_monte_carlo.py --draws 1000000 --processes 4
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.monte_carlo_service import MonteCarloService
+
+
+def timed_run(args, processes, trace=False):
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = MonteCarloService.simulate(
+        args.scenario,
+        n_draws=args.draws,
+        seed=args.seed,
+        chunk_size=args.chunk,
+        processes=processes
+    )
+    elapsed = time.perf_counter() - start
+    peak_mb = None
+    if trace:
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+    return result, elapsed, peak_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', default='Kimia_Terbuka')
+    parser.add_argument('--draws', type=int, default=MonteCarloService.MAX_DRAWS)
+    parser.add_argument('--chunk', type=int, default=MonteCarloService.DEFAULT_CHUNK)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    single, single_s, peak_mb = timed_run(args, 1, trace=True)
+    multi, multi_s, _ = timed_run(args, args.processes)
+
+    profit = single['percentiles']['profit']
+    print(f"scenario:          {single['scenario']}")
+    print(f"draws:             {single['n_draws']} (chunk {args.chunk})")
+    print(f"1 process:         {single_s * 1000:.0f} ms, peak {peak_mb:.1f} MB")
+    print(f"{args.processes} processes:       {multi_s * 1000:.0f} ms")
+    print(f"profit P5/P50/P95: {profit[5]:,.0f} / {profit[50]:,.0f} / {profit[95]:,.0f}")
+    print(f"prob. loss:        {single['prob_loss']:.2%}")
+    print(f"VaR95 / CVaR95:    {single['var_95']:,.0f} / {single['cvar_95']:,.0f}")
+
+    if single != multi:
+        print("REPRODUCIBILITY FAILED: results differ between process counts")
+        sys.exit(1)
+    print("reproducible across process counts")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Portfolio Optimizer Benchmark
+MILP and branch-and-bound vs brute force on small cases, then solve time for large portfolios
+
+Usage:
+    python benchmarks/bench_portfolio_optimizer.py --cases 50 --sizes 100 300 1000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.portfolio_optimizer_service import PortfolioOptimizerService
+
+
+def random_parcels(rng, n):
+    return [
+        {
+            'nama': f"Lahan {i + 1}",
+            'luas_ha': float(rng.uniform(0.2, 3.0)),
+            'yield_factor': float(rng.uniform(0.6, 1.2)),
+            'greenhouse_ok': bool(rng.random() < 0.5)
+        }
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', type=int, default=50, help='Random small cases checked against brute force')
+    parser.add_argument('--max-small', type=int, default=6, help='Max parcels in a small case')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 300, 1000], help='Large portfolio sizes')
+    parser.add_argument('--objective', default='risk_adjusted', choices=PortfolioOptimizerService.OBJECTIVES)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    methods = ['branch_bound', 'brute_force']
+    if PortfolioOptimizerService.milp_available():
+        methods.insert(0, 'milp')
+
+    print(f"Small cases ({args.cases}, 2-{args.max_small} parcels) vs brute force")
+    times = {m: [] for m in methods}
+    mismatches = {m: 0 for m in methods}
+    for _ in range(args.cases):
+        parcels = random_parcels(rng, int(rng.integers(2, args.max_small + 1)))
+        budget = float(rng.uniform(3e7, 4e8))
+        results = {
+            m: PortfolioOptimizerService.optimize(parcels, budget, args.objective, method=m) for m in methods
+        }
+        reference = results['brute_force']['objective_value']
+        for m, result in results.items():
+            times[m].append(result['solve_ms'])
+            if abs(result['objective_value'] - reference) > 1e-6 * max(abs(reference), 1):
+                mismatches[m] += 1
+    for m in methods:
+        print(f"  {m:<13} mean {np.mean(times[m]):9.2f} ms   max {np.max(times[m]):9.2f} ms   mismatches {mismatches[m]}")
+
+    print("\nLarge portfolios (budget ~ 60% of planting everything with the cheapest option)")
+    for n in args.sizes:
+        parcels = random_parcels(rng, n)
+        options = PortfolioOptimizerService.parcel_options(parcels)
+        budget = float(0.6 * options['cost'].min(axis=1).sum() * 3)
+        line = f"  {n:>5} parcels:"
+        values = {}
+        for m in [m for m in methods if m != 'brute_force']:
+            start = time.perf_counter()
+            result = PortfolioOptimizerService.optimize(parcels, budget, args.objective, method=m)
+            values[m] = result['objective_value']
+            line += f"  {m} {(time.perf_counter() - start) * 1000:8.1f} ms ({result['status']})"
+        if len(values) == 2:
+            gap = (values['milp'] - values['branch_bound']) / abs(values['milp'])
+            line += f"  gap {gap:.2e}"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
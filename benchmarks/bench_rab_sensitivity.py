@@ -0,0 +1,75 @@
+"""
+RAB Sensitivity Benchmark
+Broadcast price x yield x area x scenario grid vs a per-cell calculate_rab loop
+
+Usage:
+    python benchmarks/bench_rab_sensitivity.py --prices 400 --yields 300 --areas 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.rab_calculator_service import RABCalculatorService
+from services.rab_sensitivity_service import RABSensitivityService
+
+
+def loop_profit(scenarios, areas, yields, prices):
+    """Reference: one calculate_rab call per (scenario, area), Python loop over yield x price"""
+    out = np.empty((len(scenarios), len(areas), len(yields), len(prices)))
+    for s, key in enumerate(scenarios):
+        for a, luas in enumerate(areas):
+            total_biaya = RABCalculatorService.calculate_rab(key, luas)['total_biaya']
+            for y, yield_ton in enumerate(yields):
+                for p, price in enumerate(prices):
+                    out[s, a, y, p] = yield_ton * 1000 * luas * price - total_biaya
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--prices', type=int, default=400, help='Price grid points')
+    parser.add_argument('--yields', type=int, default=300, help='Yield grid points')
+    parser.add_argument('--areas', type=int, default=20, help='Area grid points')
+    parser.add_argument('--loop-cells', type=int, default=200000,
+                        help='Approximate cells for the loop reference (subset of the grid)')
+    args = parser.parse_args()
+
+    prices = np.linspace(10000, 100000, args.prices)
+    yields = np.linspace(2, 30, args.yields)
+    areas = np.linspace(0.5, 10, args.areas)
+    scenarios = list(RABCalculatorService.RAB_TEMPLATES)
+    cells = len(scenarios) * len(areas) * len(yields) * len(prices)
+
+    RABCalculatorService.compile_templates()
+    start = time.perf_counter()
+    grid = RABSensitivityService.evaluate_grid(prices, yields, areas)
+    grid_s = time.perf_counter() - start
+    print(f"Grid      : {cells:>12,} cells in {grid_s * 1000:8.1f} ms  ({cells / grid_s / 1e6:,.0f} M cells/s)")
+
+    # Loop on a price subset so the reference finishes in seconds
+    step = max(1, int(np.ceil(cells / args.loop_cells)))
+    sub_prices = prices[::step]
+    sub_cells = len(scenarios) * len(areas) * len(yields) * len(sub_prices)
+    start = time.perf_counter()
+    reference = loop_profit(scenarios, areas, yields, sub_prices)
+    loop_s = time.perf_counter() - start
+    print(f"Loop      : {sub_cells:>12,} cells in {loop_s * 1000:8.1f} ms  ({sub_cells / loop_s / 1e6:,.2f} M cells/s)")
+    print(f"Speedup   : {(cells / grid_s) / (sub_cells / loop_s):,.0f}x per cell")
+
+    diff = np.abs(grid['profit'][:, :, :, ::step] - reference).max()
+    print(f"Max diff  : Rp {diff:,.4f}")
+
+    start = time.perf_counter()
+    for _ in range(100):
+        RABSensitivityService.tornado('Kimia_Terbuka', 35000, 15, 1)
+    print(f"Tornado   : {(time.perf_counter() - start) * 10:.2f} ms per call")
+
+
+if __name__ == '__main__':
+    main()
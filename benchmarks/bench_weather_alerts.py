@@ -0,0 +1,107 @@
+"""
+Weather Alert Engine Benchmark
+End-to-end alerts at 1k/10k farms from raw Open-Meteo responses: vectorized engine vs the per-location loop
+
+Both sides start from the same raw responses and are timed best-of-N:
+  loop    _parse_forecast + check_alerts per farm
+  engine  from_responses + evaluate
+For reference: check_alerts alone on already parsed dicts, and the
+engine fed from parsed dicts through to_columns.
+
+Usage:
+    python benchmarks/bench_weather_alerts.py --farms 1000 10000 --repeats 5
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.weather_alert_engine import WeatherAlertEngine
+from services.weather_service import WeatherService
+
+
+def make_responses(n_farms, days=7, seed=0):
+    """Random but plausible raw Open-Meteo forecast responses for n farms"""
+    rng = np.random.default_rng(seed)
+    dates = [(date.today() + timedelta(days=d)).isoformat() for d in range(days)]
+    responses = {}
+
+    for i in range(n_farms):
+        rain = rng.gamma(0.6, 12, days)
+        responses[f"farm_{i}"] = {
+            'current': {
+                'temperature_2m': float(rng.normal(30, 3)),
+                'relative_humidity_2m': int(rng.integers(50, 100)),
+                'precipitation': float(rng.gamma(0.5, 2)),
+                'weather_code': 3,
+                'wind_speed_10m': float(rng.gamma(3, 5)),
+                'apparent_temperature': float(rng.normal(32, 3))
+            },
+            'daily': {
+                'time': dates,
+                'temperature_2m_max': rng.normal(31, 2, days).tolist(),
+                'temperature_2m_min': rng.normal(23, 2, days).tolist(),
+                'precipitation_sum': rain.tolist(),
+                'precipitation_probability_max': rng.integers(0, 100, days).tolist(),
+                'weather_code': [3] * days,
+                'wind_speed_10m_max': rng.gamma(3, 5, days).tolist()
+            }
+        }
+
+    return responses
+
+
+def _time(func, repeats=5):
+    best = float('inf')
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--farms', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--repeats', type=int, default=5, help='Best-of-N for every timing')
+    args = parser.parse_args()
+
+    print(f"{'farms':>7} {'loop ms':>9} {'engine ms':>10} {'speedup':>8} "
+          f"{'(check ms)':>11} {'(dicts ms)':>11} {'alerts':>7} {'parity':>7}")
+    for n in args.farms:
+        responses = make_responses(n)
+
+        def loop():
+            return {
+                farm: WeatherService.check_alerts(WeatherService._parse_forecast(data, 0, 0))
+                for farm, data in responses.items()
+            }
+
+        def engine():
+            return WeatherAlertEngine.evaluate(WeatherAlertEngine.from_responses(responses))
+
+        loop_ms, loop_alerts = _time(loop, args.repeats)
+        engine_ms, result = _time(engine, args.repeats)
+
+        # References when the parsed dicts already exist
+        parsed = {farm: WeatherService._parse_forecast(data, 0, 0) for farm, data in responses.items()}
+        check_ms, _ = _time(lambda: [WeatherService.check_alerts(w) for w in parsed.values()], args.repeats)
+        dicts_ms, _ = _time(lambda: WeatherAlertEngine.evaluate(WeatherAlertEngine.to_columns(parsed)), args.repeats)
+
+        loop_types = {f: sorted(a['type'] for a in alerts) for f, alerts in loop_alerts.items() if alerts}
+        engine_types = {f: sorted(a['type'] for a in alerts) for f, alerts in result['alerts'].items()}
+        parity = 'ok' if loop_types == engine_types else 'DIFF'
+
+        print(f"{n:>7} {loop_ms:>9.1f} {engine_ms:>10.1f} {loop_ms / engine_ms:>7.1f}x "
+              f"{check_ms:>11.1f} {dicts_ms:>11.1f} {result['summary']['farms_with_alerts']:>7} {parity:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Yield Prediction Benchmark
+Vectorized predict_yield_batch vs the scalar predict_yield, with a parity check
+
+Usage:
+    python benchmarks/bench_yield_prediction.py --rows 100000 --parity-rows 5000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.analytics_service import AnalyticsService
+
+# Scalar results are rounded to 2 decimals
+PARITY_TOLERANCE = 0.006
+
+
+def make_plots(n_rows, seed=0):
+    """Random plots, with a share of values exactly on bucket boundaries"""
+    rng = np.random.default_rng(seed)
+    plots = pd.DataFrame({
+        'hst': rng.integers(0, 200, n_rows),
+        'avg_height': rng.uniform(0, 150, n_rows).round(1),
+        'avg_leaves': rng.integers(0, 100, n_rows),
+        'rainfall_mm': rng.integers(0, 2000, n_rows),
+        'fertilizer_kg': rng.integers(0, 1000, n_rows),
+        'pest_severity': rng.integers(0, 101, n_rows)
+    })
+
+    edge_rows = rng.random(n_rows) < 0.1
+    for name, (bounds, _) in AnalyticsService.YIELD_FACTOR_BUCKETS.items():
+        plots.loc[edge_rows, name] = rng.choice(bounds, edge_rows.sum())
+
+    return plots
+
+
+def check_parity(plots):
+    """Max abs difference between batch and scalar predictions"""
+    batch = AnalyticsService.predict_yield_batch(plots)
+    worst = 0.0
+    for i, row in enumerate(plots.itertuples(index=False)):
+        scalar = AnalyticsService.predict_yield(
+            row.hst, row.avg_height, row.avg_leaves, row.rainfall_mm, row.fertilizer_kg, row.pest_severity
+        )
+        for field in ('predicted_yield', 'confidence_low', 'confidence_high'):
+            worst = max(worst, abs(scalar[field] - batch[field].iat[i]))
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--parity-rows', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    plots = make_plots(args.rows, args.seed)
+
+    start = time.perf_counter()
+    AnalyticsService.predict_yield_batch(plots)
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    sample = plots.head(min(args.parity_rows, args.rows))
+    start = time.perf_counter()
+    worst = check_parity(sample)
+    scalar_ms = (time.perf_counter() - start) * 1000 / len(sample) * args.rows
+
+    print(f"rows:              {args.rows}")
+    print(f"batch:             {batch_ms:.1f} ms")
+    print(f"scalar (projected): {scalar_ms:.0f} ms")
+    print(f"parity max |diff|: {worst:.4f} over {len(sample)} rows")
+
+    if worst > PARITY_TOLERANCE:
+        print("PARITY FAILED")
+        sys.exit(1)
+    print("parity ok")
+
+
+if __name__ == '__main__':
+    main()
@@ -155,6 +155,15 @@ GROWTH_MILESTONES = {
     }
 }
 
+# Thermal time (growing degree days) for chili
+# HST ranges above hold at the reference rate; GDD thresholds are
+# derived from them so phases stay consistent with the milestones
+GDD_BASE_TEMP_C = 10
+GDD_UPPER_TEMP_C = 32
+REFERENCE_GDD_PER_DAY = 15  # ~25°C rata-rata harian (dataran menengah ±400 m)
+HARVEST_START_HST = 110
+HARVEST_END_HST = 150
+
 # Health scoring criteria
 HEALTH_CRITERIA = {
     "Sangat Sehat": {
@@ -236,6 +245,24 @@ def get_phase_for_hst(hst):
             return phase
     return "Unknown"
 
+def gdd_to_hst(gdd):
+    """Thermal-time equivalent HST (days at the reference rate)"""
+    return int(gdd // REFERENCE_GDD_PER_DAY)
+
+def get_phase_for_gdd(gdd):
+    """Get growth phase for accumulated GDD (°C·day above GDD_BASE_TEMP_C)"""
+    return get_phase_for_hst(gdd_to_hst(gdd))
+
+def get_gdd_thresholds():
+    """GDD at which each phase ends, plus harvest start/end"""
+    thresholds = {
+        phase: (data['hst_range'][1] + 1) * REFERENCE_GDD_PER_DAY
+        for phase, data in GROWTH_MILESTONES.items()
+    }
+    thresholds['Panen Pertama'] = HARVEST_START_HST * REFERENCE_GDD_PER_DAY
+    thresholds['Akhir Panen'] = HARVEST_END_HST * REFERENCE_GDD_PER_DAY
+    return thresholds
+
 def calculate_health_score(leaf_color, stem_strength, pest_severity, growth_rate):
     """
     Calculate health score based on observations
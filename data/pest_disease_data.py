@@ -360,6 +360,38 @@ CHILI_PEST_DISEASE_DATABASE = {
             },
             "favorable_conditions": "Suhu tinggi, tanah lembab",
             "peak_season": "Musim hujan"
+        },
+        {
+            "id": "phytophthora_blight",
+            "name_id": "Busuk Phytophthora",
+            "name_en": "Phytophthora Blight",
+            "scientific": "Phytophthora capsici",
+            "severity": "high",
+            "symptoms": [
+                "Busuk pangkal batang kehitaman",
+                "Layu mendadak setelah hujan",
+                "Bercak basah pada daun",
+                "Buah busuk berair"
+            ],
+            "damage_stage": ["Vegetatif", "Generatif"],
+            "control": {
+                "cultural": [
+                    "Bedengan tinggi dan drainase baik",
+                    "Hindari genangan air",
+                    "Mulsa plastik",
+                    "Cabut tanaman sakit"
+                ],
+                "biological": [
+                    "Trichoderma harzianum",
+                    "Bacillus subtilis"
+                ],
+                "chemical": [
+                    "Metalaksil + Mankozeb (2 g/L)",
+                    "Dimetomorf 50 WP (1 g/L)"
+                ]
+            },
+            "favorable_conditions": "Hujan lebat, tanah jenuh air, suhu 24-30°C",
+            "peak_season": "Musim hujan"
         }
     ]
 }
@@ -16,6 +16,7 @@ PESTICIDE_DATABASE = {
         "price_per_liter": 350000,
         "safety_class": "II (Berbahaya)",
         "application_interval": "7-10 hari",
+        "rainfast_hours": 2,
         "notes": "Efektif untuk tungau dan thrips. Jangan aplikasi saat terik matahari."
     },
     "Imidacloprid": {
@@ -29,6 +30,7 @@ PESTICIDE_DATABASE = {
         "price_per_liter": 280000,
         "safety_class": "II (Berbahaya)",
         "application_interval": "10-14 hari",
+        "rainfast_hours": 1,
         "notes": "Sistemik, diserap akar dan daun. Bagus untuk pencegahan."
     },
     "Profenofos": {
@@ -42,6 +44,7 @@ PESTICIDE_DATABASE = {
         "price_per_liter": 180000,
         "safety_class": "Ib (Sangat Berbahaya)",
         "application_interval": "7 hari",
+        "rainfast_hours": 4,
         "notes": "Efektif untuk ulat. Gunakan APD lengkap. Rotasi dengan insektisida lain."
     },
     "Deltamethrin": {
@@ -55,6 +58,7 @@ PESTICIDE_DATABASE = {
         "price_per_liter": 220000,
         "safety_class": "II (Berbahaya)",
         "application_interval": "7-10 hari",
+        "rainfast_hours": 2,
         "notes": "Spektrum luas. Cepat knockdown. Rotasi untuk hindari resistensi."
     },
     
@@ -70,6 +74,7 @@ PESTICIDE_DATABASE = {
         "price_per_kg": 85000,
         "safety_class": "III (Agak Berbahaya)",
         "application_interval": "7 hari",
+        "rainfast_hours": 6,
         "notes": "Fungisida kontak, aplikasi preventif. Kombinasi dengan fungisida sistemik."
     },
     "Klorotalonil": {
@@ -83,6 +88,7 @@ PESTICIDE_DATABASE = {
         "price_per_liter": 120000,
         "safety_class": "II (Berbahaya)",
         "application_interval": "7-10 hari",
+        "rainfast_hours": 4,
         "notes": "Protektan kuat. Aplikasi sebelum hujan. Rotasi dengan sistemik."
     },
     "Azoxystrobin": {
@@ -96,6 +102,7 @@ PESTICIDE_DATABASE = {
         "price_per_liter": 450000,
         "safety_class": "III (Agak Berbahaya)",
         "application_interval": "10-14 hari",
+        "rainfast_hours": 2,
         "notes": "Sistemik, efek kuratif dan preventif. Mahal tapi efektif."
     },
     "Metalaksil + Mankozeb": {
@@ -109,6 +116,7 @@ PESTICIDE_DATABASE = {
         "price_per_kg": 180000,
         "safety_class": "II (Berbahaya)",
         "application_interval": "10-14 hari",
+        "rainfast_hours": 2,
         "notes": "Kombinasi sistemik & kontak. Bagus untuk penyakit tanah."
     },
     
@@ -124,6 +132,7 @@ PESTICIDE_DATABASE = {
         "price_per_kg": 350000,
         "safety_class": "III (Agak Berbahaya)",
         "application_interval": "5-7 hari",
+        "rainfast_hours": 4,
         "notes": "Antibiotik. Gunakan saat gejala awal. Rotasi untuk hindari resistensi."
     },
     
@@ -139,6 +148,7 @@ PESTICIDE_DATABASE = {
         "price_per_liter": 85000,
         "safety_class": "IV (Aman)",
         "application_interval": "5-7 hari",
+        "rainfast_hours": 6,
         "notes": "Organik, aman untuk beneficial insects. Aplikasi sore hari."
     },
     "Beauveria bassiana": {
@@ -152,6 +162,7 @@ PESTICIDE_DATABASE = {
         "price_per_liter": 65000,
         "safety_class": "IV (Aman)",
         "application_interval": "7-10 hari",
+        "rainfast_hours": 8,
         "notes": "Biologis, butuh kelembaban tinggi. Aplikasi sore/malam."
     },
     "Bacillus subtilis": {
@@ -165,6 +176,7 @@ PESTICIDE_DATABASE = {
         "price_per_liter": 55000,
         "safety_class": "IV (Aman)",
         "application_interval": "7-10 hari",
+        "rainfast_hours": 4,
         "notes": "Biologis, preventif. Kombinasi dengan kompos. Aplikasi rutin."
     }
 }
@@ -296,3 +308,13 @@ def get_schedule_for_phase(phase):
 def get_rotation_recommendations():
     """Get rotation group recommendations"""
     return ROTATION_GROUPS
+
+# Jam bebas hujan minimum setelah aplikasi bila produk tidak diketahui
+DEFAULT_RAINFAST_HOURS = 6
+
+def get_rainfast_hours(name=None):
+    """Hours without rain a spray needs after application (rain-fastness)"""
+    info = PESTICIDE_DATABASE.get(name) if name else None
+    if info is None:
+        return DEFAULT_RAINFAST_HOURS
+    return info.get("rainfast_hours", DEFAULT_RAINFAST_HOURS)
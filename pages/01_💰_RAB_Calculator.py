@@ -6,6 +6,7 @@
 import streamlit as st
 import sys
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
@@ -16,6 +17,8 @@ if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
 from services.rab_calculator_service import RABCalculatorService
+from services.monte_carlo_service import MonteCarloService
+from services.portfolio_optimizer_service import PortfolioOptimizerService
 
 st.set_page_config(
     page_title="RAB Calculator - Budidaya Cabai",
@@ -728,8 +731,7 @@ with tab2:
     st.subheader("📈 Visualisasi Perbandingan")
     
     # Prepare data for charts
-    comp_raw = RABCalculatorService.compare_scenarios(luas_ha)
-    df_viz = pd.DataFrame(comp_raw)
+    df_viz = pd.DataFrame(comparisons)
     
     col1, col2 = st.columns(2)
     
@@ -772,6 +774,96 @@ with tab2:
         color_continuous_scale='Blues'
     )
     st.plotly_chart(fig3, use_container_width=True)
+    
+    # Profit vs luas lahan: semua skenario x 40 titik luas dalam satu panggilan
+    luas_grid = np.linspace(0.25, max(luas_ha * 2, 2.0), 40)
+    df_luas = RABCalculatorService.compare_scenarios_batch(luas_grid)
+    
+    fig4 = px.line(
+        df_luas,
+        x='luas_ha',
+        y='profit_avg',
+        color='scenario',
+        title='Profit Rata-rata vs Luas Lahan',
+        labels={'luas_ha': 'Luas Lahan (Ha)', 'profit_avg': 'Profit (Rp)', 'scenario': 'Skenario'}
+    )
+    fig4.add_vline(x=luas_ha, line_dash="dot", line_color="gray", annotation_text="Luas Anda")
+    st.plotly_chart(fig4, use_container_width=True)
+    
+    st.markdown("---")
+    
+    # Portfolio optimizer: skenario terbaik per petak lahan dengan modal terbatas
+    st.subheader("🧩 Optimasi Portofolio Lahan")
+    st.markdown("**Pilih skenario untuk setiap petak agar profit maksimal tanpa melebihi modal**")
+    
+    df_parcels = st.data_editor(
+        pd.DataFrame({
+            'nama': ['Petak A', 'Petak B', 'Petak C'],
+            'luas_ha': [1.0, 0.5, 2.0],
+            'yield_factor': [1.0, 0.9, 0.8],
+            'greenhouse_ok': [True, False, False]
+        }),
+        column_config={
+            "nama": st.column_config.TextColumn("Nama Petak"),
+            "luas_ha": st.column_config.NumberColumn("Luas (Ha)", min_value=0.01, format="%.2f"),
+            "yield_factor": st.column_config.NumberColumn(
+                "Faktor Yield",
+                min_value=0.1,
+                max_value=2.0,
+                format="%.2f",
+                help="Kesuburan relatif petak (1.0 = sesuai template)"
+            ),
+            "greenhouse_ok": st.column_config.CheckboxColumn("Boleh Greenhouse")
+        },
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        key="portfolio_parcels"
+    )
+    
+    col_opt1, col_opt2 = st.columns(2)
+    
+    with col_opt1:
+        modal = st.number_input("Modal Tersedia (Rp)", min_value=0, value=150000000, step=5000000)
+    
+    with col_opt2:
+        objective_label = st.radio(
+            "Tujuan Optimasi",
+            ["Profit maksimal", "Profit disesuaikan risiko"],
+            horizontal=True
+        )
+    
+    if st.button("🧩 Optimasi Portofolio"):
+        parcels = df_parcels.dropna(subset=['luas_ha'])
+        parcels = parcels[parcels['luas_ha'] > 0]
+        
+        if parcels.empty:
+            st.warning("Isi minimal satu petak lahan")
+        else:
+            portfolio = PortfolioOptimizerService.optimize(
+                parcels,
+                modal,
+                objective='profit' if objective_label == "Profit maksimal" else 'risk_adjusted'
+            )
+            
+            col_p1, col_p2, col_p3 = st.columns(3)
+            
+            with col_p1:
+                st.metric("Total Investasi", f"Rp {portfolio['total_cost']:,.0f}")
+            
+            with col_p2:
+                st.metric("Profit Rata-rata", f"Rp {portfolio['expected_profit']:,.0f}")
+            
+            with col_p3:
+                st.metric("Sisa Modal", f"Rp {portfolio['budget_left']:,.0f}")
+            
+            df_assignment = portfolio['assignment'][['nama', 'luas_ha', 'scenario', 'investasi', 'profit_avg']].copy()
+            df_assignment['investasi'] = df_assignment['investasi'].apply(lambda x: f"Rp {x:,.0f}")
+            df_assignment['profit_avg'] = df_assignment['profit_avg'].apply(lambda x: f"Rp {x:,.0f}")
+            df_assignment.columns = ['Petak', 'Luas (Ha)', 'Skenario', 'Investasi', 'Profit Rata-rata']
+            
+            st.dataframe(df_assignment, use_container_width=True, hide_index=True)
+            st.caption(f"Solusi {portfolio['status']} ({portfolio['method']}, {portfolio['solve_ms']:.0f} ms)")
 
 
 
@@ -1172,4 +1264,41 @@ with tab4:
         - Dengan harga rata-rata saat ini
         - Di bawah ini = rugi, di atas ini = untung
         """)
-
+        
+        st.markdown("---")
+        
+        # Monte Carlo risk analysis
+        st.subheader("🎲 Simulasi Monte Carlo (Risiko Profit)")
+        st.caption("Sampel acak curah hujan, serangan hama, harga jual dan potensi yield dari distribusi skenario")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            mc_draws = st.select_slider(
+                "Jumlah simulasi",
+                options=[10000, 100000, 1000000],
+                value=100000,
+                key="mc_draws"
+            )
+        with col2:
+            mc_seed = st.number_input("Seed (reproducible)", min_value=0, value=42, step=1, key="mc_seed")
+        
+        mc = MonteCarloService.simulate(scenario_key_roi, n_draws=mc_draws, luas_ha=luas_ha, seed=int(mc_seed))
+        mc_profit = mc['percentiles']['profit']
+        
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Profit Median (P50)", f"Rp {mc_profit[50]/1e6:,.1f} jt")
+        col2.metric("Profit P5 - P95", f"{mc_profit[5]/1e6:,.0f} - {mc_profit[95]/1e6:,.0f} jt")
+        col3.metric("Peluang Rugi", f"{mc['prob_loss']:.1%}")
+        col4.metric("VaR 95%", f"Rp {mc['var_95']/1e6:,.1f} jt", help="Negatif = profit minimum pada 5% kasus terburuk")
+        
+        fig_mc = go.Figure(go.Bar(
+            x=[f"P{p}" for p in mc_profit],
+            y=[v / 1e6 for v in mc_profit.values()],
+            marker_color=['#FF6B6B' if v < 0 else '#4ECDC4' for v in mc_profit.values()]
+        ))
+        fig_mc.update_layout(
+            title=f"Persentil Profit ({mc['n_draws']:,} simulasi)",
+            yaxis_title='Profit (juta Rp)',
+            showlegend=False
+        )
+        st.plotly_chart(fig_mc, use_container_width=True)
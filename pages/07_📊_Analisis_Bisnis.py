@@ -6,6 +6,7 @@ ROI, Break-even, Cashflow Analysis
 import streamlit as st
 import sys
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
@@ -16,6 +17,9 @@ if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
 from services.rab_calculator_service import RABCalculatorService
+from services.rab_sensitivity_service import RABSensitivityService
+from services.price_forecast_service import PriceForecastService
+from utils.price_simulator import COMMODITIES, MARKETS
 
 st.set_page_config(
     page_title="Analisis Bisnis Cabai",
@@ -42,7 +46,26 @@ with col1:
     luas_ha = st.number_input("Luas (Ha)", min_value=0.1, max_value=100.0, value=1.0, step=0.1)
 
 with col2:
-    harga_jual = st.number_input("Harga Jual (Rp/kg)", min_value=10000, max_value=100000, value=30000, step=1000)
+    price_market = st.selectbox(
+        "Referensi Harga Pasar",
+        [(c, m) for c in COMMODITIES for m in MARKETS],
+        format_func=lambda k: f"{COMMODITIES[k[0]]['name']} - {MARKETS[k[1]]['name']}"
+    )
+    price_stats = PriceForecastService.get_price_stats(*price_market)
+    
+    harga_jual = st.number_input(
+        "Harga Jual (Rp/kg)",
+        min_value=10000,
+        max_value=100000,
+        value=int(round(min(max(price_stats['mean_30d'], 10000), 100000), -3)),
+        step=1000,
+        help="Default: rata-rata harga 30 hari terakhir di pasar referensi"
+    )
+    st.caption(
+        f"12 bulan terakhir: Rp {price_stats['min']:,.0f} - {price_stats['max']:,.0f}/kg "
+        f"(rata-rata Rp {price_stats['mean']:,.0f}, data s/d {price_stats['last_date']:%d %b %Y})"
+        + (" - data simulasi, impor harga riil di Data Management" if price_stats['demo'] else "")
+    )
     
     yield_ton = st.number_input("Target Yield (ton/ha)", min_value=5.0, max_value=50.0, value=15.0, step=1.0)
 
@@ -51,8 +74,11 @@ with col3:
     
     bunga_pinjaman = st.number_input("Bunga Pinjaman (%/tahun)", min_value=0.0, max_value=30.0, value=12.0, step=0.5)
 
-# Calculate
+# Calculate (hasil tetap tampil saat slider sensitivitas digeser)
 if st.button("📊 Analisis", type="primary"):
+    st.session_state.analisis_bisnis = True
+
+if st.session_state.get('analisis_bisnis'):
     # Get RAB data
     rab_result = RABCalculatorService.calculate_rab(scenario, luas_ha)
     
@@ -194,25 +220,40 @@ if st.button("📊 Analisis", type="primary"):
         
         st.markdown("**Analisis Sensitivitas: Bagaimana jika harga atau yield berubah?**")
         
-        # Price sensitivity
-        price_range = [harga_jual * (1 + i/10) for i in range(-5, 6)]
-        profit_by_price = [(yield_ton * luas_ha * 1000 * p) - total_investasi for p in price_range]
+        sens_range = st.slider("Rentang Sensitivitas (±%)", min_value=10, max_value=80, value=50, step=10)
         
-        # Yield sensitivity
-        yield_range = [yield_ton * (1 + i/10) for i in range(-5, 6)]
-        profit_by_yield = [(y * luas_ha * 1000 * harga_jual) - total_investasi for y in yield_range]
+        # Satu grid harga x yield dihitung sekaligus; kurva di bawah adalah irisannya di titik dasar
+        steps = np.linspace(-sens_range / 100, sens_range / 100, 201)
+        price_range = harga_jual * (1 + steps)
+        yield_range = yield_ton * (1 + steps)
+        surface = RABSensitivityService.break_even_surface(
+            scenario, price_range, yield_range, luas_ha, total_biaya=total_investasi
+        )
+        center = len(steps) // 2
+        profit_by_price = surface['profit'][center]
+        profit_by_yield = surface['profit'][:, center]
         
         col1, col2 = st.columns(2)
         
         with col1:
             fig_price = go.Figure()
             fig_price.add_trace(go.Scatter(
-                x=[f"{p:,.0f}" for p in price_range],
+                x=price_range,
                 y=profit_by_price,
-                mode='lines+markers',
+                mode='lines',
                 name='Profit'
             ))
             fig_price.add_hline(y=0, line_dash="dash", line_color="red")
+            
+            # Historical price band (P10-P90, last 12 months) at the reference market
+            in_band = (price_range >= price_stats['p10']) & (price_range <= price_stats['p90'])
+            fig_price.add_trace(go.Scatter(
+                x=price_range,
+                y=np.where(in_band, profit_by_price, np.nan),
+                mode='lines',
+                line=dict(color='rgba(46, 204, 113, 0.35)', width=10),
+                name='Rentang harga historis (P10-P90)'
+            ))
             fig_price.update_layout(
                 title='Sensitivitas Harga',
                 xaxis_title='Harga Jual (Rp/kg)',
@@ -224,9 +265,9 @@ if st.button("📊 Analisis", type="primary"):
         with col2:
             fig_yield = go.Figure()
             fig_yield.add_trace(go.Scatter(
-                x=[f"{y:.1f}" for y in yield_range],
+                x=yield_range,
                 y=profit_by_yield,
-                mode='lines+markers',
+                mode='lines',
                 name='Profit'
             ))
             fig_yield.add_hline(y=0, line_dash="dash", line_color="red")
@@ -238,6 +279,73 @@ if st.button("📊 Analisis", type="primary"):
             )
             st.plotly_chart(fig_yield, use_container_width=True)
         
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            # Break-even surface: profit untuk setiap kombinasi harga x yield
+            visible = (surface['break_even_price'] >= price_range[0]) & (surface['break_even_price'] <= price_range[-1])
+            fig_surface = go.Figure()
+            fig_surface.add_trace(go.Heatmap(
+                x=price_range,
+                y=yield_range,
+                z=surface['profit'],
+                colorscale='RdYlGn',
+                zmid=0,
+                colorbar=dict(title='Profit (Rp)')
+            ))
+            fig_surface.add_trace(go.Scatter(
+                x=surface['break_even_price'][visible],
+                y=yield_range[visible],
+                mode='lines',
+                line=dict(color='black', dash='dash'),
+                name='Break-even'
+            ))
+            fig_surface.add_trace(go.Scatter(
+                x=[harga_jual],
+                y=[yield_ton],
+                mode='markers',
+                marker=dict(color='black', size=10, symbol='x'),
+                name='Rencana'
+            ))
+            fig_surface.update_layout(
+                title=f"Peta Profit (untung di {surface['profitable_share'] * 100:.0f}% kombinasi)",
+                xaxis_title='Harga Jual (Rp/kg)',
+                yaxis_title='Produksi (ton/ha)',
+                height=400,
+                showlegend=False
+            )
+            st.plotly_chart(fig_surface, use_container_width=True)
+        
+        with col2:
+            # Tornado: variabel mana yang paling menggeser profit
+            tornado = RABSensitivityService.tornado(scenario, harga_jual, yield_ton, luas_ha, swing=sens_range / 100)
+            df_tornado = tornado['data'].iloc[::-1]
+            fig_tornado = go.Figure()
+            fig_tornado.add_trace(go.Bar(
+                y=df_tornado['variabel'],
+                x=df_tornado['profit_low'] - tornado['base_profit'],
+                base=tornado['base_profit'],
+                orientation='h',
+                name=f"-{sens_range}%",
+                marker_color='#E74C3C'
+            ))
+            fig_tornado.add_trace(go.Bar(
+                y=df_tornado['variabel'],
+                x=df_tornado['profit_high'] - tornado['base_profit'],
+                base=tornado['base_profit'],
+                orientation='h',
+                name=f"+{sens_range}%",
+                marker_color='#2ECC71'
+            ))
+            fig_tornado.add_vline(x=tornado['base_profit'], line_color="gray")
+            fig_tornado.update_layout(
+                title=f'Tornado Chart (±{sens_range}%)',
+                xaxis_title='Profit (Rp)',
+                barmode='overlay',
+                height=400
+            )
+            st.plotly_chart(fig_tornado, use_container_width=True)
+        
         st.markdown("---")
         
         # Scenario Comparison
@@ -7,8 +7,17 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
-from datetime import datetime, timedelta
-import numpy as np
+from datetime import datetime
+import sys
+from pathlib import Path
+
+# Add parent to path
+parent_dir = str(Path(__file__).parent.parent)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from services.price_forecast_service import PriceForecastService
+from utils.price_simulator import COMMODITIES, MARKETS
 
 st.set_page_config(
     page_title="Prediksi Harga Cabai",
@@ -22,29 +31,44 @@ st.markdown("**Analisis tren harga & rekomendasi waktu jual terbaik**")
 
 st.markdown("---")
 
-# Generate simulated historical data
-def generate_price_data():
-    """Generate simulated price data for demonstration"""
-    months = pd.date_range(start='2023-01-01', end='2024-12-31', freq='M')
-    
-    # Base price with seasonal pattern
-    base_price = 35000
-    seasonal_factor = [1.4, 1.5, 1.6, 1.2, 1.0, 0.8, 0.7, 0.75, 0.9, 1.1, 1.2, 1.3]
-    
-    prices = []
-    for i, month in enumerate(months):
-        month_idx = month.month - 1
-        seasonal = seasonal_factor[month_idx]
-        noise = np.random.normal(0, 2000)
-        price = base_price * seasonal + noise
-        prices.append(max(price, 15000))  # Min price 15k
-    
+# Price history & forecast models (fitted in the background, cached per data version)
+@st.cache_resource
+def start_price_models():
+    """Load every series once per server and schedule the model fits"""
+    for commodity in COMMODITIES:
+        for market in MARKETS:
+            PriceForecastService.get_history(commodity, market)
+            PriceForecastService.fit_async(commodity, market)
+    return True
+
+start_price_models()
+
+col_sel1, col_sel2 = st.columns(2)
+with col_sel1:
+    commodity = st.selectbox(
+        "Komoditas",
+        list(COMMODITIES.keys()),
+        format_func=lambda k: COMMODITIES[k]['name']
+    )
+with col_sel2:
+    market = st.selectbox(
+        "Pasar",
+        list(MARKETS.keys()),
+        format_func=lambda k: MARKETS[k]['name']
+    )
+
+def generate_price_data(commodity, market):
+    """Monthly average prices from the stored daily history"""
+    df = PriceForecastService.get_history(commodity, market, freq='M')
     return pd.DataFrame({
-        'Tanggal': months,
-        'Harga': prices
+        'Tanggal': df['date'],
+        'Harga': df['price']
     })
 
-df_prices = generate_price_data()
+df_prices = generate_price_data(commodity, market)
+
+if PriceForecastService.is_demo(commodity, market):
+    st.info("ℹ️ Belum ada data harga riil untuk pasar ini - grafik & prediksi memakai data simulasi. Impor harga di halaman Data Management.")
 
 # Tabs
 tabs = st.tabs(["📊 Tren Harga", "🔮 Prediksi", "💡 Rekomendasi", "📅 Kalender Harga"])
@@ -59,7 +83,7 @@ with tabs[0]:
         x=df_prices['Tanggal'],
         y=df_prices['Harga'],
         mode='lines+markers',
-        name='Harga Cabai Merah',
+        name=COMMODITIES[commodity]['name'],
         line=dict(color='#FF6B6B', width=2),
         marker=dict(size=6)
     ))
@@ -76,7 +100,7 @@ with tabs[0]:
     ))
     
     fig_trend.update_layout(
-        title='Tren Harga Cabai Merah (2023-2024)',
+        title=f"Tren Harga {COMMODITIES[commodity]['name']} - {MARKETS[market]['name']}",
         xaxis_title='Bulan',
         yaxis_title='Harga (Rp/kg)',
         hovermode='x unified',
@@ -132,85 +156,98 @@ with tabs[0]:
 with tabs[1]:
     st.header("🔮 Prediksi Harga")
     
-    st.info("💡 Prediksi menggunakan metode Moving Average sederhana untuk edukasi")
-    
-    # Simple forecast using moving average
-    last_3_months = df_prices['Harga'].tail(3).mean()
-    
-    # Generate forecast for next 6 months
-    forecast_months = pd.date_range(
-        start=df_prices['Tanggal'].max() + timedelta(days=30),
-        periods=6,
-        freq='M'
-    )
-    
-    # Apply seasonal pattern
-    seasonal_factor = [1.4, 1.5, 1.6, 1.2, 1.0, 0.8]
-    forecast_prices = []
-    
-    for i, month in enumerate(forecast_months):
-        month_idx = month.month - 1
-        seasonal = seasonal_factor[month_idx % 12]
-        forecast_price = last_3_months * seasonal
-        forecast_prices.append(forecast_price)
-    
-    df_forecast = pd.DataFrame({
-        'Tanggal': forecast_months,
-        'Harga_Prediksi': forecast_prices
-    })
-    
-    # Combined chart
-    fig_forecast = go.Figure()
-    
-    # Historical
-    fig_forecast.add_trace(go.Scatter(
-        x=df_prices['Tanggal'],
-        y=df_prices['Harga'],
-        mode='lines',
-        name='Harga Historis',
-        line=dict(color='#FF6B6B', width=2)
-    ))
-    
-    # Forecast
-    fig_forecast.add_trace(go.Scatter(
-        x=df_forecast['Tanggal'],
-        y=df_forecast['Harga_Prediksi'],
-        mode='lines+markers',
-        name='Prediksi',
-        line=dict(color='#4ECDC4', width=2, dash='dash'),
-        marker=dict(size=8)
-    ))
-    
-    fig_forecast.update_layout(
-        title='Prediksi Harga 6 Bulan Ke Depan',
-        xaxis_title='Bulan',
-        yaxis_title='Harga (Rp/kg)',
-        hovermode='x unified',
-        height=500
-    )
-    
-    st.plotly_chart(fig_forecast, use_container_width=True)
-    
-    # Forecast table
-    st.subheader("📋 Detail Prediksi")
-    
-    df_forecast_display = df_forecast.copy()
-    df_forecast_display['Bulan'] = df_forecast_display['Tanggal'].dt.strftime('%B %Y')
-    df_forecast_display['Harga'] = df_forecast_display['Harga_Prediksi'].apply(lambda x: f"Rp {x:,.0f}/kg")
-    
-    st.dataframe(
-        df_forecast_display[['Bulan', 'Harga']],
-        use_container_width=True,
-        hide_index=True
-    )
-    
-    st.warning("""
-    ⚠️ **Disclaimer:**
-    - Prediksi ini adalah estimasi berdasarkan pola historis
-    - Harga aktual dapat berbeda karena faktor eksternal
-    - Gunakan sebagai referensi, bukan keputusan mutlak
-    - Selalu cek harga pasar real-time sebelum menjual
-    """)
+    horizon_weeks = st.slider("Horizon prediksi (minggu)", 4, 26, 12)
+    
+    try:
+        forecast = PriceForecastService.get_forecast(commodity, market, horizon_weeks)
+        if forecast is None:
+            with st.spinner("Melatih model prediksi..."):
+                forecast = PriceForecastService.get_forecast(commodity, market, horizon_weeks, wait=True)
+    except ValueError as e:
+        # Data impor terlalu pendek untuk dilatih (model demo tidak dipakai lagi)
+        forecast = None
+        st.warning(f"⚠️ {e}. Prediksi butuh minimal 8 minggu data harga - impor data yang lebih panjang.")
+    
+    if forecast is not None:
+        model_labels = {'prophet': 'Prophet', 'ets': 'Holt-Winters (ETS)', 'seasonal_naive': 'Seasonal Naive'}
+        st.info(f"💡 Model: **{model_labels.get(forecast['model'], forecast['model'])}** - data mingguan hingga {forecast['last_date']:%d %b %Y}, interval prediksi 90%")
+        if forecast['stale']:
+            st.caption("⏳ Data baru masuk - model sedang diperbarui di latar belakang")
+    
+        df_weekly = PriceForecastService.get_history(commodity, market, freq='W')
+        df_forecast = forecast['forecast'].rename(columns={
+            'date': 'Tanggal',
+            'forecast': 'Harga_Prediksi',
+            'lower': 'Batas_Bawah',
+            'upper': 'Batas_Atas'
+        })
+    
+        # Combined chart
+        fig_forecast = go.Figure()
+    
+        # Historical (last year, weekly)
+        df_recent = df_weekly.tail(52)
+        fig_forecast.add_trace(go.Scatter(
+            x=df_recent['date'],
+            y=df_recent['price'],
+            mode='lines',
+            name='Harga Historis',
+            line=dict(color='#FF6B6B', width=2)
+        ))
+    
+        # Prediction interval
+        fig_forecast.add_trace(go.Scatter(
+            x=list(df_forecast['Tanggal']) + list(df_forecast['Tanggal'][::-1]),
+            y=list(df_forecast['Batas_Atas']) + list(df_forecast['Batas_Bawah'][::-1]),
+            fill='toself',
+            fillcolor='rgba(78, 205, 196, 0.2)',
+            line=dict(color='rgba(0, 0, 0, 0)'),
+            name='Interval 90%'
+        ))
+    
+        # Forecast
+        fig_forecast.add_trace(go.Scatter(
+            x=df_forecast['Tanggal'],
+            y=df_forecast['Harga_Prediksi'],
+            mode='lines+markers',
+            name='Prediksi',
+            line=dict(color='#4ECDC4', width=2, dash='dash'),
+            marker=dict(size=8)
+        ))
+    
+        fig_forecast.update_layout(
+            title=f'Prediksi Harga {horizon_weeks} Minggu Ke Depan',
+            xaxis_title='Minggu',
+            yaxis_title='Harga (Rp/kg)',
+            hovermode='x unified',
+            height=500
+        )
+    
+        st.plotly_chart(fig_forecast, use_container_width=True)
+    
+        # Forecast table
+        st.subheader("📋 Detail Prediksi")
+    
+        df_forecast_display = df_forecast.copy()
+        df_forecast_display['Minggu'] = df_forecast_display['Tanggal'].dt.strftime('%d %b %Y')
+        df_forecast_display['Harga'] = df_forecast_display['Harga_Prediksi'].apply(lambda x: f"Rp {x:,.0f}/kg")
+        df_forecast_display['Rentang 90%'] = df_forecast_display.apply(
+            lambda r: f"Rp {r['Batas_Bawah']:,.0f} - {r['Batas_Atas']:,.0f}", axis=1
+        )
+    
+        st.dataframe(
+            df_forecast_display[['Minggu', 'Harga', 'Rentang 90%']],
+            use_container_width=True,
+            hide_index=True
+        )
+    
+        st.warning("""
+        ⚠️ **Disclaimer:**
+        - Prediksi ini adalah estimasi berdasarkan pola historis
+        - Harga aktual dapat berbeda karena faktor eksternal
+        - Gunakan sebagai referensi, bukan keputusan mutlak
+        - Selalu cek harga pasar real-time sebelum menjual
+        """)
 
 with tabs[2]:
     st.header("💡 Rekomendasi Waktu Jual")
@@ -405,6 +442,6 @@ st.markdown("---")
 st.markdown("""
 <div style="text-align: center; color: #666;">
     <p><strong>📈 Prediksi Harga Cabai</strong></p>
-    <p><small>Data simulasi untuk edukasi - Selalu cek harga real-time</small></p>
+    <p><small>Data harga simulasi untuk edukasi - Selalu cek harga real-time</small></p>
 </div>
 """, unsafe_allow_html=True)
@@ -1,6 +1,8 @@
 import streamlit as st
 import sys
 import os
+import tempfile
+import pandas as pd
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -10,6 +12,25 @@ from PIL import Image
 
 st.set_page_config(page_title="Deteksi Penyakit AI", page_icon="📸", layout="wide")
 
+BACKEND_OPTIONS = {
+    "Rule-based (HSV)": "rule",
+    "Model ML Ringan (CPU)": "gbm"
+}
+
+@st.cache_resource(show_spinner="Menyiapkan model deteksi...")
+def load_detection_backend(backend):
+    """
+    Load and warm up the classifier backend once per server process
+
+    Raises while the backend is still being fitted: exceptions are not
+    cached, so the warm-up (which only reached the fallback) is redone
+    on a later run once the model is ready
+    """
+    warmed = DiseaseDetectionService.warmup_backend(backend)
+    if not DiseaseDetectionService.backend_ready(backend):
+        raise RuntimeError(f"Backend {backend} masih disiapkan")
+    return warmed
+
 st.title("📸 Deteksi Penyakit dengan AI")
 st.markdown("**Upload foto tanaman untuk analisis otomatis**")
 
@@ -22,14 +43,117 @@ st.info("""
 - Format: JPG atau PNG
 """)
 
-# File upload
-uploaded_file = st.file_uploader(
-    "Upload Foto Tanaman",
-    type=['jpg', 'jpeg', 'png'],
-    help="Pilih foto daun cabai untuk dianalisis"
+# Analysis mode
+analysis_mode = st.radio(
+    "Mode Analisis",
+    ["🍃 Daun Tunggal", "🛰️ Lahan / Drone (Tiled)", "🎥 Video Scouting"],
+    horizontal=True,
+    help="Mode lahan membagi foto besar (drone/wide-angle) menjadi tile; mode video menilai kesehatan per segmen rekaman jalan antar bedengan"
+)
+
+backend_label = st.selectbox(
+    "Metode Deteksi",
+    list(BACKEND_OPTIONS.keys()),
+    help="Model ML ringan menggunakan histogram warna & tekstur, berjalan di CPU"
 )
+selected_backend = BACKEND_OPTIONS[backend_label]
+try:
+    load_detection_backend(selected_backend)
+except RuntimeError:
+    st.info("⏳ Model ML sedang disiapkan di latar belakang - sementara deteksi memakai metode rule-based")
+
+# File upload
+uploaded_file = None
+uploaded_video = None
+if analysis_mode == "🎥 Video Scouting":
+    uploaded_video = st.file_uploader(
+        "Upload Video Scouting",
+        type=['mp4', 'mov', 'avi'],
+        help="Rekam sambil berjalan menyusuri baris tanaman"
+    )
+else:
+    uploaded_file = st.file_uploader(
+        "Upload Foto Tanaman",
+        type=['jpg', 'jpeg', 'png', 'tif', 'tiff'],
+        help="Pilih foto daun cabai untuk dianalisis"
+    )
+
+if uploaded_video is not None:
+    segment_seconds = st.slider("Panjang Segmen (detik)", 5, 60, 10)
+    
+    if st.button("🎥 Analisis Video", type="primary"):
+        # OpenCV reads from a path, so spool the upload to a temp file
+        suffix = os.path.splitext(uploaded_video.name)[1]
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+            tmp.write(uploaded_video.getbuffer())
+            video_path = tmp.name
+        
+        segments = []
+        progress_text = st.empty()
+        chart_placeholder = st.empty()
+        try:
+            for segment in DiseaseDetectionService.analyze_video(
+                video_path,
+                segment_seconds=segment_seconds,
+                backend=selected_backend
+            ):
+                segments.append(segment)
+                progress_text.caption(f"Segmen {segment['segment'] + 1} selesai ({segment['end_s']} detik)")
+                df_segments = pd.DataFrame(segments).set_index('start_s')
+                chart_placeholder.line_chart(df_segments[['health_score', 'rolling_health_score']])
+        except Exception as e:
+            st.error(f"❌ Error saat analisis video: {str(e)}")
+        finally:
+            os.remove(video_path)
+        
+        if segments:
+            worst = min(segments, key=lambda x: x['health_score'])
+            col_v1, col_v2, col_v3 = st.columns(3)
+            col_v1.metric("Segmen Dianalisis", len(segments))
+            col_v2.metric("Skor Rolling Akhir", f"{segments[-1]['rolling_health_score']:.1f}")
+            col_v3.metric("Segmen Terburuk", f"{worst['start_s']}-{worst['end_s']} dtk", f"{worst['health_score']:.1f}")
+            st.dataframe(pd.DataFrame(segments), use_container_width=True)
+
+elif uploaded_file is not None and analysis_mode.endswith("(Tiled)"):
+    col_tile1, col_tile2 = st.columns(2)
+    with col_tile1:
+        tile_size = st.select_slider("Ukuran Tile (px)", options=[320, 480, 640, 800, 1024], value=640)
+    with col_tile2:
+        overlap_pct = st.slider("Overlap Tile (%)", 0, 50, 10)
+    
+    if st.button("🛰️ Analisis Lahan", type="primary"):
+        with st.spinner("Menganalisis tile lahan..."):
+            try:
+                uploaded_file.seek(0)
+                field_results = DiseaseDetectionService.analyze_field_image(
+                    uploaded_file,
+                    tile_size=tile_size,
+                    overlap=int(tile_size * overlap_pct / 100),
+                    backend=selected_backend
+                )
+                summary = field_results['summary']
+                
+                st.subheader("🗺️ Peta Kesehatan Lahan")
+                st.image(field_results['heatmap'], use_column_width=True)
+                st.caption("Hijau=Sehat, Kuning=Waspada, Merah=Perlu Perhatian")
+                
+                col_f1, col_f2, col_f3, col_f4 = st.columns(4)
+                col_f1.metric("Skor Kesehatan Lahan", f"{summary['health_score']:.1f}")
+                col_f2.metric("Jumlah Tile", summary['tile_count'])
+                col_f3.metric("Tile Bermasalah", f"{summary['unhealthy_tiles']} ({summary['unhealthy_percentage']:.1f}%)")
+                col_f4.metric("Skor Tile Terendah", f"{summary['min_tile_health']:.1f}")
+                
+                st.write("**Grid Skor Kesehatan per Tile (baris × kolom):**")
+                st.dataframe(field_results['health_grid'].round(1), use_container_width=True)
+                
+                if field_results['detected_diseases']:
+                    top = field_results['detected_diseases'][0]
+                    st.info(f"**Pola dominan lahan:** {top['disease']} ({top['confidence']:.1f}%) - {top['treatment']}")
+            
+            except Exception as e:
+                st.error(f"❌ Error saat analisis lahan: {str(e)}")
 
-if uploaded_file is not None:
+elif uploaded_file is not None:
     # Display original image
     col_img1, col_img2 = st.columns(2)
     
@@ -46,12 +170,12 @@ if uploaded_file is not None:
                 uploaded_file.seek(0)
                 
                 # Analyze
-                results = DiseaseDetectionService.analyze_image(uploaded_file)
+                results = DiseaseDetectionService.analyze_image(uploaded_file, backend=selected_backend)
                 
                 # Display visualization
                 with col_img2:
                     st.subheader("🎨 Analisis Visual")
-                    st.image(results['visualization'], use_column_width=True)
+                    st.image(results['visualization'].render(max_side=800), use_column_width=True)
                     st.caption("Hijau=Sehat, Kuning=Defisiensi, Merah=Bercak")
                 
                 # Results
@@ -6,12 +6,22 @@ from datetime import datetime
 import folium
 from streamlit_folium import st_folium
 from services.weather_service import WeatherService
+from services.spray_window_service import SprayWindowService
+from data.pesticide_database import PESTICIDE_DATABASE
 
 st.set_page_config(page_title="Monitoring Cuaca", page_icon="🌡️", layout="wide")
 
+@st.cache_resource
+def start_weather_refresher():
+    """One background refresher per server process keeps the cache warm"""
+    return WeatherService.create_refresher(extra_params=[SprayWindowService.HOURLY_PARAMS]).start()
+
 st.title("🌡️ Monitoring Cuaca & Iklim")
 st.markdown("**Pantau cuaca real-time untuk keputusan budidaya yang tepat**")
 
+if WeatherService.BACKEND != "live":
+    st.caption(f"⚙️ Mode data cuaca: **{WeatherService.BACKEND}** (offline, seed {WeatherService.SIMULATION_SEED})")
+
 # Location selector
 st.subheader("📍 Pilih Lokasi")
 
@@ -68,15 +78,15 @@ with col_loc2:
             st.session_state.weather_data = None
             st.rerun()
 
-# Fetch weather data
+# Fetch weather data (cached value first, refresh in background)
 if st.button("🔄 Refresh Data Cuaca", type="primary"):
-    st.session_state.weather_data = None
+    WeatherService.get_client().refresh_async(lat, lon, WeatherService.FORECAST_PARAMS)
+    st.toast("Memperbarui data cuaca di latar belakang...")
 
-if 'weather_data' not in st.session_state or st.session_state.weather_data is None:
-    with st.spinner("Mengambil data cuaca..."):
-        st.session_state.weather_data = WeatherService.get_weather(lat, lon)
+start_weather_refresher()
 
-weather_data = st.session_state.weather_data
+weather_data = WeatherService.get_weather_nowait(lat, lon)
+st.session_state.weather_data = weather_data
 current = weather_data['current']
 forecast = weather_data['forecast']
 
@@ -114,7 +124,12 @@ with col_w4:
 with col_w5:
     st.info(f"**Kondisi:**\n\n{current['condition']}")
 
-st.caption(f"Terakhir update: {current['timestamp'].strftime('%Y-%m-%d %H:%M')}")
+if weather_data.get('placeholder'):
+    st.warning("⏳ Data cuaca sedang dimuat. Angka di bawah adalah simulasi sementara; muat ulang halaman sebentar lagi.")
+elif weather_data.get('stale'):
+    st.caption(f"Terakhir update: {current['timestamp'].strftime('%Y-%m-%d %H:%M')} (sedang diperbarui)")
+else:
+    st.caption(f"Terakhir update: {current['timestamp'].strftime('%Y-%m-%d %H:%M')}")
 
 # Weather Alerts
 alerts = WeatherService.check_alerts(weather_data)
@@ -242,6 +257,38 @@ for rec in spray_recs:
     with col_r3:
         st.write(rec['reason'])
 
+# Hourly spray windows
+st.subheader("⏰ Jendela Semprot per Jam (3 Hari)")
+
+pesticide = st.selectbox(
+    "Produk yang akan disemprot",
+    ["(Tidak spesifik)"] + list(PESTICIDE_DATABASE.keys()),
+    help="Menentukan lama bebas hujan yang dibutuhkan (rain-fastness)"
+)
+
+spray_plan = SprayWindowService.plan(
+    {'selected': {'lat': lat, 'lon': lon}},
+    pesticide=None if pesticide == "(Tidak spesifik)" else pesticide,
+    wait=False
+)
+windows = spray_plan['windows'].get('selected', [])
+
+st.caption(f"Butuh {spray_plan['rainfast_hours']} jam bebas hujan setelah aplikasi")
+
+if windows:
+    df_windows = pd.DataFrame([{
+        'Mulai': datetime.fromisoformat(w['start']).strftime('%a %d/%m %H:%M'),
+        'Selesai': datetime.fromisoformat(w['end']).strftime('%H:59'),
+        'Durasi (jam)': w['hours'],
+        'Jam Terbaik': datetime.fromisoformat(w['best_hour']).strftime('%H:%M'),
+        'Skor': w['score']
+    } for w in windows])
+    st.dataframe(df_windows, use_container_width=True, hide_index=True)
+elif spray_plan['failed']:
+    st.info("⏳ Prakiraan per jam sedang dimuat, muat ulang halaman sebentar lagi")
+else:
+    st.warning("Tidak ada jendela semprot yang aman dalam 3 hari ke depan")
+
 st.info("""
 💡 **Tips Penyemprotan:**
 - Semprot pagi (06:00-09:00) atau sore (16:00-18:00)
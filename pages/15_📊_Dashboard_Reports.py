@@ -4,6 +4,7 @@ import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime, timedelta
 from services.dashboard_service import DashboardService
+from services.weather_service import WeatherService
 
 st.set_page_config(page_title="Dashboard & Reports", page_icon="📊", layout="wide")
 
@@ -53,8 +54,15 @@ selling_price = st.sidebar.number_input(
     step=1000
 )
 
+farm_location_name = st.sidebar.selectbox(
+    "Lokasi Lahan",
+    ["(Kalender saja)"] + list(WeatherService.LOCATIONS.keys()),
+    help="Dengan lokasi, fase dihitung dari akumulasi suhu (GDD) sehingga lahan dataran tinggi/rendah diperhitungkan"
+)
+farm_location = WeatherService.LOCATIONS.get(farm_location_name)
+
 # Get metrics
-metrics = DashboardService.get_summary_metrics(planting_date, land_area, total_rab)
+metrics = DashboardService.get_summary_metrics(planting_date, land_area, total_rab, farm_location)
 cost_breakdown = DashboardService.get_cost_breakdown(total_rab)
 profitability = DashboardService.calculate_profitability(
     total_rab, 
@@ -73,6 +81,10 @@ with col1:
         f"{metrics['hst']} hari",
         delta=f"Fase: {metrics['phase']}"
     )
+    if metrics['gdd'] is not None:
+        st.caption(f"🌡️ {metrics['gdd']:.0f} GDD ≈ {metrics['thermal_hst']} HST termal")
+        if metrics['harvest_start_date']:
+            st.caption(f"🌶️ Prediksi panen pertama: {metrics['harvest_start_date'].strftime('%d %b %Y')}")
 
 with col2:
     st.metric(
@@ -5,6 +5,7 @@ import plotly.express as px
 from datetime import datetime, timedelta
 from services.harvest_report_service import HarvestReportService
 from services.database_service import DatabaseService
+from services.rab_calculator_service import RABCalculatorService
 
 st.set_page_config(page_title="Laporan Panen", page_icon="🌾", layout="wide")
 
@@ -82,6 +83,31 @@ with tab1:
         )
         st.session_state.farm_location = farm_location
     
+    # Skenario budidaya untuk segmen benchmark per skenario
+    scenario_keys = list(RABCalculatorService.RAB_TEMPLATES.keys())
+    saved_profile = DatabaseService.get_user_profile(farmer_name) if farmer_name else None
+    saved_scenario = (saved_profile or {}).get('scenario')
+    scenario = st.selectbox(
+        "Skenario Budidaya",
+        scenario_keys,
+        index=scenario_keys.index(saved_scenario) if saved_scenario in scenario_keys else 0,
+        format_func=lambda key: RABCalculatorService.RAB_TEMPLATES[key]['nama'],
+        help="Dipakai untuk membandingkan hasil dengan petani berskenario sama"
+    )
+    
+    if st.button("💾 Simpan Profil"):
+        if not farmer_name:
+            st.warning("⚠️ Masukkan nama petani terlebih dahulu!")
+        else:
+            DatabaseService.save_user_profile({
+                'farmer_name': farmer_name,
+                'farm_location': farm_location,
+                'land_area': land_area,
+                'total_investment': total_investment,
+                'scenario': scenario
+            })
+            st.success(f"✅ Profil {farmer_name} berhasil disimpan!")
+    
     st.markdown("---")
     st.subheader("📝 Data Panen")
     
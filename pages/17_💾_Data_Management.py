@@ -2,6 +2,8 @@ import streamlit as st
 import json
 from datetime import datetime
 from services.database_service import DatabaseService
+from services.price_history_service import PriceHistoryService
+from services.price_forecast_service import PriceForecastService
 
 st.set_page_config(page_title="Data Management", page_icon="💾", layout="wide")
 
@@ -179,6 +181,44 @@ with tab2:
         except Exception as e:
             st.error(f"❌ Error: {str(e)}")
 
+    # Price history import
+    st.markdown("---")
+    st.subheader("📈 Import Riwayat Harga")
+    
+    st.info("""
+    **Format:** CSV atau Parquet dengan kolom `date`, `commodity`, `market`, `price`
+    (atau `tanggal`, `komoditas`, `pasar`, `harga`). Tanggal yang sudah ada akan diperbarui.
+    """)
+    
+    price_file = st.file_uploader(
+        "Upload file harga",
+        type=['csv', 'parquet'],
+        key="price_file"
+    )
+    
+    if price_file and st.button("📥 Import Harga", type="primary"):
+        try:
+            with st.spinner("Importing harga..."):
+                if price_file.name.lower().endswith('.parquet'):
+                    result = PriceHistoryService.ingest_parquet(price_file)
+                else:
+                    result = PriceHistoryService.ingest_csv(price_file)
+            
+            # Refit price models for the series that changed
+            for series_key in result['series']:
+                PriceForecastService.fit_async(*series_key.split('/'))
+            
+            st.success(
+                f"✅ {result['inserted']:,} baris baru, {result['updated']:,} diperbarui, "
+                f"{result['unchanged'] + result['duplicates']:,} duplikat dilewati"
+            )
+        except Exception as e:
+            st.error(f"❌ Error: {str(e)}")
+    
+    price_series = PriceHistoryService.list_series()
+    if not price_series.empty:
+        st.dataframe(price_series, use_container_width=True, hide_index=True)
+
 # TAB 3: Backup Management
 with tab3:
     st.header("💾 Backup Management")
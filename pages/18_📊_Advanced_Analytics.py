@@ -1,9 +1,13 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 from datetime import datetime
 from services.analytics_service import AnalyticsService
+from services.benchmark_service import BenchmarkService
+from services.cost_analytics_service import CostAnalyticsService
 from services.database_service import DatabaseService
+from services.seasonal_trend_service import SeasonalTrendService
 
 st.set_page_config(page_title="Advanced Analytics", page_icon="📊", layout="wide")
 
@@ -94,6 +98,42 @@ with tab1:
         
         for i, rec in enumerate(prediction['recommendations'], 1):
             st.write(f"{i}. {rec}")
+    
+    # Scenario sweep: whole grid predicted in one vectorized call
+    st.markdown("---")
+    st.subheader("🧮 Simulasi Skenario Curah Hujan × Pupuk")
+    
+    col_sweep1, col_sweep2 = st.columns(2)
+    with col_sweep1:
+        rain_range = st.slider("Rentang Curah Hujan (mm)", 0, 2000, (100, 1200), step=50)
+    with col_sweep2:
+        fert_range = st.slider("Rentang Pupuk (kg)", 0, 1000, (100, 600), step=25)
+    
+    rain_grid = np.arange(rain_range[0], rain_range[1] + 1, 50)
+    fert_grid = np.arange(fert_range[0], fert_range[1] + 1, 25)
+    
+    sweep = AnalyticsService.predict_yield_batch(
+        hst=hst,
+        avg_height=avg_height,
+        avg_leaves=avg_leaves,
+        rainfall_mm=rain_grid[:, np.newaxis],
+        fertilizer_kg=fert_grid[np.newaxis, :],
+        pest_severity=pest_severity
+    )
+    
+    fig_sweep = go.Figure(data=go.Heatmap(
+        z=sweep['predicted_yield'].to_numpy().reshape(len(rain_grid), len(fert_grid)),
+        x=fert_grid,
+        y=rain_grid,
+        colorscale='Greens',
+        colorbar=dict(title='ton/ha')
+    ))
+    fig_sweep.update_layout(
+        xaxis_title='Total Pupuk (kg)',
+        yaxis_title='Curah Hujan (mm)',
+        height=400
+    )
+    st.plotly_chart(fig_sweep, use_container_width=True)
 
 # TAB 2: Price Forecast
 with tab2:
@@ -210,48 +250,93 @@ with tab3:
     Bandingkan dengan benchmark industri.
     """)
     
-    # Input costs
-    col_cost1, col_cost2 = st.columns(2)
+    cost_source = st.radio("Sumber Data Biaya", ["Jurnal budidaya tercatat", "Input manual"], horizontal=True)
     
-    with col_cost1:
-        total_cost = st.number_input(
-            "Total Biaya Produksi (Rp)",
-            min_value=1000000,
-            max_value=1000000000,
-            value=50000000,
-            step=1000000
-        )
-        
-        yield_ton = st.number_input(
-            "Hasil Panen (ton/ha)",
-            min_value=0.0,
-            max_value=30.0,
-            value=12.0,
-            step=0.1
-        )
+    analysis = None
     
-    with col_cost2:
-        st.write("**Breakdown Biaya:**")
+    if cost_source == "Jurnal budidaya tercatat":
+        # Ringkasan biaya per petani/musim/kategori (tabel agregat, bukan scan jurnal)
+        cost_seasons = CostAnalyticsService.get_seasons()
         
-        bibit = st.number_input("Bibit (Rp)", value=int(total_cost * 0.20), step=100000)
-        pupuk = st.number_input("Pupuk (Rp)", value=int(total_cost * 0.25), step=100000)
-        pestisida = st.number_input("Pestisida (Rp)", value=int(total_cost * 0.15), step=100000)
-        mulsa = st.number_input("Mulsa & Ajir (Rp)", value=int(total_cost * 0.10), step=100000)
-        labor = st.number_input("Tenaga Kerja (Rp)", value=int(total_cost * 0.20), step=100000)
-        lainnya = st.number_input("Lain-lain (Rp)", value=int(total_cost * 0.10), step=100000)
-    
-    cost_breakdown = {
-        'Bibit': bibit,
-        'Pupuk': pupuk,
-        'Pestisida': pestisida,
-        'Mulsa & Ajir': mulsa,
-        'Tenaga Kerja': labor,
-        'Lain-lain': lainnya
-    }
-    
-    if st.button("🔍 Analisis Efisiensi", type="primary"):
-        analysis = AnalyticsService.analyze_cost_efficiency(total_cost, cost_breakdown, yield_ton)
+        if not cost_seasons:
+            st.warning("Belum ada biaya tercatat di jurnal. Catat aktivitas di Module 11 atau gunakan input manual.")
+        else:
+            col_src1, col_src2 = st.columns(2)
+            
+            with col_src1:
+                cost_season = st.selectbox("Musim", cost_seasons)
+            
+            scores = CostAnalyticsService.score_farmers(cost_season)
+            
+            with col_src2:
+                cost_farmer = st.selectbox("Petani", scores['farmer_name'].tolist())
+            
+            analysis = AnalyticsService.analyze_farmer_cost_efficiency(cost_farmer, cost_season)
+            
+            if analysis is not None and not analysis['yield_ton_ha']:
+                st.warning("Belum ada panen tercatat untuk musim ini - biaya per kg belum bisa dihitung")
+            
+            with st.expander(f"📋 Efisiensi Biaya Semua Petani - {cost_season} ({len(scores)})"):
+                df_scores = scores[[
+                    'farmer_name', 'total_cost', 'cost_per_kg', 'efficiency_score', 'savings_potential', 'cost_rank'
+                ]].sort_values('cost_per_kg')
+                df_scores.columns = [
+                    'Petani', 'Total Biaya (Rp)', 'Biaya per kg (Rp)', 'Skor Efisiensi', 'Potensi Hemat (Rp)', 'Peringkat Biaya'
+                ]
+                st.dataframe(df_scores.round(0), use_container_width=True, hide_index=True)
+                
+                df_categories = CostAnalyticsService.get_category_totals(cost_season)
+                fig_categories = go.Figure(go.Pie(
+                    labels=df_categories['category'],
+                    values=df_categories['total_cost'],
+                    hole=0.4
+                ))
+                fig_categories.update_layout(title='Komposisi Biaya Seluruh Petani', height=350)
+                st.plotly_chart(fig_categories, use_container_width=True)
+    else:
+        # Input costs
+        col_cost1, col_cost2 = st.columns(2)
+        
+        with col_cost1:
+            total_cost = st.number_input(
+                "Total Biaya Produksi (Rp)",
+                min_value=1000000,
+                max_value=1000000000,
+                value=50000000,
+                step=1000000
+            )
+            
+            yield_ton = st.number_input(
+                "Hasil Panen (ton/ha)",
+                min_value=0.0,
+                max_value=30.0,
+                value=12.0,
+                step=0.1
+            )
+        
+        with col_cost2:
+            st.write("**Breakdown Biaya:**")
+            
+            bibit = st.number_input("Bibit (Rp)", value=int(total_cost * 0.20), step=100000)
+            pupuk = st.number_input("Pupuk (Rp)", value=int(total_cost * 0.25), step=100000)
+            pestisida = st.number_input("Pestisida (Rp)", value=int(total_cost * 0.15), step=100000)
+            mulsa = st.number_input("Mulsa & Ajir (Rp)", value=int(total_cost * 0.10), step=100000)
+            labor = st.number_input("Tenaga Kerja (Rp)", value=int(total_cost * 0.20), step=100000)
+            lainnya = st.number_input("Lain-lain (Rp)", value=int(total_cost * 0.10), step=100000)
+        
+        cost_breakdown = {
+            'Bibit': bibit,
+            'Pupuk': pupuk,
+            'Pestisida': pestisida,
+            'Mulsa & Ajir': mulsa,
+            'Tenaga Kerja': labor,
+            'Lain-lain': lainnya
+        }
         
+        if st.button("🔍 Analisis Efisiensi", type="primary"):
+            analysis = AnalyticsService.analyze_cost_efficiency(total_cost, cost_breakdown, yield_ton)
+    
+    if analysis is not None:
         st.markdown("---")
         
         # Efficiency score
@@ -260,7 +345,7 @@ with tab3:
         with col_eff1:
             st.markdown(f"""
             <div style='text-align: center; padding: 20px; background-color: {analysis['overall_assessment']['color']}20; border: 3px solid {analysis['overall_assessment']['color']}; border-radius: 10px;'>
-                <h1 style='color: {analysis['overall_assessment']['color']}; margin: 0; font-size: 3em;'>{analysis['efficiency_score']}</h1>
+                <h1 style='color: {analysis['overall_assessment']['color']}; margin: 0; font-size: 3em;'>{analysis['efficiency_score'] if analysis['efficiency_score'] is not None else '-'}</h1>
                 <h3 style='color: {analysis['overall_assessment']['color']}; margin: 10px 0 0 0;'>{analysis['overall_assessment']['level']}</h3>
             </div>
             """, unsafe_allow_html=True)
@@ -268,7 +353,7 @@ with tab3:
         with col_eff2:
             st.metric(
                 "Biaya per kg",
-                f"Rp {analysis['cost_per_kg']:,.0f}",
+                f"Rp {analysis['cost_per_kg']:,.0f}" if analysis['cost_per_kg'] is not None else "-",
                 delta=f"Benchmark: Rp {analysis['benchmark_cost_per_kg']:,.0f}",
                 delta_color="inverse"
             )
@@ -306,6 +391,17 @@ with tab4:
     Data di-anonymize untuk privasi.
     """)
     
+    # Segment petani pembanding (dari data panen yang tercatat)
+    segments = BenchmarkService.get_segments()
+    
+    col_seg1, col_seg2 = st.columns(2)
+    
+    with col_seg1:
+        bench_region = st.selectbox("Wilayah Pembanding", ["Semua"] + segments['regions'])
+    
+    with col_seg2:
+        bench_scenario = st.selectbox("Skenario Pembanding", ["Semua"] + segments['scenarios'])
+    
     # Input farmer data
     col_bench1, col_bench2, col_bench3 = st.columns(3)
     
@@ -325,10 +421,24 @@ with tab4:
             'roi': farmer_roi
         }
         
-        benchmarks = AnalyticsService.calculate_benchmarks(farmer_data)
+        benchmarks = AnalyticsService.calculate_benchmarks(
+            farmer_data,
+            region=None if bench_region == "Semua" else bench_region,
+            scenario=None if bench_scenario == "Semua" else bench_scenario
+        )
         
         st.markdown("---")
         
+        if benchmarks['source'] == 'default':
+            st.caption(f"ℹ️ Data segmen belum cukup (min. {BenchmarkService.MIN_SAMPLES} musim) - memakai benchmark default")
+        else:
+            sizes = ", ".join(f"{metric}: {n} musim" for metric, n in benchmarks['sample_size'].items())
+            fallback = [metric for metric, source in benchmarks['sources'].items() if source == 'default']
+            st.caption(
+                f"📊 Benchmark dari data petani ({sizes})"
+                + (f" - default untuk: {', '.join(fallback)}" if fallback else "")
+            )
+        
         # Overall rank
         st.markdown(f"""
         <div style='text-align: center; padding: 30px; background-color: #3498DB20; border: 3px solid #3498DB; border-radius: 10px;'>
@@ -373,36 +483,65 @@ with tab5:
     Identifikasi pola dan forecast musim berikutnya.
     """)
     
-    # Input seasonal data
-    st.subheader("📝 Input Data Musim Tanam")
-    
-    num_seasons = st.number_input("Jumlah Musim", min_value=2, max_value=10, value=3, step=1)
+    trend_source = st.radio("Sumber Data", ["Data panen tercatat", "Input manual"], horizontal=True)
     
-    seasons_data = []
+    trends = None
+    df_seasons = None
     
-    for i in range(num_seasons):
-        with st.expander(f"Musim {i+1}"):
-            col_s1, col_s2, col_s3 = st.columns(3)
-            
-            with col_s1:
-                s_yield = st.number_input(f"Yield (ton/ha)", min_value=0.0, max_value=30.0, value=10.0 + i, step=0.1, key=f"yield_{i}")
-            
-            with col_s2:
-                s_cost = st.number_input(f"Biaya (Rp)", min_value=1000000, max_value=200000000, value=45000000 + (i * 2000000), step=1000000, key=f"cost_{i}")
-            
-            with col_s3:
-                s_roi = st.number_input(f"ROI (%)", min_value=0, max_value=500, value=100 + (i * 5), step=5, key=f"roi_{i}")
+    if trend_source == "Data panen tercatat":
+        # Aggregat per petani per musim (panen + biaya jurnal), diperbarui saat musim selesai
+        farmer_trends = SeasonalTrendService.get_trends()
+        
+        if farmer_trends.empty:
+            st.warning("Belum ada musim tanam selesai yang tercatat. Catat panen di Module 16 atau gunakan input manual.")
+        else:
+            trend_farmer = st.selectbox("Petani", farmer_trends['farmer_name'].tolist())
+            trends = AnalyticsService.analyze_farmer_trends(trend_farmer)
+            df_seasons = SeasonalTrendService.get_series(trend_farmer)
             
-            seasons_data.append({
-                'season': i + 1,
-                'yield': s_yield,
-                'cost': s_cost,
-                'roi': s_roi
-            })
+            with st.expander(f"📋 Ringkasan Tren Semua Petani ({len(farmer_trends)})"):
+                df_all = farmer_trends[[
+                    'farmer_name', 'seasons', 'latest_season',
+                    'yield_last', 'yield_yoy_pct', 'yield_cagr_pct', 'yield_volatility_pct', 'roi_last', 'roi_slope'
+                ]].copy()
+                df_all.columns = [
+                    'Petani', 'Musim', 'Musim Terakhir',
+                    'Yield (ton/ha)', 'Yield YoY (%)', 'Yield CAGR (%)', 'Volatilitas Yield (%)', 'ROI (%)', 'Tren ROI (poin/tahun)'
+                ]
+                st.dataframe(df_all.round(1), use_container_width=True, hide_index=True)
+    else:
+        # Input seasonal data
+        st.subheader("📝 Input Data Musim Tanam")
+        
+        num_seasons = st.number_input("Jumlah Musim", min_value=2, max_value=10, value=3, step=1)
+        
+        seasons_data = []
+        
+        for i in range(num_seasons):
+            with st.expander(f"Musim {i+1}"):
+                col_s1, col_s2, col_s3 = st.columns(3)
+                
+                with col_s1:
+                    s_yield = st.number_input(f"Yield (ton/ha)", min_value=0.0, max_value=30.0, value=10.0 + i, step=0.1, key=f"yield_{i}")
+                
+                with col_s2:
+                    s_cost = st.number_input(f"Biaya (Rp)", min_value=1000000, max_value=200000000, value=45000000 + (i * 2000000), step=1000000, key=f"cost_{i}")
+                
+                with col_s3:
+                    s_roi = st.number_input(f"ROI (%)", min_value=0, max_value=500, value=100 + (i * 5), step=5, key=f"roi_{i}")
+                
+                seasons_data.append({
+                    'season': i + 1,
+                    'yield': s_yield,
+                    'cost': s_cost,
+                    'roi': s_roi
+                })
+        
+        if st.button("📊 Analisis Tren", type="primary"):
+            trends = AnalyticsService.analyze_seasonal_trends(seasons_data)
+            df_seasons = pd.DataFrame(seasons_data)
     
-    if st.button("📊 Analisis Tren", type="primary"):
-        trends = AnalyticsService.analyze_seasonal_trends(seasons_data)
-        
+    if trends is not None:
         if trends.get('insufficient_data'):
             st.warning(trends['message'])
         else:
@@ -432,6 +571,19 @@ with tab5:
                     help="Year-over-year growth"
                 )
             
+            # CAGR, volatilitas dan regresi (hanya untuk data tercatat)
+            if 'cagr' in trends['yield_trend']:
+                def fmt(value, pattern):
+                    return pattern.format(value) if value is not None else "-"
+                
+                st.caption(
+                    f"{trends['seasons_count']} musim ({trends['first_season']} s/d {trends['latest_season']}) · "
+                    f"CAGR yield {fmt(trends['yield_trend']['cagr'], '{:+.1f}%')}/tahun · "
+                    f"volatilitas yield {fmt(trends['yield_trend']['volatility'], '{:.1f}%')} · "
+                    f"tren yield {fmt(trends['yield_trend']['slope'], '{:+.2f}')} ton/ha per tahun "
+                    f"(R² {fmt(trends['yield_trend']['r2'], '{:.2f}')})"
+                )
+            
             # Forecast
             st.markdown("---")
             st.subheader("🔮 Forecast Musim Berikutnya")
@@ -457,8 +609,6 @@ with tab5:
             # Trend chart
             st.markdown("---")
             
-            df_seasons = pd.DataFrame(seasons_data)
-            
             fig_trends = go.Figure()
             
             fig_trends.add_trace(go.Scatter(
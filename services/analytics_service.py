@@ -3,6 +3,8 @@ Advanced Analytics Service
 ML-based predictions, forecasting, optimization, and benchmarking
 """
 
+import bisect
+
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
@@ -10,6 +12,11 @@ from sklearn.linear_model import LinearRegression
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import r2_score, mean_absolute_error
 
+from services.benchmark_service import BenchmarkService, season_ordinal
+from services.cost_analytics_service import CostAnalyticsService
+from services.seasonal_trend_service import SeasonalTrendService
+from services.price_forecast_service import PriceForecastService
+
 class AnalyticsService:
     
     # ===== PREDICTIVE YIELD =====
@@ -34,45 +41,14 @@ class AnalyticsService:
         # Base yield: 10 ton/ha
         base_yield = 10.0
         
-        # HST factor (optimal at 120-140 days)
-        if hst < 110:
-            hst_factor = 0.5
-        elif hst < 140:
-            hst_factor = 1.0
-        else:
-            hst_factor = 0.9
-        
-        # Height factor (optimal at 60-80 cm)
-        if avg_height < 40:
-            height_factor = 0.7
-        elif avg_height < 80:
-            height_factor = 1.0
-        else:
-            height_factor = 0.95
-        
-        # Leaves factor (optimal at 40-60 leaves)
-        if avg_leaves < 30:
-            leaves_factor = 0.8
-        elif avg_leaves < 60:
-            leaves_factor = 1.0
-        else:
-            leaves_factor = 0.95
-        
-        # Rainfall factor (optimal 400-600mm)
-        if rainfall_mm < 300:
-            rain_factor = 0.7
-        elif rainfall_mm < 700:
-            rain_factor = 1.0
-        else:
-            rain_factor = 0.85
-        
-        # Fertilizer factor (optimal 250-350kg)
-        if fertilizer_kg < 200:
-            fert_factor = 0.8
-        elif fertilizer_kg < 400:
-            fert_factor = 1.0
-        else:
-            fert_factor = 0.9
+        # Bucket factors shared with predict_yield_batch (YIELD_FACTOR_BUCKETS)
+        # HST optimal 120-140 hari, tinggi 60-80 cm, daun 40-60,
+        # curah hujan 400-600 mm, pupuk 250-350 kg
+        hst_factor = AnalyticsService._bucket_factor('hst', hst)
+        height_factor = AnalyticsService._bucket_factor('avg_height', avg_height)
+        leaves_factor = AnalyticsService._bucket_factor('avg_leaves', avg_leaves)
+        rain_factor = AnalyticsService._bucket_factor('rainfall_mm', rainfall_mm)
+        fert_factor = AnalyticsService._bucket_factor('fertilizer_kg', fertilizer_kg)
         
         # Pest factor (lower is better)
         pest_factor = 1.0 - (pest_severity / 100 * 0.3)  # Max 30% reduction
@@ -110,6 +86,96 @@ class AnalyticsService:
             'recommendations': AnalyticsService._get_yield_recommendations(hst, avg_height, pest_severity)
         }
     
+    # Factor buckets of predict_yield as (upper bounds, factors):
+    # value < bounds[0] -> factors[0], < bounds[1] -> factors[1], else factors[2]
+    YIELD_FACTOR_BUCKETS = {
+        'hst': ([110, 140], [0.5, 1.0, 0.9]),
+        'avg_height': ([40, 80], [0.7, 1.0, 0.95]),
+        'avg_leaves': ([30, 60], [0.8, 1.0, 0.95]),
+        'rainfall_mm': ([300, 700], [0.7, 1.0, 0.85]),
+        'fertilizer_kg': ([200, 400], [0.8, 1.0, 0.9])
+    }
+    
+    @staticmethod
+    def _bucket_factor(name, value):
+        """Scalar lookup in YIELD_FACTOR_BUCKETS (same bucketing as np.digitize)"""
+        bounds, factors = AnalyticsService.YIELD_FACTOR_BUCKETS[name]
+        return factors[bisect.bisect_right(bounds, value)]
+    
+    YIELD_INPUT_DEFAULTS = {
+        'rainfall_mm': 500,
+        'fertilizer_kg': 300,
+        'pest_severity': 10
+    }
+    
+    @staticmethod
+    def predict_yield_batch(plots=None, **inputs):
+        """
+        Vectorized predict_yield for many plots or scenarios
+        
+        Same factor buckets as predict_yield, evaluated with np.digitize
+        over whole columns instead of per-row if/elif chains.
+        
+        Args:
+            plots: DataFrame with columns hst, avg_height, avg_leaves and
+                optionally rainfall_mm, fertilizer_kg, pest_severity
+            **inputs: Alternatively, the same names as arrays/scalars
+                (broadcast against each other)
+        
+        Returns:
+            DataFrame (one row per plot) with predicted_yield,
+            confidence_low/high, <name>_factor per input, and
+            contrib_<name> columns: ton/ha gained or lost against the
+            10 ton/ha base, split by log share so they sum to
+            predicted_yield - base
+        """
+        base_yield = 10.0
+        names = list(AnalyticsService.YIELD_FACTOR_BUCKETS) + ['pest_severity']
+        
+        if plots is not None:
+            columns = {name: plots[name].to_numpy(dtype=float) for name in names if name in plots}
+            index = plots.index
+        else:
+            columns = {name: np.asarray(inputs[name], dtype=float) for name in names if name in inputs}
+            index = None
+        for name, default in AnalyticsService.YIELD_INPUT_DEFAULTS.items():
+            columns.setdefault(name, np.asarray(default, dtype=float))
+        
+        missing = [name for name in names if name not in columns]
+        if missing:
+            raise ValueError(f"Kolom input tidak lengkap: {', '.join(missing)}")
+        
+        arrays = np.broadcast_arrays(*[columns[name] for name in names])
+        columns = {name: np.ravel(arr) for name, arr in zip(names, arrays)}
+        
+        factors = {}
+        for name, (bounds, values) in AnalyticsService.YIELD_FACTOR_BUCKETS.items():
+            factors[name] = np.asarray(values)[np.digitize(columns[name], bounds)]
+        factors['pest_severity'] = 1.0 - (columns['pest_severity'] / 100 * 0.3)
+        
+        total_factor = np.prod(np.vstack(list(factors.values())), axis=0)
+        predicted = base_yield * total_factor
+        
+        result = pd.DataFrame({
+            'predicted_yield': predicted,
+            'confidence_low': predicted * 0.85,
+            'confidence_high': predicted * 1.15
+        }, index=index)
+        
+        for name, factor in factors.items():
+            result[f"{name}_factor"] = factor
+        
+        # Multiplicative model -> additive contributions via log shares
+        log_factors = {name: np.log(np.clip(f, 1e-12, None)) for name, f in factors.items()}
+        log_total = np.sum(list(log_factors.values()), axis=0)
+        delta = predicted - base_yield
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for name, log_f in log_factors.items():
+                share = np.where(log_total != 0, log_f / log_total, 0.0)
+                result[f"contrib_{name}"] = share * delta
+        
+        return result
+    
     @staticmethod
     def _get_yield_recommendations(hst, avg_height, pest_severity):
         """Generate recommendations to improve yield"""
@@ -135,36 +201,71 @@ class AnalyticsService:
     # ===== PRICE FORECASTING =====
     
     @staticmethod
-    def forecast_price(current_price=25000, days=30):
+    def forecast_price(current_price=25000, days=30, commodity=None, market=None):
         """
-        Forecast chili price using moving average and trend
+        Forecast chili price from the fitted market price model
+        
+        The model's relative change from the last observed price is
+        applied to current_price. Falls back to the seasonal heuristic
+        when no price model is available.
         
         Args:
             current_price: Current market price (Rp/kg)
             days: Forecast horizon (days)
+            commodity: Commodity key (default: cabai merah keriting)
+            market: Market key (default: Kramat Jati)
         
         Returns:
             dict with price forecast
         """
-        # Simulated historical prices (in real app, get from database/API)
-        # Seasonal pattern: prices higher in rainy season
         current_month = datetime.now().month
         
-        # Seasonal multiplier
-        if current_month in [11, 12, 1, 2]:  # Rainy season
-            seasonal_trend = 1.15  # 15% higher
-        elif current_month in [6, 7, 8]:  # Dry season
-            seasonal_trend = 0.95  # 5% lower
+        try:
+            model_forecast = PriceForecastService.get_forecast(
+                commodity, market, horizon_weeks=int(np.ceil(max(days, 30) / 7)) + 2, wait=True
+            )
+        except Exception:
+            model_forecast = None
+        
+        if model_forecast is not None:
+            # Weekly forecast -> daily curve, relative to the last observed price
+            fc = model_forecast['forecast']
+            offsets = np.concatenate([[0], (fc['date'] - model_forecast['last_date']).dt.days.values])
+            ratios = np.concatenate([[1.0], fc['forecast'].values / model_forecast['last_price']])
+            horizon = np.arange(1, max(days, 30) + 1)
+            daily = current_price * np.interp(horizon, offsets, ratios)
+            
+            forecast_7d = float(daily[6])
+            forecast_14d = float(daily[13])
+            forecast_30d = float(daily[29])
+            seasonal_trend = forecast_30d / current_price
+            
+            best_idx = int(np.argmax(daily[:days]))
+            best_time_days = best_idx + 1
+            best_price = float(daily[best_idx])
         else:
-            seasonal_trend = 1.0
-        
-        # Weekly trend (simulated)
-        weekly_change = 0.02  # 2% per week average
-        
-        # Calculate forecasts
-        forecast_7d = current_price * (1 + weekly_change)
-        forecast_14d = current_price * (1 + weekly_change * 2)
-        forecast_30d = current_price * seasonal_trend * (1 + weekly_change * 4)
+            # Seasonal multiplier
+            if current_month in [11, 12, 1, 2]:  # Rainy season
+                seasonal_trend = 1.15  # 15% higher
+            elif current_month in [6, 7, 8]:  # Dry season
+                seasonal_trend = 0.95  # 5% lower
+            else:
+                seasonal_trend = 1.0
+            
+            # Weekly trend (simulated)
+            weekly_change = 0.02  # 2% per week average
+            
+            forecast_7d = current_price * (1 + weekly_change)
+            forecast_14d = current_price * (1 + weekly_change * 2)
+            forecast_30d = current_price * seasonal_trend * (1 + weekly_change * 4)
+            
+            # Best selling time
+            if seasonal_trend > 1.0:
+                best_time_days = 25
+                best_price = forecast_30d
+            else:
+                best_time_days = 7
+                best_price = forecast_7d
         
         # Determine trend
         if seasonal_trend > 1.05:
@@ -180,14 +281,6 @@ class AnalyticsService:
             trend_icon = "→"
             trend_color = "#3498DB"
         
-        # Best selling time
-        if seasonal_trend > 1.0:
-            best_time_days = 25
-            best_price = forecast_30d
-        else:
-            best_time_days = 7
-            best_price = forecast_7d
-        
         return {
             'current_price': current_price,
             'forecast_7d': round(forecast_7d, 0),
@@ -233,16 +326,21 @@ class AnalyticsService:
             yield_ton: Actual yield (ton/ha)
         
         Returns:
-            dict with optimization analysis
+            dict with optimization analysis (efficiency_score and
+            cost_per_kg are None when there is no harvest yet)
         """
-        # Calculate cost per kg
-        cost_per_kg = total_cost / (yield_ton * 1000) if yield_ton > 0 else 0
+        # Calculate cost per kg (no harvest -> nothing to score)
+        has_harvest = bool(yield_ton > 0)
+        cost_per_kg = total_cost / (yield_ton * 1000) if has_harvest else None
         
         # Benchmark costs (industry average)
-        benchmark_cost_per_kg = 15000  # Rp 15k/kg
+        benchmark_cost_per_kg = CostAnalyticsService.BENCHMARK_COST_PER_KG
+        rules = CostAnalyticsService.COST_RULES
         
         # Efficiency score (0-100)
-        if cost_per_kg <= benchmark_cost_per_kg:
+        if cost_per_kg is None:
+            efficiency_score = None
+        elif cost_per_kg <= benchmark_cost_per_kg:
             efficiency_score = 100
         else:
             efficiency_score = max(0, 100 - ((cost_per_kg - benchmark_cost_per_kg) / benchmark_cost_per_kg * 100))
@@ -253,8 +351,8 @@ class AnalyticsService:
         
         # Fertilizer (should be ~25% of total)
         fert_pct = (cost_breakdown.get('Pupuk', 0) / total_cost * 100) if total_cost > 0 else 0
-        if fert_pct > 30:
-            saving = cost_breakdown.get('Pupuk', 0) * 0.15  # 15% savings potential
+        if fert_pct > rules['Pupuk'][0]:
+            saving = cost_breakdown.get('Pupuk', 0) * rules['Pupuk'][1]  # 15% savings potential
             opportunities.append({
                 'category': 'Pupuk',
                 'issue': f'Biaya pupuk tinggi ({fert_pct:.0f}% dari total)',
@@ -269,8 +367,8 @@ class AnalyticsService:
         
         # Pesticide (should be ~15% of total)
         pest_pct = (cost_breakdown.get('Pestisida', 0) / total_cost * 100) if total_cost > 0 else 0
-        if pest_pct > 20:
-            saving = cost_breakdown.get('Pestisida', 0) * 0.20  # 20% savings potential
+        if pest_pct > rules['Pestisida'][0]:
+            saving = cost_breakdown.get('Pestisida', 0) * rules['Pestisida'][1]  # 20% savings potential
             opportunities.append({
                 'category': 'Pestisida',
                 'issue': f'Biaya pestisida tinggi ({pest_pct:.0f}% dari total)',
@@ -285,8 +383,8 @@ class AnalyticsService:
         
         # Labor (should be ~20% of total)
         labor_pct = (cost_breakdown.get('Tenaga Kerja', 0) / total_cost * 100) if total_cost > 0 else 0
-        if labor_pct > 25:
-            saving = cost_breakdown.get('Tenaga Kerja', 0) * 0.10  # 10% savings potential
+        if labor_pct > rules['Tenaga Kerja'][0]:
+            saving = cost_breakdown.get('Tenaga Kerja', 0) * rules['Tenaga Kerja'][1]  # 10% savings potential
             opportunities.append({
                 'category': 'Tenaga Kerja',
                 'issue': f'Biaya tenaga kerja tinggi ({labor_pct:.0f}% dari total)',
@@ -300,18 +398,60 @@ class AnalyticsService:
             total_savings += saving
         
         return {
-            'efficiency_score': round(efficiency_score, 0),
-            'cost_per_kg': round(cost_per_kg, 0),
+            'efficiency_score': None if efficiency_score is None else round(efficiency_score, 0),
+            'cost_per_kg': None if cost_per_kg is None else round(cost_per_kg, 0),
             'benchmark_cost_per_kg': benchmark_cost_per_kg,
             'total_savings_potential': round(total_savings, 0),
             'opportunities': opportunities,
             'overall_assessment': AnalyticsService._get_efficiency_assessment(efficiency_score)
         }
     
+    @staticmethod
+    def analyze_farmer_cost_efficiency(farmer_name, season=None):
+        """
+        Cost efficiency from a farmer's journaled costs
+        
+        Breakdown comes from the cost summary table, yield from recorded
+        harvests; both are scaled per hectare before scoring.
+        
+        Args:
+            farmer_name: Farmer name as recorded in the journal
+            season: Season label (e.g. '2024-MH'), default latest with costs
+        
+        Returns:
+            dict like analyze_cost_efficiency plus season, cost_breakdown
+            and cost_rank (percentile among farmers that season), or None
+            when the farmer has no journaled costs
+        """
+        scores = CostAnalyticsService.score_farmers(season)
+        if scores.empty:
+            return None
+        rows = scores[scores['farmer_name'] == farmer_name]
+        if rows.empty:
+            return None
+        # Latest season chronologically ('2024-MH' is after '2024-MK')
+        row = rows.loc[rows['season'].map(season_ordinal).idxmax()]
+        
+        land = row['land_area'] if pd.notna(row['land_area']) and row['land_area'] > 0 else 1.0
+        cost_breakdown = {
+            category: row[category] / land for category in CostAnalyticsService.categories()
+        }
+        
+        analysis = AnalyticsService.analyze_cost_efficiency(
+            row['cost_ha'], cost_breakdown, row['yield_ton_ha']
+        )
+        analysis['season'] = row['season']
+        analysis['cost_breakdown'] = cost_breakdown
+        analysis['yield_ton_ha'] = row['yield_ton_ha'] if pd.notna(row['yield_ton_ha']) else 0.0
+        analysis['cost_rank'] = None if pd.isna(row['cost_rank']) else round(row['cost_rank'], 0)
+        return analysis
+    
     @staticmethod
     def _get_efficiency_assessment(score):
         """Get efficiency assessment"""
-        if score >= 90:
+        if score is None:
+            return {'level': 'Belum Dinilai', 'color': '#95A5A6', 'message': 'Belum ada panen tercatat - biaya per kg belum bisa dihitung'}
+        elif score >= 90:
             return {'level': 'Excellent', 'color': '#2ECC71', 'message': 'Efisiensi biaya sangat baik!'}
         elif score >= 75:
             return {'level': 'Good', 'color': '#3498DB', 'message': 'Efisiensi biaya baik, ada ruang untuk perbaikan'}
@@ -322,40 +462,63 @@ class AnalyticsService:
     
     # ===== BENCHMARKING =====
     
+    # Fallback when a segment has too few recorded seasons
+    DEFAULT_BENCHMARKS = {
+        'yield': {'p25': 8, 'p50': 10, 'p75': 12, 'p90': 14},  # ton/ha
+        'cost': {'p25': 40000000, 'p50': 50000000, 'p75': 60000000, 'p90': 70000000},  # Rp/ha
+        'roi': {'p25': 80, 'p50': 100, 'p75': 120, 'p90': 150}  # %
+    }
+    
     @staticmethod
-    def calculate_benchmarks(farmer_data):
+    def calculate_benchmarks(farmer_data, region=None, scenario=None):
         """
         Calculate performance benchmarks
         
+        Percentiles come from recorded farmer-seasons (harvests and
+        profiles) in the selected segment. Segments with too few seasons
+        use the default benchmark table.
+        
         Args:
             farmer_data: Dict with yield, cost, roi
+            region: Farm location to compare against (None = all)
+            scenario: RAB scenario to compare against (None = all)
         
         Returns:
             dict with benchmark comparison
         """
-        # Simulated benchmark data (in real app, aggregate from all farmers)
-        benchmarks = {
-            'yield': {'p25': 8, 'p50': 10, 'p75': 12, 'p90': 14},  # ton/ha
-            'cost': {'p25': 40000000, 'p50': 50000000, 'p75': 60000000, 'p90': 70000000},  # Rp/ha
-            'roi': {'p25': 80, 'p50': 100, 'p75': 120, 'p90': 150}  # %
-        }
-        
-        # Calculate percentiles
-        yield_percentile = AnalyticsService._calculate_percentile(
-            farmer_data.get('yield', 10),
-            benchmarks['yield']
-        )
-        
-        cost_percentile = AnalyticsService._calculate_percentile(
-            farmer_data.get('cost', 50000000),
-            benchmarks['cost'],
-            lower_is_better=True
-        )
-        
-        roi_percentile = AnalyticsService._calculate_percentile(
-            farmer_data.get('roi', 100),
-            benchmarks['roi']
-        )
+        data_benchmarks = BenchmarkService.get_benchmarks(region, scenario) or {}
+        
+        benchmarks = {}
+        percentiles = {}
+        sources = {}
+        for metric, default in (('yield', 10), ('cost', 50000000), ('roi', 100)):
+            value = farmer_data.get(metric, default)
+            if data_benchmarks.get(metric) is not None:
+                # Per metric: e.g. cost may be missing when no costs were recorded
+                benchmarks[metric] = data_benchmarks[metric]
+                percentiles[metric] = round(BenchmarkService.percentile_rank(
+                    metric, value, region, scenario, sync=False
+                ), 0)
+                sources[metric] = 'data'
+            else:
+                benchmarks[metric] = AnalyticsService.DEFAULT_BENCHMARKS[metric]
+                percentiles[metric] = AnalyticsService._calculate_percentile(
+                    value,
+                    benchmarks[metric],
+                    lower_is_better=(metric == 'cost')
+                )
+                sources[metric] = 'default'
+        
+        yield_percentile = percentiles['yield']
+        cost_percentile = percentiles['cost']
+        roi_percentile = percentiles['roi']
+        
+        if all(source == 'data' for source in sources.values()):
+            source = 'data'
+        elif any(source == 'data' for source in sources.values()):
+            source = 'mixed'
+        else:
+            source = 'default'
         
         # Overall rank (average of percentiles)
         overall_rank = (yield_percentile + cost_percentile + roi_percentile) / 3
@@ -366,6 +529,9 @@ class AnalyticsService:
             'cost_percentile': cost_percentile,
             'roi_percentile': roi_percentile,
             'benchmarks': benchmarks,
+            'source': source,
+            'sources': sources,
+            'sample_size': data_benchmarks.get('sample_size', {}),
             'comparison': AnalyticsService._get_benchmark_comparison(farmer_data, benchmarks),
             'best_practices': AnalyticsService._get_best_practices(overall_rank)
         }
@@ -523,6 +689,74 @@ class AnalyticsService:
             'insights': AnalyticsService._get_trend_insights(yield_growth, cost_growth, roi_growth)
         }
     
+    @staticmethod
+    def analyze_farmer_trends(farmer_name):
+        """
+        Analyze trends from a farmer's recorded seasons
+        
+        Uses the stored per-season aggregates (harvests + journal costs)
+        kept up to date by SeasonalTrendService.
+        
+        Args:
+            farmer_name: Farmer name as recorded in harvests
+        
+        Returns:
+            dict with trend analysis (same keys as analyze_seasonal_trends,
+            plus cagr, volatility, slope and r2 per trend)
+        """
+        trends = SeasonalTrendService.get_trends(farmer_name)
+        
+        if trends.empty or trends['seasons'].iloc[0] < 2:
+            return {
+                'insufficient_data': True,
+                'message': 'Minimal 2 musim tanam tercatat (sudah selesai) diperlukan untuk analisis trend'
+            }
+        
+        row = trends.iloc[0]
+        
+        def value(column):
+            v = row[column]
+            return None if v is None or pd.isna(v) else float(v)
+        
+        def trend(metric, higher_is_better):
+            # YoY growth; CAGR when the same season a year earlier is missing
+            growth = value(f'{metric}_yoy_pct')
+            if growth is None:
+                growth = value(f'{metric}_cagr_pct') or 0.0
+            good = growth > 0 if higher_is_better else growth <= 0
+            return {
+                'growth': round(growth, 1),
+                'direction': 'up' if growth > 0 else 'down',
+                'icon': '↗' if growth > 0 else '↘',
+                'color': '#2ECC71' if good else '#E74C3C',
+                'cagr': value(f'{metric}_cagr_pct'),
+                'volatility': value(f'{metric}_volatility_pct'),
+                'slope': value(f'{metric}_slope'),
+                'r2': value(f'{metric}_r2')
+            }
+        
+        yield_trend = trend('yield', True)
+        cost_trend = trend('cost', False)
+        roi_trend = trend('roi', True)
+        
+        return {
+            'insufficient_data': False,
+            'seasons_count': int(row['seasons']),
+            'first_season': row['first_season'],
+            'latest_season': row['latest_season'],
+            'yield_trend': yield_trend,
+            'cost_trend': cost_trend,
+            'roi_trend': roi_trend,
+            'forecast': {
+                'yield': round(value('yield_forecast') or 0.0, 1),
+                'cost': round(value('cost_forecast') or 0.0, 0),
+                'roi': round(value('roi_forecast') or 0.0, 1)
+            },
+            'insights': AnalyticsService._get_trend_insights(
+                yield_trend['growth'], cost_trend['growth'], roi_trend['growth']
+            )
+        }
+    
     @staticmethod
     def _get_trend_insights(yield_growth, cost_growth, roi_growth):
         """Generate trend insights"""
@@ -0,0 +1,513 @@
+"""
+Benchmark Service
+Per-farmer, per-season yield/cost/ROI benchmarks kept in mergeable quantile sketches
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.cost_analytics_service import CostAnalyticsService
+from services.database_service import DatabaseService
+from utils.quantile_sketch import KLLSketch
+
+
+def season_of(day):
+    """
+    Growing season of a date
+
+    MH (musim hujan) runs October-March and is labelled with the year it
+    starts in; MK (musim kemarau) runs April-September.
+    """
+    day = pd.Timestamp(day)
+    if day.month >= 10:
+        return f"{day.year}-MH"
+    if day.month <= 3:
+        return f"{day.year - 1}-MH"
+    return f"{day.year}-MK"
+
+
+def season_bounds(season):
+    """(first day, last day) of a season label"""
+    year, kind = season.split('-')
+    year = int(year)
+    if kind == 'MH':
+        return date(year, 10, 1), date(year + 1, 3, 31)
+    return date(year, 4, 1), date(year, 9, 30)
+
+
+def season_ordinal(season):
+    """Consecutive integer per season: 2024-MK -> 4048, 2024-MH -> 4049, 2025-MK -> 4050"""
+    year, kind = season.split('-')
+    return int(year) * 2 + (1 if kind == 'MH' else 0)
+
+
+def season_label(ordinal):
+    """Inverse of season_ordinal"""
+    year, half = divmod(int(ordinal), 2)
+    return f"{year}-{'MH' if half else 'MK'}"
+
+
+class BenchmarkService:
+
+    # Metric -> higher is better
+    METRICS = {'yield': True, 'cost': False, 'roi': True}
+
+    # Metric -> benchmark_seasons column (yield ton/ha, cost Rp/ha, ROI %)
+    COLUMNS = {'yield': 'yield_ton_ha', 'cost': 'cost_ha', 'roi': 'roi_pct'}
+
+    QUANTILES = {'p25': 0.25, 'p50': 0.5, 'p75': 0.75, 'p90': 0.9}
+
+    # Below this many farmer-seasons a segment falls back to default benchmarks
+    MIN_SAMPLES = 5
+
+    SKETCH_K = 200
+
+    # A season closes once a later season starts for the farmer, or this
+    # many days after it ends (late harvests)
+    CLOSE_AFTER_DAYS = 30
+
+    UNKNOWN = 'unknown'
+
+    # Closed-season sketches per (metric, region, scenario) cell; larger
+    # segments are merged from cells on demand
+    _sketches = {}
+    _merged = {}
+    _loaded = False
+    _lock = threading.RLock()
+
+    @staticmethod
+    def _connect():
+        conn = sqlite3.connect(DatabaseService.DB_PATH)
+        BenchmarkService._ensure_tables(conn)
+        return conn
+
+    @staticmethod
+    def _ensure_tables(conn):
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS benchmark_seasons (
+                farmer_name TEXT NOT NULL,
+                season TEXT NOT NULL,
+                region TEXT,
+                scenario TEXT,
+                land_area REAL,
+                harvest_kg REAL DEFAULT 0,
+                revenue REAL DEFAULT 0,
+                first_date TEXT,
+                last_date TEXT,
+                closed INTEGER DEFAULT 0,
+                yield_ton_ha REAL,
+                cost_ha REAL,
+                roi_pct REAL,
+                PRIMARY KEY (farmer_name, season)
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS benchmark_sketches (
+                metric TEXT NOT NULL,
+                region TEXT NOT NULL,
+                scenario TEXT NOT NULL,
+                state TEXT,
+                PRIMARY KEY (metric, region, scenario)
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS benchmark_state (
+                key TEXT PRIMARY KEY,
+                value INTEGER
+            )
+        ''')
+
+    @staticmethod
+    def _get_state(conn, key):
+        row = conn.execute("SELECT value FROM benchmark_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _set_state(conn, key, value):
+        conn.execute(
+            "INSERT INTO benchmark_state (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, int(value))
+        )
+
+    @staticmethod
+    def _load_sketches(conn):
+        with BenchmarkService._lock:
+            if BenchmarkService._loaded:
+                return
+            for metric, region, scenario, state in conn.execute(
+                "SELECT metric, region, scenario, state FROM benchmark_sketches"
+            ):
+                BenchmarkService._sketches[(metric, region, scenario)] = KLLSketch.from_dict(json.loads(state))
+            BenchmarkService._loaded = True
+
+    # ===== INCREMENTAL UPDATES =====
+
+    @staticmethod
+    def sync():
+        """
+        Fold harvests inserted since the last sync into season aggregates
+
+        Only rows with id above the stored watermark are read. Seasons
+        that closed are scored and added to the sketches. Deleted or
+        replaced harvests (count below the watermark changed) trigger a
+        full rebuild.
+
+        Returns:
+            Number of harvests processed
+        """
+        with BenchmarkService._lock:
+            conn = BenchmarkService._connect()
+            try:
+                BenchmarkService._load_sketches(conn)
+                last_id = BenchmarkService._get_state(conn, 'last_harvest_id')
+                processed = BenchmarkService._get_state(conn, 'harvest_count')
+
+                seen = conn.execute("SELECT COUNT(*) FROM harvests WHERE id <= ?", (last_id,)).fetchone()[0]
+                if seen != processed:
+                    conn.close()
+                    return BenchmarkService.rebuild()
+
+                new = pd.read_sql_query(
+                    "SELECT id, farmer_name, farm_location, date, weight_kg, total_value "
+                    "FROM harvests WHERE id > ? ORDER BY id",
+                    conn,
+                    params=(last_id,)
+                )
+                reopened = False
+                if not new.empty:
+                    reopened = BenchmarkService._add_harvests(conn, new)
+                    BenchmarkService._set_state(conn, 'last_harvest_id', new['id'].max())
+                    BenchmarkService._set_state(conn, 'harvest_count', processed + len(new))
+
+                BenchmarkService._close_seasons(conn)
+                conn.commit()
+            finally:
+                conn.close()
+
+        if reopened:
+            # A harvest landed in an already scored season; sketches can't un-add
+            return BenchmarkService.rebuild()
+        return len(new)
+
+    @staticmethod
+    def _add_harvests(conn, harvests):
+        """Upsert per-(farmer, season) totals; returns True if a closed season changed"""
+        # Plain dict fold: batches are usually one harvest (pandas groupby costs ~30 ms)
+        totals = {}
+        for row in harvests.dropna(subset=['date']).itertuples(index=False):
+            key = (row.farmer_name, season_of(row.date))
+            total = totals.setdefault(key, {
+                'farm_location': row.farm_location,
+                'harvest_kg': 0.0,
+                'revenue': 0.0,
+                'first_date': row.date,
+                'last_date': row.date
+            })
+            total['farm_location'] = row.farm_location or total['farm_location']
+            total['harvest_kg'] += float(row.weight_kg) if pd.notna(row.weight_kg) else 0.0
+            total['revenue'] += float(row.total_value) if pd.notna(row.total_value) else 0.0
+            total['first_date'] = min(total['first_date'], row.date)
+            total['last_date'] = max(total['last_date'], row.date)
+        if not totals:
+            return False
+
+        farmers = sorted({farmer for farmer, _ in totals})
+        profiles = BenchmarkService._profiles(conn, farmers)
+        closed = set(conn.execute(
+            f"SELECT farmer_name, season FROM benchmark_seasons WHERE closed = 1 AND farmer_name IN ({','.join('?' * len(farmers))})",
+            farmers
+        ).fetchall())
+        reopened = any(key in closed for key in totals)
+
+        for (farmer, season), total in totals.items():
+            profile = profiles.get(farmer, {})
+            conn.execute('''
+                INSERT INTO benchmark_seasons (
+                    farmer_name, season, region, scenario, land_area,
+                    harvest_kg, revenue, first_date, last_date
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(farmer_name, season) DO UPDATE SET
+                    harvest_kg = harvest_kg + excluded.harvest_kg,
+                    revenue = revenue + excluded.revenue,
+                    first_date = MIN(first_date, excluded.first_date),
+                    last_date = MAX(last_date, excluded.last_date),
+                    region = excluded.region,
+                    scenario = excluded.scenario,
+                    land_area = excluded.land_area
+            ''', (
+                farmer,
+                season,
+                profile.get('farm_location') or total['farm_location'] or BenchmarkService.UNKNOWN,
+                profile.get('scenario') or BenchmarkService.UNKNOWN,
+                profile.get('land_area') or 1.0,
+                total['harvest_kg'],
+                total['revenue'],
+                total['first_date'],
+                total['last_date']
+            ))
+
+        return reopened
+
+    @staticmethod
+    def _profiles(conn, farmer_names):
+        names = list(farmer_names)
+        if not names:
+            return {}
+        df = pd.read_sql_query(
+            f"SELECT * FROM user_profiles WHERE farmer_name IN ({','.join('?' * len(names))})",
+            conn,
+            params=names
+        )
+        return {row['farmer_name']: row for row in df.to_dict('records')}
+
+    @staticmethod
+    def _season_metrics(conn, seasons):
+        """
+        Yield (ton/ha), cost (Rp/ha) and ROI (%) for season rows
+
+        Cost is the farmer's journal spending inside the season window
+        (from the cost_summary table), or the profile's total_investment
+        when no costs were journaled.
+        """
+        if seasons.empty:
+            return seasons
+
+        farmers = list(seasons['farmer_name'].unique())
+        journal = CostAnalyticsService.season_costs(conn, farmers)
+
+        profiles = BenchmarkService._profiles(conn, farmers)
+        investment = seasons['farmer_name'].map(
+            lambda f: (profiles.get(f) or {}).get('total_investment') or 0
+        ).astype(float).values
+        spent = np.array([
+            journal.get((f, season), 0) for f, season in zip(seasons['farmer_name'], seasons['season'])
+        ], dtype=float)
+
+        cost = np.where(spent > 0, spent, investment)
+        land = seasons['land_area'].fillna(1.0).clip(lower=0.01).values
+        with np.errstate(divide='ignore', invalid='ignore'):
+            roi = np.where(cost > 0, (seasons['revenue'].values - cost) / cost * 100, np.nan)
+
+        return seasons.assign(
+            yield_ton_ha=seasons['harvest_kg'].values / land / 1000,
+            cost_ha=np.where(cost > 0, cost / land, np.nan),
+            roi_pct=roi
+        )
+
+    @staticmethod
+    def _close_seasons(conn, today=None):
+        """Score and sketch seasons superseded by a later one or long finished"""
+        today = today or date.today()
+        open_seasons = pd.read_sql_query(
+            "SELECT * FROM benchmark_seasons WHERE closed = 0", conn
+        )
+        if open_seasons.empty:
+            return 0
+
+        all_seasons = pd.read_sql_query("SELECT farmer_name, season FROM benchmark_seasons", conn)
+        # Compare ordinals, not labels: "2024-MH" (Oct-Mar) comes after "2024-MK" (Apr-Sep)
+        latest = all_seasons['season'].map(season_ordinal).groupby(all_seasons['farmer_name']).max()
+        superseded = open_seasons['season'].map(season_ordinal) < open_seasons['farmer_name'].map(latest)
+        finished = open_seasons['season'].map(
+            lambda s: season_bounds(s)[1] + timedelta(days=BenchmarkService.CLOSE_AFTER_DAYS) < today
+        )
+        to_close = open_seasons[superseded | finished]
+        if to_close.empty:
+            return 0
+
+        scored = BenchmarkService._season_metrics(conn, to_close)
+        touched = set()
+        for row in scored.to_dict('records'):
+            values = {metric: row[column] for metric, column in BenchmarkService.COLUMNS.items()}
+            conn.execute(
+                "UPDATE benchmark_seasons SET closed = 1, yield_ton_ha = ?, cost_ha = ?, roi_pct = ? "
+                "WHERE farmer_name = ? AND season = ?",
+                tuple(None if np.isnan(values[m]) else float(values[m]) for m in ('yield', 'cost', 'roi'))
+                + (row['farmer_name'], row['season'])
+            )
+            for metric, value in values.items():
+                if np.isnan(value):
+                    continue
+                key = (metric, row['region'], row['scenario'])
+                sketch = BenchmarkService._sketches.setdefault(key, KLLSketch(BenchmarkService.SKETCH_K))
+                sketch.update(value)
+                touched.add(key)
+
+        for key in touched:
+            conn.execute(
+                "INSERT INTO benchmark_sketches (metric, region, scenario, state) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(metric, region, scenario) DO UPDATE SET state = excluded.state",
+                key + (json.dumps(BenchmarkService._sketches[key].to_dict()),)
+            )
+        BenchmarkService._merged.clear()
+        return len(to_close)
+
+    @staticmethod
+    def rebuild():
+        """Recompute all season aggregates and sketches from the harvests table"""
+        with BenchmarkService._lock:
+            conn = BenchmarkService._connect()
+            try:
+                conn.execute("DELETE FROM benchmark_seasons")
+                conn.execute("DELETE FROM benchmark_sketches")
+                conn.execute("DELETE FROM benchmark_state")
+                conn.commit()
+            finally:
+                conn.close()
+            BenchmarkService._sketches.clear()
+            BenchmarkService._merged.clear()
+            BenchmarkService._loaded = False
+            return BenchmarkService.sync()
+
+    # ===== QUERIES =====
+
+    @staticmethod
+    def _matches(value, wanted):
+        if wanted is None:
+            return True
+        if isinstance(wanted, (list, tuple, set)):
+            return value in wanted
+        return value == wanted
+
+    @staticmethod
+    def get_sketch(metric, region=None, scenario=None):
+        """
+        Closed-season sketch for a segment (merged from cells, cached)
+
+        Args:
+            metric: 'yield', 'cost' or 'roi'
+            region, scenario: Value, list of values, or None for all
+        """
+        cache_key = (
+            metric,
+            tuple(region) if isinstance(region, (list, tuple, set)) else region,
+            tuple(scenario) if isinstance(scenario, (list, tuple, set)) else scenario
+        )
+        with BenchmarkService._lock:
+            merged = BenchmarkService._merged.get(cache_key)
+            if merged is None:
+                merged = KLLSketch(BenchmarkService.SKETCH_K)
+                for (m, r, s), sketch in BenchmarkService._sketches.items():
+                    if m == metric and BenchmarkService._matches(r, region) and BenchmarkService._matches(s, scenario):
+                        merged.merge(sketch)
+                BenchmarkService._merged[cache_key] = merged
+            return merged
+
+    @staticmethod
+    def _open_scores(region=None, scenario=None):
+        """Exact metrics of seasons still in progress (few rows: one per active farmer)"""
+        conn = BenchmarkService._connect()
+        try:
+            scored = BenchmarkService._season_metrics(
+                conn, pd.read_sql_query("SELECT * FROM benchmark_seasons WHERE closed = 0", conn)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        if scored.empty:
+            return scored
+        mask = scored['region'].map(lambda r: BenchmarkService._matches(r, region)) & \
+            scored['scenario'].map(lambda s: BenchmarkService._matches(s, scenario))
+        return scored[mask]
+
+    @staticmethod
+    def _segment_values(metric, open_scores):
+        if open_scores.empty:
+            return np.array([])
+        values = open_scores[BenchmarkService.COLUMNS[metric]].values.astype(float)
+        return values[~np.isnan(values)]
+
+    @staticmethod
+    def percentile_rank(metric, value, region=None, scenario=None, sync=True):
+        """
+        Share of farmer-seasons that `value` beats (0-100)
+
+        Closed seasons come from the sketch (O(log k) lookup), seasons
+        in progress are counted exactly. For cost, lower is better, so a
+        low cost gets a high rank.
+
+        Returns:
+            Rank, or None when the segment has fewer than MIN_SAMPLES
+        """
+        if sync:
+            BenchmarkService.sync()
+        sketch = BenchmarkService.get_sketch(metric, region, scenario)
+        open_values = BenchmarkService._segment_values(metric, BenchmarkService._open_scores(region, scenario))
+        n = sketch.n + len(open_values)
+        if n < BenchmarkService.MIN_SAMPLES:
+            return None
+
+        below = sketch.rank(value, inclusive=False) + np.count_nonzero(open_values < value)
+        at_or_below = sketch.rank(value) + np.count_nonzero(open_values <= value)
+        share = (below + at_or_below) / 2 / n * 100
+        return float(share if BenchmarkService.METRICS[metric] else 100 - share)
+
+    @staticmethod
+    def get_benchmarks(region=None, scenario=None, sync=True):
+        """
+        Quartiles per metric for a segment
+
+        Returns:
+            dict metric -> {p25, p50, p75, p90} (None for a metric with
+            fewer than MIN_SAMPLES seasons), plus sample_size per metric;
+            None when no metric has enough seasons
+        """
+        if sync:
+            BenchmarkService.sync()
+        open_scores = BenchmarkService._open_scores(region, scenario)
+        result = {'sample_size': {}}
+        for metric in BenchmarkService.METRICS:
+            sketch = BenchmarkService.get_sketch(metric, region, scenario)
+            open_values = BenchmarkService._segment_values(metric, open_scores)
+            if len(open_values):
+                sketch = sketch.copy()
+                sketch.update_many(open_values)
+            result['sample_size'][metric] = sketch.n
+            result[metric] = None if sketch.n < BenchmarkService.MIN_SAMPLES else {
+                name: sketch.quantile(q) for name, q in BenchmarkService.QUANTILES.items()
+            }
+        if all(result[metric] is None for metric in BenchmarkService.METRICS):
+            return None
+        return result
+
+    @staticmethod
+    def get_segments():
+        """Regions and scenarios that have scored seasons"""
+        BenchmarkService.sync()
+        regions = sorted({r for _, r, _ in BenchmarkService._sketches})
+        scenarios = sorted({s for _, _, s in BenchmarkService._sketches})
+        return {'regions': regions, 'scenarios': scenarios}
+
+    @staticmethod
+    def get_farmer_seasons(farmer_name):
+        """
+        A farmer's seasons with yield_ton_ha, cost_ha and roi_pct
+
+        Returns:
+            DataFrame sorted by season
+        """
+        BenchmarkService.sync()
+        conn = BenchmarkService._connect()
+        try:
+            seasons = pd.read_sql_query(
+                "SELECT * FROM benchmark_seasons WHERE farmer_name = ?",
+                conn,
+                params=(farmer_name,)
+            )
+            seasons = seasons.iloc[np.argsort(seasons['season'].map(season_ordinal).values, kind='stable')]
+            seasons = seasons.reset_index(drop=True)
+            scored = BenchmarkService._season_metrics(conn, seasons)
+            conn.commit()
+            return scored
+        finally:
+            conn.close()
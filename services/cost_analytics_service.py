@@ -0,0 +1,327 @@
+"""
+Cost Analytics Service
+Journal costs per farmer, season and category kept in an incrementally maintained summary table
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.database_service import DatabaseService
+
+# Season of a journal date in SQL (same rule as benchmark_service.season_of)
+SEASON_SQL = """
+    CASE
+        WHEN CAST(substr(date, 6, 2) AS INTEGER) >= 10 THEN substr(date, 1, 4) || '-MH'
+        WHEN CAST(substr(date, 6, 2) AS INTEGER) <= 3 THEN (CAST(substr(date, 1, 4) AS INTEGER) - 1) || '-MH'
+        ELSE substr(date, 1, 4) || '-MK'
+    END
+"""
+
+# Only rows with a YYYY-MM date can be placed in a season
+VALID_DATE_SQL = "date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]*'"
+
+
+class CostAnalyticsService:
+
+    # Cost category -> activity_type keywords (matched case-insensitively)
+    COST_CATEGORIES = {
+        'Pupuk': ['Pemupukan', 'Pupuk'],
+        'Pestisida': ['Penyemprotan', 'Pestisida'],
+        'Tenaga Kerja': ['Penyiangan', 'Pemangkasan', 'Panen', 'Tenaga Kerja'],
+        'Penyiraman': ['Penyiraman']
+    }
+    OTHER = 'Lain-lain'
+
+    # Category -> (max share of total cost in %, savings potential when above)
+    COST_RULES = {
+        'Pupuk': (30, 0.15),
+        'Pestisida': (20, 0.20),
+        'Tenaga Kerja': (25, 0.10)
+    }
+
+    BENCHMARK_COST_PER_KG = 15000  # Rp/kg (industry average)
+
+    _lock = threading.RLock()
+
+    @staticmethod
+    def _category_sql():
+        cases = []
+        for category, keywords in CostAnalyticsService.COST_CATEGORIES.items():
+            match = ' OR '.join(f"activity_type LIKE '%{keyword}%'" for keyword in keywords)
+            cases.append(f"WHEN {match} THEN '{category}'")
+        return f"CASE {' '.join(cases)} ELSE '{CostAnalyticsService.OTHER}' END"
+
+    @staticmethod
+    def categories():
+        return list(CostAnalyticsService.COST_CATEGORIES) + [CostAnalyticsService.OTHER]
+
+    @staticmethod
+    def _ensure_tables(conn):
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS cost_summary (
+                farmer_name TEXT NOT NULL,
+                season TEXT NOT NULL,
+                category TEXT NOT NULL,
+                total_cost REAL DEFAULT 0,
+                entries INTEGER DEFAULT 0,
+                PRIMARY KEY (farmer_name, season, category)
+            )
+        ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cost_summary_season ON cost_summary (season, category)")
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS cost_summary_state (
+                key TEXT PRIMARY KEY,
+                value INTEGER
+            )
+        ''')
+
+    @staticmethod
+    def _connect():
+        conn = sqlite3.connect(DatabaseService.DB_PATH)
+        CostAnalyticsService._ensure_tables(conn)
+        return conn
+
+    @staticmethod
+    def _get_state(conn, key):
+        row = conn.execute("SELECT value FROM cost_summary_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _set_state(conn, key, value):
+        conn.execute(
+            "INSERT INTO cost_summary_state (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, int(value))
+        )
+
+    # ===== INCREMENTAL UPDATES =====
+
+    @staticmethod
+    def sync(conn=None):
+        """
+        Fold journal entries added since the last sync into cost_summary
+
+        Aggregation runs entirely in SQLite (INSERT ... SELECT ... GROUP BY
+        with an upsert), reading only rows above the stored id watermark.
+        Deleted or replaced entries (count below the watermark changed)
+        trigger a full rebuild of the summary.
+
+        Args:
+            conn: Existing connection to reuse (the caller commits);
+                default opens and commits its own
+
+        Returns:
+            Number of journal entries processed
+        """
+        own = conn is None
+        with CostAnalyticsService._lock:
+            if own:
+                conn = CostAnalyticsService._connect()
+            else:
+                CostAnalyticsService._ensure_tables(conn)
+            try:
+                last_id = CostAnalyticsService._get_state(conn, 'last_journal_id')
+                processed = CostAnalyticsService._get_state(conn, 'journal_count')
+                seen = conn.execute("SELECT COUNT(*) FROM journal_entries WHERE id <= ?", (last_id,)).fetchone()[0]
+                if seen != processed:
+                    conn.execute("DELETE FROM cost_summary")
+                    last_id = processed = 0
+
+                new_max, new_count = conn.execute(
+                    "SELECT MAX(id), COUNT(*) FROM journal_entries WHERE id > ?", (last_id,)
+                ).fetchone()
+                if new_count:
+                    conn.execute(f'''
+                        INSERT INTO cost_summary (farmer_name, season, category, total_cost, entries)
+                        SELECT farmer_name, {SEASON_SQL}, {CostAnalyticsService._category_sql()},
+                               TOTAL(cost), COUNT(*)
+                        FROM journal_entries
+                        WHERE id > ? AND id <= ? AND {VALID_DATE_SQL}
+                        GROUP BY 1, 2, 3
+                        ON CONFLICT(farmer_name, season, category) DO UPDATE SET
+                            total_cost = total_cost + excluded.total_cost,
+                            entries = entries + excluded.entries
+                    ''', (last_id, new_max))
+                    CostAnalyticsService._set_state(conn, 'last_journal_id', new_max)
+                    CostAnalyticsService._set_state(conn, 'journal_count', processed + new_count)
+                if own:
+                    conn.commit()
+            finally:
+                if own:
+                    conn.close()
+        return new_count
+
+    @staticmethod
+    def rebuild():
+        """Recompute cost_summary from the whole journal"""
+        with CostAnalyticsService._lock:
+            conn = CostAnalyticsService._connect()
+            try:
+                conn.execute("DELETE FROM cost_summary")
+                conn.execute("DELETE FROM cost_summary_state")
+                conn.commit()
+            finally:
+                conn.close()
+            return CostAnalyticsService.sync()
+
+    # ===== QUERIES =====
+
+    @staticmethod
+    def season_costs(conn, farmers=None):
+        """
+        Total journal cost per (farmer, season) from the summary table
+
+        Args:
+            conn: Open connection (summary is synced on it first)
+            farmers: Restrict to these farmers (default: all)
+
+        Returns:
+            Series indexed by (farmer_name, season)
+        """
+        CostAnalyticsService.sync(conn)
+        query = "SELECT farmer_name, season, SUM(total_cost) AS cost FROM cost_summary"
+        params = []
+        if farmers is not None:
+            query += f" WHERE farmer_name IN ({','.join('?' * len(farmers))})"
+            params = list(farmers)
+        query += " GROUP BY farmer_name, season"
+        return pd.read_sql_query(query, conn, params=params).set_index(['farmer_name', 'season'])['cost']
+
+    @staticmethod
+    def get_breakdown(farmer_name=None, season=None, sync=True):
+        """
+        Costs per category, wide format
+
+        Args:
+            farmer_name, season: Filters (None = all)
+
+        Returns:
+            DataFrame with farmer_name, season, one column per category
+            and total_cost, seasons in chronological order
+        """
+        from services.benchmark_service import season_ordinal
+
+        if sync:
+            CostAnalyticsService.sync()
+        conn = CostAnalyticsService._connect()
+        try:
+            filters, params = [], []
+            if farmer_name is not None:
+                filters.append("farmer_name = ?")
+                params.append(farmer_name)
+            if season is not None:
+                filters.append("season = ?")
+                params.append(season)
+            where = f"WHERE {' AND '.join(filters)}" if filters else ""
+            long = pd.read_sql_query(
+                f"SELECT farmer_name, season, category, total_cost FROM cost_summary {where}", conn, params=params
+            )
+        finally:
+            conn.close()
+
+        categories = CostAnalyticsService.categories()
+        if long.empty:
+            return pd.DataFrame(columns=['farmer_name', 'season'] + categories + ['total_cost'])
+        wide = long.pivot_table(
+            index=['farmer_name', 'season'], columns='category', values='total_cost', aggfunc='sum', fill_value=0
+        ).reindex(columns=categories, fill_value=0)
+        wide['total_cost'] = wide.sum(axis=1)
+        wide.columns.name = None
+        wide = wide.reset_index()
+        # Chronological season order (string order puts 2024-MH before 2024-MK)
+        wide['_ordinal'] = wide['season'].map(season_ordinal)
+        return wide.sort_values(['farmer_name', '_ordinal']).drop(columns='_ordinal').reset_index(drop=True)
+
+    @staticmethod
+    def get_category_totals(season=None):
+        """Cooperative-wide cost per category (GROUP BY on the summary table)"""
+        CostAnalyticsService.sync()
+        conn = CostAnalyticsService._connect()
+        try:
+            where, params = ("WHERE season = ?", (season,)) if season else ("", ())
+            return pd.read_sql_query(
+                f"SELECT category, SUM(total_cost) AS total_cost, SUM(entries) AS entries, "
+                f"COUNT(DISTINCT farmer_name) AS farmers FROM cost_summary {where} "
+                f"GROUP BY category ORDER BY total_cost DESC",
+                conn,
+                params=params
+            )
+        finally:
+            conn.close()
+
+    @staticmethod
+    def get_seasons():
+        """Seasons with journaled costs, latest first"""
+        from services.benchmark_service import season_ordinal
+
+        CostAnalyticsService.sync()
+        conn = CostAnalyticsService._connect()
+        try:
+            seasons = [row[0] for row in conn.execute("SELECT DISTINCT season FROM cost_summary")]
+        finally:
+            conn.close()
+        return sorted(seasons, key=season_ordinal, reverse=True)
+
+    @staticmethod
+    def score_farmers(season=None):
+        """
+        Cost-efficiency scores for every farmer-season in one pass
+
+        Costs come from the summary table, harvest and land area from
+        the benchmark season aggregates. Scoring uses the same rules as
+        AnalyticsService.analyze_cost_efficiency, vectorized.
+
+        Args:
+            season: Restrict to one season (default: all)
+
+        Returns:
+            DataFrame per farmer-season: costs per category, total_cost,
+            harvest_kg, land_area, yield_ton_ha, cost_ha, cost_per_kg,
+            efficiency_score, <category>_pct, savings_potential and
+            cost_rank (percentile within the season, higher = cheaper)
+        """
+        from services.benchmark_service import BenchmarkService
+
+        BenchmarkService.sync()
+        breakdown = CostAnalyticsService.get_breakdown(season=season)
+        if breakdown.empty:
+            return breakdown
+
+        conn = CostAnalyticsService._connect()
+        try:
+            seasons = pd.read_sql_query(
+                "SELECT farmer_name, season, harvest_kg, land_area FROM benchmark_seasons", conn
+            )
+        finally:
+            conn.close()
+
+        df = breakdown.merge(seasons, on=['farmer_name', 'season'], how='left')
+        land = df['land_area'].fillna(1.0).clip(lower=0.01).values
+        harvest = df['harvest_kg'].fillna(0).values
+        total = df['total_cost'].values.astype(float)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cost_per_kg = np.where(harvest > 0, total / harvest, np.nan)
+            benchmark = CostAnalyticsService.BENCHMARK_COST_PER_KG
+            score = np.clip(200 - cost_per_kg / benchmark * 100, 0, 100)
+
+            savings = np.zeros(len(df))
+            for category, (max_pct, rate) in CostAnalyticsService.COST_RULES.items():
+                share = np.where(total > 0, df[category].values / total * 100, 0)
+                df[f"{category}_pct"] = share
+                savings += np.where(share > max_pct, df[category].values * rate, 0)
+
+        df['yield_ton_ha'] = harvest / land / 1000
+        df['cost_ha'] = total / land
+        df['cost_per_kg'] = cost_per_kg
+        df['efficiency_score'] = np.round(score, 0)
+        df['savings_potential'] = np.round(savings, 0)
+        df['cost_rank'] = (1 - df.groupby('season')['cost_per_kg'].rank(pct=True)) * 100
+        return df
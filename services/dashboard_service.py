@@ -5,11 +5,12 @@ Consolidate data from all modules for comprehensive dashboard
 
 from datetime import datetime
 import pandas as pd
+from services.phenology_service import PhenologyService
 
 class DashboardService:
     
     @staticmethod
-    def get_summary_metrics(planting_date=None, land_area=1.0, total_rab=50000000):
+    def get_summary_metrics(planting_date=None, land_area=1.0, total_rab=50000000, location=None):
         """
         Get summary metrics for dashboard
         
@@ -17,6 +18,9 @@ class DashboardService:
             planting_date: Date when planted
             land_area: Land area in hectares
             total_rab: Total RAB investment
+            location: Optional dict with lat, lon (and elevation/location_key);
+                when given, phase and yield follow growing degree days
+                instead of calendar HST
         
         Returns:
             dict with summary metrics
@@ -33,8 +37,22 @@ class DashboardService:
         else:
             hst = 0
         
+        # Thermal time: phase from accumulated GDD (cached per farm)
+        phenology = None
+        if location and planting_date:
+            phenology = PhenologyService.get_status_for(
+                planting_date,
+                location['lat'],
+                location['lon'],
+                location.get('elevation'),
+                location.get('location_key')
+            )
+        development_hst = phenology['thermal_hst'] if phenology else hst
+        
         # Determine phase
-        if hst < 22:
+        if phenology:
+            phase = phenology['phase']
+        elif hst < 22:
             phase = "Persemaian"
         elif hst < 61:
             phase = "Vegetatif"
@@ -46,11 +64,11 @@ class DashboardService:
             phase = "Selesai"
         
         # Estimate expected yield (ton/ha)
-        if hst < 110:
+        if development_hst < 110:
             expected_yield = 0
-        elif hst < 150:
+        elif development_hst < 150:
             # Linear growth from 110-150 HST
-            progress = (hst - 110) / 40
+            progress = (development_hst - 110) / 40
             expected_yield = 12 * progress  # Target 12 ton/ha
         else:
             expected_yield = 12
@@ -72,7 +90,11 @@ class DashboardService:
             'expected_yield': round(expected_yield, 1),
             'expected_revenue': round(expected_revenue, 0),
             'roi': round(roi, 1),
-            'cost_per_ha': round(total_rab / land_area, 0) if land_area > 0 else 0
+            'cost_per_ha': round(total_rab / land_area, 0) if land_area > 0 else 0,
+            'thermal_hst': phenology['thermal_hst'] if phenology else None,
+            'gdd': phenology['gdd'] if phenology else None,
+            'harvest_start_date': phenology['harvest_start_date'] if phenology else None,
+            'harvest_end_date': phenology['harvest_end_date'] if phenology else None
         }
     
     @staticmethod
@@ -83,6 +83,18 @@ class DatabaseService:
             )
         ''')
         
+        # RAB scenario per farmer (benchmark segmentation); added after v1.0
+        profile_columns = [row[1] for row in cursor.execute("PRAGMA table_info(user_profiles)")]
+        if 'scenario' not in profile_columns:
+            cursor.execute("ALTER TABLE user_profiles ADD COLUMN scenario TEXT")
+        
+        # Per-farmer lookups (reports, benchmarks)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_harvests_farmer_date ON harvests (farmer_name, date)")
+        # Covering index for per-farmer cost aggregation (no table lookups)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_journal_farmer_date ON journal_entries (farmer_name, date, activity_type, cost)"
+        )
+        
         # QR Products table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS qr_products (
@@ -134,6 +146,13 @@ class DatabaseService:
         harvest_id = cursor.lastrowid
         conn.close()
         
+        # Fold the new harvest into the season benchmarks
+        from services.benchmark_service import BenchmarkService
+        try:
+            BenchmarkService.sync()
+        except Exception:
+            pass  # benchmarks catch up on the next read
+        
         return harvest_id
     
     @staticmethod
@@ -234,6 +253,13 @@ class DatabaseService:
         entry_id = cursor.lastrowid
         conn.close()
         
+        # Fold the new entry into the cost summary
+        from services.cost_analytics_service import CostAnalyticsService
+        try:
+            CostAnalyticsService.sync()
+        except Exception:
+            pass  # summary catches up on the next read
+        
         return entry_id
     
     @staticmethod
@@ -273,6 +299,7 @@ class DatabaseService:
                     land_area = ?,
                     planting_date = ?,
                     total_investment = ?,
+                    scenario = COALESCE(?, scenario),
                     updated_at = CURRENT_TIMESTAMP
                 WHERE farmer_name = ?
             ''', (
@@ -280,20 +307,22 @@ class DatabaseService:
                 profile_data.get('land_area', 1.0),
                 profile_data.get('planting_date', ''),
                 profile_data.get('total_investment', 0),
+                profile_data.get('scenario'),
                 profile_data['farmer_name']
             ))
         else:
             # Insert
             cursor.execute('''
                 INSERT INTO user_profiles (
-                    farmer_name, farm_location, land_area, planting_date, total_investment
-                ) VALUES (?, ?, ?, ?, ?)
+                    farmer_name, farm_location, land_area, planting_date, total_investment, scenario
+                ) VALUES (?, ?, ?, ?, ?, ?)
             ''', (
                 profile_data['farmer_name'],
                 profile_data.get('farm_location', ''),
                 profile_data.get('land_area', 1.0),
                 profile_data.get('planting_date', ''),
-                profile_data.get('total_investment', 0)
+                profile_data.get('total_investment', 0),
+                profile_data.get('scenario')
             ))
         
         conn.commit()
@@ -0,0 +1,282 @@
+"""
+Disease Classifier Backends
+Pluggable CPU backends for DiseaseDetectionService (rule-based and histogram GBM)
+"""
+
+import os
+import sys
+import threading
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.image_processing import analyze_leaf_color, detect_spots
+from utils.synthetic_leaves import generate_corpus
+from data.disease_patterns import DISEASE_PATTERNS, get_disease_by_pattern
+
+# Images are reduced to this size before feature extraction
+FEATURE_SIZE = (128, 128)
+
+MODEL_DIR = "data/models"
+
+
+def _pattern_match(disease_name, confidence):
+    """Build a match dict in the same shape as get_disease_by_pattern"""
+    pattern = DISEASE_PATTERNS[disease_name]
+    return {
+        'disease': disease_name,
+        'confidence': round(float(confidence), 1),
+        'category': pattern['category'],
+        'severity': pattern['severity'],
+        'health_score_range': pattern['health_score_range'],
+        'treatment': pattern['treatment'],
+        'symptoms': pattern.get('symptoms', []),
+        'prevention': pattern.get('prevention', [])
+    }
+
+
+def extract_features(image):
+    """
+    Colour and texture histogram features (CPU, ~1 ms per image)
+
+    Args:
+        image: BGR numpy array of any size
+
+    Returns:
+        1-D float32 feature vector
+    """
+    small = cv2.resize(image, FEATURE_SIZE, interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    n_pixels = float(gray.size)
+
+    hue_hist = cv2.calcHist([hsv], [0], None, [18], [0, 180]).ravel()
+    sat_hist = cv2.calcHist([hsv], [1], None, [8], [0, 256]).ravel()
+    val_hist = cv2.calcHist([hsv], [2], None, [8], [0, 256]).ravel()
+
+    # Texture: distribution of Laplacian magnitudes
+    laplacian = np.abs(cv2.Laplacian(gray, cv2.CV_32F))
+    tex_hist, _ = np.histogram(laplacian, bins=8, range=(0, 256))
+
+    dark_fraction = np.count_nonzero(gray < 100) / n_pixels
+
+    return np.concatenate([
+        hue_hist / n_pixels,
+        sat_hist / n_pixels,
+        val_hist / n_pixels,
+        tex_hist / n_pixels,
+        [dark_fraction, laplacian.var() / 1000.0]
+    ]).astype(np.float32)
+
+
+class RuleBasedBackend:
+    """HSV thresholds matched against DISEASE_PATTERNS (original behaviour)"""
+
+    name = 'rule'
+
+    def load(self):
+        return self
+
+    def warmup(self):
+        return self
+
+    def predict_batch(self, images):
+        """Return a list of disease matches per image"""
+        results = []
+        for image in images:
+            color = analyze_leaf_color(image)
+            spots = detect_spots(image)
+            results.append(get_disease_by_pattern(
+                color['green_percentage'],
+                spots['spot_density_percentage'],
+                color['yellow_percentage'],
+                color['brown_percentage']
+            ))
+        return results
+
+
+class HistogramGBMBackend:
+    """
+    Gradient-boosted classifier on colour/texture histograms
+
+    Loads a fitted model from MODEL_DIR. When none exists yet, a bootstrap
+    model is distilled from the rule-based labels on the synthetic leaf
+    corpus and saved, so the backend works out of the box and can later be
+    retrained on labelled field photos with fit(). get_backend runs that
+    bootstrap fit (several seconds) in a background thread.
+    """
+
+    name = 'gbm'
+    model_file = 'disease_gbm.joblib'
+    min_confidence = 5.0
+
+    def __init__(self, model_dir=MODEL_DIR):
+        self.model_path = os.path.join(model_dir, self.model_file)
+        self.model = None
+        self.classes = []
+
+    def needs_fit(self):
+        """True when load() would have to train a bootstrap model first"""
+        return self.model is None and not os.path.exists(self.model_path)
+
+    def load(self):
+        import joblib
+
+        if os.path.exists(self.model_path):
+            bundle = joblib.load(self.model_path)
+            self.model = bundle['model']
+            self.classes = bundle['classes']
+        else:
+            self.fit_bootstrap()
+        return self
+
+    def fit(self, images, labels):
+        """
+        Fit the classifier on labelled images
+
+        Args:
+            images: List of BGR arrays
+            labels: Disease names (keys of DISEASE_PATTERNS)
+        """
+        import joblib
+        from sklearn.ensemble import HistGradientBoostingClassifier
+
+        features = np.stack([extract_features(img) for img in images])
+        model = HistGradientBoostingClassifier(max_iter=150, learning_rate=0.1, random_state=0)
+        model.fit(features, np.asarray(labels))
+
+        self.model = model
+        self.classes = [str(c) for c in model.classes_]
+
+        os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
+        joblib.dump({'model': model, 'classes': self.classes}, self.model_path)
+
+        return self
+
+    def fit_bootstrap(self, n_images=600, seed=7):
+        """Distill the rule-based matcher into the GBM on synthetic leaves"""
+        rule = RuleBasedBackend()
+        images, labels = [], []
+
+        for sample in generate_corpus(n_images, sizes=((256, 256),), seed=seed):
+            matches = rule.predict_batch([sample['image']])[0]
+            images.append(sample['image'])
+            labels.append(matches[0]['disease'] if matches else 'Sehat')
+
+        return self.fit(images, labels)
+
+    def warmup(self):
+        """Run one dummy batch so the first real request pays no setup cost"""
+        if self.model is None:
+            self.load()
+        dummy = np.zeros((FEATURE_SIZE[1], FEATURE_SIZE[0], 3), dtype=np.uint8)
+        self.predict_batch([dummy, dummy])
+        return self
+
+    def predict_batch(self, images):
+        """Return a list of disease matches per image (single model call)"""
+        if self.model is None:
+            self.load()
+        if not images:
+            return []
+
+        features = np.stack([extract_features(img) for img in images])
+        probabilities = self.model.predict_proba(features)
+
+        results = []
+        for row in probabilities:
+            matches = [
+                _pattern_match(disease, prob * 100)
+                for disease, prob in zip(self.classes, row)
+                if prob * 100 >= self.min_confidence
+            ]
+            matches.sort(key=lambda x: x['confidence'], reverse=True)
+            results.append(matches)
+
+        return results
+
+
+BACKENDS = {
+    RuleBasedBackend.name: RuleBasedBackend,
+    HistogramGBMBackend.name: HistogramGBMBackend
+}
+
+# Answers while a backend is still being fitted in the background
+FALLBACK_BACKEND = 'rule'
+
+_backend_cache = {}
+_backend_ready = {}
+_backend_lock = threading.Lock()
+
+
+def register_backend(name, backend_class):
+    """Register an additional backend class (e.g. an ONNX model)"""
+    BACKENDS[name] = backend_class
+
+
+def _fit_in_background(name, backend, ready):
+    try:
+        backend.load()
+    except Exception:
+        # Forget the failed instance so the next request retries
+        with _backend_lock:
+            _backend_cache.pop(name, None)
+            _backend_ready.pop(name, None)
+    finally:
+        ready.set()
+
+
+def get_backend(name='rule', wait=False):
+    """
+    Get a loaded backend instance, created once per process
+
+    A backend that must be fitted before first use (GBM without a saved
+    model) is trained in a background thread, outside the lock, so other
+    callers are never blocked. Until it is ready FALLBACK_BACKEND answers.
+
+    Args:
+        name: Backend name (key of BACKENDS)
+        wait: Block until a background fit has finished
+
+    Raises:
+        ValueError: unknown backend name
+        RuntimeError: wait=True and the background fit failed
+    """
+    with _backend_lock:
+        if name not in _backend_cache:
+            if name not in BACKENDS:
+                raise ValueError(f"Backend tidak dikenal: {name}")
+            backend = BACKENDS[name]()
+            ready = threading.Event()
+            if getattr(backend, 'needs_fit', lambda: False)():
+                threading.Thread(
+                    target=_fit_in_background,
+                    args=(name, backend, ready),
+                    name=f"fit-{name}",
+                    daemon=True
+                ).start()
+            else:
+                backend.load()
+                ready.set()
+            _backend_cache[name] = backend
+            _backend_ready[name] = ready
+        backend = _backend_cache[name]
+        ready = _backend_ready[name]
+
+    if wait:
+        ready.wait()
+        with _backend_lock:
+            if _backend_cache.get(name) is not backend:
+                raise RuntimeError(f"Gagal menyiapkan backend: {name}")
+    if ready.is_set() or name == FALLBACK_BACKEND:
+        return backend
+    return get_backend(FALLBACK_BACKEND)
+
+
+def backend_ready(name):
+    """False while a backend is still being fitted (the fallback answers)"""
+    with _backend_lock:
+        ready = _backend_ready.get(name)
+    return ready is None or ready.is_set()
@@ -5,6 +5,11 @@ Integrate image analysis with disease pattern matching
 
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, deque
+
+import numpy as np
+
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.image_processing import (
@@ -12,22 +17,64 @@ from utils.image_processing import (
     analyze_leaf_color,
     detect_spots,
     calculate_texture_score,
-    create_visualization,
+    VisualizationHandle,
     auto_score_leaf_color,
     estimate_pest_severity
 )
+from utils.field_tiling import (
+    open_field_image,
+    compute_tile_grid,
+    read_tile,
+    create_preview,
+    create_health_heatmap
+)
+from utils.video_scouting import (
+    iter_video_frames,
+    sample_distinct_frames,
+    resize_for_analysis,
+    summarize_segment
+)
 from data.disease_patterns import (
     get_disease_by_pattern,
     calculate_health_score_from_image
 )
+from services.disease_classifier import backend_ready, get_backend
 
 class DiseaseDetectionService:
     
+    DEFAULT_BACKEND = 'rule'
+    
+    @staticmethod
+    def warmup_backend(backend=None):
+        """Load the classifier backend once and run a warm-up batch"""
+        return get_backend(backend or DiseaseDetectionService.DEFAULT_BACKEND).warmup()
+    
+    @staticmethod
+    def backend_ready(backend=None):
+        """False while the backend is still being fitted (rule-based answers meanwhile)"""
+        return backend_ready(backend or DiseaseDetectionService.DEFAULT_BACKEND)
+    
     @staticmethod
-    def analyze_image(uploaded_file):
+    def classify_batch(images, backend=None):
+        """
+        Classify many BGR images in one backend call
+        
+        Returns:
+            list of disease match lists (same shape as get_disease_by_pattern)
+        """
+        return get_backend(backend or DiseaseDetectionService.DEFAULT_BACKEND).predict_batch(images)
+    
+    @staticmethod
+    def analyze_image(uploaded_file, backend=None, visualize=True):
         """
         Complete image analysis pipeline
         
+        Args:
+            uploaded_file: Uploaded image file
+            backend: Classifier backend name ('rule', 'gbm'); default rule-based
+            visualize: Return a lazy VisualizationHandle. API/batch callers
+                pass False to skip it and drop the full-size masks.
+        
         Returns:
             dict with all analysis results
         """
@@ -43,15 +90,14 @@ class DiseaseDetectionService:
         # Texture analysis
         texture_score = calculate_texture_score(image)
         
-        # Create visualization
-        vis_image = create_visualization(image, color_analysis, spot_analysis)
-        
         # Disease matching
-        diseases = get_disease_by_pattern(
+        diseases = DiseaseDetectionService._match_diseases(
+            image,
             color_analysis['green_percentage'],
             spot_analysis['spot_density_percentage'],
             color_analysis['yellow_percentage'],
-            color_analysis['brown_percentage']
+            color_analysis['brown_percentage'],
+            backend
         )
         
         # Calculate health score
@@ -72,11 +118,19 @@ class DiseaseDetectionService:
             color_analysis['brown_percentage']
         )
         
+        # Visualization is rendered on demand at display size
+        if visualize:
+            vis_handle = VisualizationHandle(image, color_analysis, spot_analysis)
+        else:
+            vis_handle = None
+            color_analysis = {k: v for k, v in color_analysis.items() if not k.endswith('_mask')}
+            spot_analysis = {k: v for k, v in spot_analysis.items() if k != 'spot_mask'}
+        
         return {
             'color_analysis': color_analysis,
             'spot_analysis': spot_analysis,
             'texture_score': texture_score,
-            'visualization': vis_image,
+            'visualization': vis_handle,
             'detected_diseases': diseases,
             'health_score': health_score,
             'auto_scores': {
@@ -85,6 +139,226 @@ class DiseaseDetectionService:
             }
         }
     
+    @staticmethod
+    def _match_diseases(image, green_pct, spot_density, yellow_pct, brown_pct, backend=None):
+        """Rule-based match on the colour statistics, or one classifier call on the image"""
+        backend = backend or DiseaseDetectionService.DEFAULT_BACKEND
+        if backend == 'rule':
+            return get_disease_by_pattern(green_pct, spot_density, yellow_pct, brown_pct)
+        return DiseaseDetectionService.classify_batch([image], backend)[0]
+    
+    @staticmethod
+    def _analyze_tile(tile_image):
+        """Lightweight per-tile/per-frame analysis (no visualization)"""
+        color_analysis = analyze_leaf_color(tile_image)
+        spot_analysis = detect_spots(tile_image)
+        
+        health_score = calculate_health_score_from_image(
+            color_analysis['green_percentage'],
+            spot_analysis['spot_density_percentage'],
+            color_analysis['yellow_percentage']
+        )
+        
+        return {
+            'green_percentage': color_analysis['green_percentage'],
+            'yellow_percentage': color_analysis['yellow_percentage'],
+            'brown_percentage': color_analysis['brown_percentage'],
+            'spot_count': spot_analysis['spot_count'],
+            'spot_density_percentage': spot_analysis['spot_density_percentage'],
+            'health_score': health_score
+        }
+    
+    @staticmethod
+    def _analyze_frame(frame, backend=None):
+        """Per-frame tile analysis plus the most likely disease"""
+        result = DiseaseDetectionService._analyze_tile(frame)
+        diseases = DiseaseDetectionService._match_diseases(
+            frame,
+            result['green_percentage'],
+            result['spot_density_percentage'],
+            result['yellow_percentage'],
+            result['brown_percentage'],
+            backend
+        )
+        result['top_disease'] = diseases[0]['disease'] if diseases else None
+        return result
+    
+    @staticmethod
+    def analyze_field_image(source, tile_size=640, overlap=64, max_workers=None, preview_size=1024,
+                            backend=None):
+        """
+        Tiled analysis for drone orthophotos and wide field shots
+        
+        Tiles are read through windowed (memory-mapped) access and analyzed
+        at native resolution in a thread pool. OpenCV releases the GIL, so
+        threads run in parallel without copying tiles to other processes.
+        
+        Args:
+            source: Path, uploaded file, or BGR numpy array
+            tile_size: Tile edge length in pixels
+            overlap: Overlap between neighbouring tiles in pixels
+            max_workers: Thread pool size (default: CPU count)
+            preview_size: Longest side of the heatmap preview
+            backend: Classifier backend for the field-level disease match
+                ('rule' uses the area-weighted colour statistics; others
+                classify the preview)
+        
+        Returns:
+            dict with per-tile results, health grid, field summary and heatmap
+        """
+        image = open_field_image(source)
+        height, width = image.shape[:2]
+        tiles = compute_tile_grid(height, width, tile_size, overlap)
+        
+        max_workers = max_workers or os.cpu_count() or 1
+        max_in_flight = max_workers * 2
+        results = [None] * len(tiles)
+        
+        # Bounded submission: only a few decoded tiles exist at any time
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque()
+            for idx, tile in enumerate(tiles):
+                if len(pending) >= max_in_flight:
+                    done_idx, future = pending.popleft()
+                    results[done_idx] = future.result()
+                future = executor.submit(
+                    DiseaseDetectionService._analyze_tile,
+                    read_tile(image, tile)
+                )
+                pending.append((idx, future))
+            while pending:
+                done_idx, future = pending.popleft()
+                results[done_idx] = future.result()
+        
+        # Aggregate into a row x col grid
+        n_rows = max(t['row'] for t in tiles) + 1
+        n_cols = max(t['col'] for t in tiles) + 1
+        health_grid = np.zeros((n_rows, n_cols), dtype=np.float32)
+        for tile, result in zip(tiles, results):
+            health_grid[tile['row'], tile['col']] = result['health_score']
+        
+        # Area-weighted field summary
+        areas = np.array([t['w'] * t['h'] for t in tiles], dtype=np.float64)
+        weights = areas / areas.sum()
+        
+        def _weighted(key):
+            return round(float(np.dot(weights, [r[key] for r in results])), 2)
+        
+        green_pct = _weighted('green_percentage')
+        yellow_pct = _weighted('yellow_percentage')
+        brown_pct = _weighted('brown_percentage')
+        spot_density = _weighted('spot_density_percentage')
+        
+        tile_scores = [r['health_score'] for r in results]
+        unhealthy_tiles = sum(1 for s in tile_scores if s < 60)
+        
+        preview, scale = create_preview(image, preview_size)
+        diseases = DiseaseDetectionService._match_diseases(
+            preview, green_pct, spot_density, yellow_pct, brown_pct, backend
+        )
+        heatmap = create_health_heatmap(preview, scale, tiles, tile_scores)
+        
+        return {
+            'image_size': (width, height),
+            'tile_size': tile_size,
+            'overlap': overlap,
+            'tiles': [dict(tile, **result) for tile, result in zip(tiles, results)],
+            'health_grid': health_grid,
+            'heatmap': heatmap,
+            'summary': {
+                'tile_count': len(tiles),
+                'health_score': _weighted('health_score'),
+                'min_tile_health': round(min(tile_scores), 1),
+                'unhealthy_tiles': unhealthy_tiles,
+                'unhealthy_percentage': round(unhealthy_tiles / len(tiles) * 100, 1),
+                'green_percentage': green_pct,
+                'yellow_percentage': yellow_pct,
+                'brown_percentage': brown_pct,
+                'spot_density_percentage': spot_density
+            },
+            'detected_diseases': diseases
+        }
+    
+    @staticmethod
+    def analyze_video(source, segment_seconds=10, check_fps=4.0, min_distance=0.15,
+                      max_workers=None, rolling_alpha=0.5, backend=None):
+        """
+        Streaming scouting analysis for row-walk videos
+        
+        Frames are decoded lazily, near-duplicates are skipped by histogram
+        distance, and the remaining frames are analyzed in a bounded thread
+        pool. A summary is yielded as soon as each time segment completes.
+        
+        Args:
+            source: Video path, URL or camera index
+            segment_seconds: Length of one scoring segment
+            check_fps: Frames per second considered for sampling
+            min_distance: Histogram distance needed to keep a frame
+            max_workers: Thread pool size (default: CPU count)
+            rolling_alpha: Weight of the newest segment in the rolling score
+            backend: Classifier backend for the per-frame disease match
+        
+        Yields:
+            dict per segment with health scores, rolling_health_score and
+            top_disease (most frequent per-frame match)
+        """
+        frames = sample_distinct_frames(
+            iter_video_frames(source, check_fps=check_fps),
+            min_distance=min_distance
+        )
+        
+        max_workers = max_workers or os.cpu_count() or 1
+        max_in_flight = max_workers * 2
+        
+        state = {'segment': None, 'results': [], 'rolling': None}
+        
+        def _collect(timestamp, result):
+            """Add a frame result; return a finished segment summary if any"""
+            segment_index = int(timestamp // segment_seconds)
+            finished = None
+            if state['segment'] is not None and segment_index != state['segment'] and state['results']:
+                finished = _close_segment()
+            state['segment'] = segment_index
+            state['results'].append(result)
+            return finished
+        
+        def _close_segment():
+            summary = summarize_segment(state['segment'], segment_seconds, state['results'])
+            if state['rolling'] is None:
+                state['rolling'] = summary['health_score']
+            else:
+                state['rolling'] = rolling_alpha * summary['health_score'] + (1 - rolling_alpha) * state['rolling']
+            summary['rolling_health_score'] = round(state['rolling'], 1)
+            matches = Counter(r['top_disease'] for r in state['results'] if r['top_disease'])
+            summary['top_disease'] = matches.most_common(1)[0][0] if matches else None
+            state['results'] = []
+            return summary
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque()
+            for frame_index, timestamp, frame in frames:
+                # Bounded queue: wait for the oldest frame before decoding more
+                if len(pending) >= max_in_flight:
+                    done_time, future = pending.popleft()
+                    finished = _collect(done_time, future.result())
+                    if finished:
+                        yield finished
+                future = executor.submit(
+                    DiseaseDetectionService._analyze_frame,
+                    resize_for_analysis(frame),
+                    backend
+                )
+                pending.append((timestamp, future))
+            
+            while pending:
+                done_time, future = pending.popleft()
+                finished = _collect(done_time, future.result())
+                if finished:
+                    yield finished
+        
+        if state['results']:
+            yield _close_segment()
+    
     @staticmethod
     def get_treatment_recommendations(diseases):
         """Get treatment recommendations from detected diseases"""
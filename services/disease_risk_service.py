@@ -0,0 +1,372 @@
+"""
+Disease Risk Service
+Streaming weather-driven disease risk index per farm (leaf wetness, degree-hours, rainfall)
+"""
+
+import os
+import sys
+import threading
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.pest_disease_data import get_by_id
+from services.weather_history_service import WeatherHistoryService
+
+# Risk models per disease id in data/pest_disease_data.py
+# Components (each normalised to 0-1 and weighted):
+#   hours        - favourable hours in the window / target_hours
+#   wet_run      - current continuous leaf-wetness duration / wet_run_h
+#   rain         - rainfall over the window / rain_mm
+#   degree_hours - sum(max(temp - dh_base, 0)) over the window / degree_hours
+RISK_MODELS = {
+    'anthracnose': {
+        # Embun malam saja tidak cukup; percikan hujan menyebarkan spora
+        'window_h': 72, 'temp_range': (20, 30), 'needs_wet': True,
+        'target_hours': 48, 'wet_run_h': 18, 'rain_mm': 25,
+        'weights': {'hours': 0.4, 'wet_run': 0.3, 'rain': 0.3}
+    },
+    'phytophthora_blight': {
+        'window_h': 72, 'temp_range': (24, 32), 'needs_wet': True,
+        'target_hours': 18, 'wet_run_h': 8, 'rain_mm': 30,
+        'weights': {'rain': 0.5, 'hours': 0.3, 'wet_run': 0.2}
+    },
+    'bacterial_spot': {
+        'window_h': 48, 'temp_range': (24, 30), 'needs_wet': True,
+        'target_hours': 12, 'rain_mm': 15,
+        'weights': {'hours': 0.6, 'rain': 0.4}
+    },
+    'powdery_mildew': {
+        # Air lembab tapi daun kering; air bebas justru menghambat spora
+        'window_h': 168, 'temp_range': (20, 27), 'humidity_range': (50, 85), 'needs_dry': True,
+        'target_hours': 72,
+        'weights': {'hours': 1.0}
+    },
+    'fusarium_wilt': {
+        'window_h': 168, 'temp_range': (25, 30),
+        'target_hours': 100, 'rain_mm': 30,
+        'weights': {'hours': 0.7, 'rain': 0.3}
+    },
+    'bacterial_wilt': {
+        'window_h': 168, 'dh_base': 28, 'degree_hours': 200, 'rain_mm': 50,
+        'weights': {'degree_hours': 0.6, 'rain': 0.4}
+    }
+}
+
+# Longest window any model needs; the per-farm tail keeps this many hours
+MAX_WINDOW_H = max(m['window_h'] for m in RISK_MODELS.values())
+
+# Leaf wetness proxy: RH >= 90%, rain, or dew-point depression < 2°C
+WET_RH = 90
+WET_RAIN_MM = 0.1
+WET_DEW_DEPRESSION_C = 2
+
+
+def _risk_level(score):
+    if score >= 60:
+        return 'Tinggi'
+    if score >= 30:
+        return 'Sedang'
+    return 'Rendah'
+
+
+def _rolling_sum(values, window, start):
+    """Trailing-window sums for positions >= start of a 1-D array"""
+    cumulative = np.concatenate([[0.0], np.cumsum(values)])
+    positions = np.arange(start, len(values))
+    lower = np.maximum(positions + 1 - window, 0)
+    return cumulative[positions + 1] - cumulative[lower]
+
+
+class DiseaseRiskEngine:
+    """
+    Incremental hourly risk state for many farms
+
+    Each farm keeps only the last MAX_WINDOW_H hours, the running
+    leaf-wetness counter and its daily scores. New observations are
+    scored against that tail, so an update costs O(new hours + window)
+    no matter how long the history is.
+    """
+
+    def __init__(self, models=None):
+        self.models = models or RISK_MODELS
+        self._farms = {}
+        self._lock = threading.Lock()
+
+    def _new_state(self):
+        return {
+            'times': np.array([], dtype='datetime64[h]'),
+            'temp': np.array([]),
+            'humidity': np.array([]),
+            'rain': np.array([]),
+            'wet': np.array([], dtype=bool),
+            'wet_run': 0,
+            'last_time': None,
+            'daily': {}
+        }
+
+    def last_time(self, farm_key):
+        """Timestamp of the last ingested hour (None for a new farm)"""
+        with self._lock:
+            state = self._farms.get(farm_key)
+            return None if state is None or state['last_time'] is None else state['last_time'].item()
+
+    def update(self, farm_key, times, temperature, humidity, rainfall, dew_point=None):
+        """
+        Ingest hourly observations for one farm
+
+        Hours at or before the last ingested hour are ignored, and gaps
+        are filled with missing values (never favourable, never wet).
+
+        Args:
+            farm_key: Farm / location key
+            times: Hour timestamps (ISO strings or datetime64)
+            temperature, humidity, rainfall: Hourly values (°C, %, mm)
+            dew_point: Optional hourly dew point (°C)
+
+        Returns:
+            Sorted list of dates (datetime.date) whose scores changed
+        """
+        times = np.asarray(times, dtype='datetime64[h]')
+        columns = {
+            'temp': np.asarray(temperature, dtype=float),
+            'humidity': np.asarray(humidity, dtype=float),
+            'rain': np.asarray(rainfall, dtype=float),
+            'dew': np.asarray(dew_point if dew_point is not None else np.full(len(times), np.nan), dtype=float)
+        }
+
+        with self._lock:
+            state = self._farms.setdefault(farm_key, self._new_state())
+
+            keep = times > state['last_time'] if state['last_time'] is not None else np.ones(len(times), dtype=bool)
+            if not keep.any():
+                return []
+            order = np.argsort(times[keep], kind='stable')
+            times = times[keep][order]
+            columns = {k: v[keep][order] for k, v in columns.items()}
+
+            # Lay the batch on a contiguous hourly grid starting after last_time
+            first = state['last_time'] + 1 if state['last_time'] is not None else times[0]
+            if times[0] - first >= MAX_WINDOW_H:
+                # Gap longer than any window: the old tail no longer matters
+                state.update(self._new_state(), daily=state['daily'])
+                first = times[0]
+            n_new = int((times[-1] - first).astype(int)) + 1
+            slots = (times - first).astype(int)
+            grid = {}
+            for name, values in columns.items():
+                filled = np.full(n_new, np.nan)
+                filled[slots] = values
+                grid[name] = filled
+            grid_times = first + np.arange(n_new)
+
+            with np.errstate(invalid='ignore'):
+                wet_new = (
+                    (grid['humidity'] >= WET_RH)
+                    | (grid['rain'] > WET_RAIN_MM)
+                    | ((grid['temp'] - grid['dew']) < WET_DEW_DEPRESSION_C)
+                )
+
+            # Continuous wetness duration ending at each hour, carried across batches
+            idx = np.arange(n_new)
+            last_dry = np.maximum.accumulate(np.where(~wet_new, idx, -1))
+            wet_run = np.where(last_dry >= 0, idx - last_dry, idx + 1 + state['wet_run']).astype(float)
+
+            offset = len(state['times'])
+            combined = {
+                'temp': np.concatenate([state['temp'], grid['temp']]),
+                'humidity': np.concatenate([state['humidity'], grid['humidity']]),
+                'rain': np.concatenate([state['rain'], grid['rain']]),
+                'wet': np.concatenate([state['wet'], wet_new])
+            }
+
+            hourly_risk = {
+                disease_id: self._score_model(model, combined, wet_run, offset)
+                for disease_id, model in self.models.items()
+            }
+
+            # Daily score = worst hour of the day (merged with earlier batches)
+            days = grid_times.astype('datetime64[D]')
+            day_starts = np.concatenate([[0], np.nonzero(days[1:] != days[:-1])[0] + 1])
+            changed = [day.item() for day in days[day_starts]]
+            for disease_id, risk in hourly_risk.items():
+                day_max = np.maximum.reduceat(risk, day_starts)
+                for day, value in zip(changed, day_max):
+                    scores = state['daily'].setdefault(day, {})
+                    scores[disease_id] = max(scores.get(disease_id, 0.0), round(float(value), 1))
+
+            # Keep only the tail needed by the longest window
+            state['times'] = np.concatenate([state['times'], grid_times])[-MAX_WINDOW_H:]
+            for name in ('temp', 'humidity', 'rain', 'wet'):
+                state[name] = combined[name][-MAX_WINDOW_H:]
+            state['wet_run'] = int(wet_run[-1])
+            state['last_time'] = grid_times[-1]
+
+        return sorted(changed)
+
+    def update_frame(self, farm_key, df):
+        """Ingest a DataFrame shaped like weather_hourly (time, temperature, ...)"""
+        if df is None or df.empty:
+            return []
+        return self.update(
+            farm_key,
+            df['time'].values,
+            df['temperature'].values,
+            df['humidity'].values,
+            df['rainfall'].values,
+            df['dew_point'].values if 'dew_point' in df else None
+        )
+
+    @staticmethod
+    def _score_model(model, combined, wet_run, offset):
+        """Hourly risk (0-100) for the new hours of the combined series"""
+        temp = combined['temp']
+        window = model['window_h']
+        components = {}
+
+        with np.errstate(invalid='ignore'):
+            if 'target_hours' in model:
+                favourable = np.ones(len(temp), dtype=bool)
+                if 'temp_range' in model:
+                    low, high = model['temp_range']
+                    favourable &= (temp >= low) & (temp <= high)
+                if 'humidity_range' in model:
+                    low, high = model['humidity_range']
+                    favourable &= (combined['humidity'] >= low) & (combined['humidity'] <= high)
+                if model.get('needs_wet'):
+                    favourable &= combined['wet']
+                if model.get('needs_dry'):
+                    favourable &= ~combined['wet']
+                components['hours'] = _rolling_sum(favourable.astype(float), window, offset) / model['target_hours']
+
+            if 'wet_run_h' in model:
+                components['wet_run'] = wet_run / model['wet_run_h']
+
+            if 'rain_mm' in model:
+                rain = np.nan_to_num(combined['rain'])
+                components['rain'] = _rolling_sum(rain, window, offset) / model['rain_mm']
+
+            if 'degree_hours' in model:
+                excess = np.clip(np.nan_to_num(temp - model['dh_base']), 0, None)
+                components['degree_hours'] = _rolling_sum(excess, window, offset) / model['degree_hours']
+
+        risk = sum(
+            weight * np.clip(components[name], 0, 1)
+            for name, weight in model['weights'].items()
+        )
+        return 100 * risk
+
+    def get_daily_risk(self, farm_key, start_date=None, end_date=None):
+        """
+        Daily risk scores as a long DataFrame
+
+        Returns:
+            DataFrame with date, disease_id, name, score, level
+        """
+        with self._lock:
+            state = self._farms.get(farm_key)
+            daily = dict(state['daily']) if state else {}
+
+        rows = []
+        for day, scores in sorted(daily.items()):
+            if (start_date and day < start_date) or (end_date and day > end_date):
+                continue
+            for disease_id, score in scores.items():
+                entry = get_by_id(disease_id) or {}
+                rows.append({
+                    'date': day,
+                    'disease_id': disease_id,
+                    'name': entry.get('name_id', disease_id),
+                    'score': score,
+                    'level': _risk_level(score)
+                })
+
+        return pd.DataFrame(rows, columns=['date', 'disease_id', 'name', 'score', 'level'])
+
+    def get_latest(self, farm_key):
+        """
+        Risk of the most recent day, highest first, with the database entry
+
+        Returns:
+            list of dicts with disease_id, name, score, level, favorable_conditions
+            and control (from data/pest_disease_data.py)
+        """
+        with self._lock:
+            state = self._farms.get(farm_key)
+            if not state or not state['daily']:
+                return []
+            day = max(state['daily'])
+            scores = dict(state['daily'][day])
+
+        report = []
+        for disease_id, score in sorted(scores.items(), key=lambda item: -item[1]):
+            entry = get_by_id(disease_id) or {}
+            report.append({
+                'date': day,
+                'disease_id': disease_id,
+                'name': entry.get('name_id', disease_id),
+                'score': score,
+                'level': _risk_level(score),
+                'favorable_conditions': entry.get('favorable_conditions'),
+                'control': entry.get('control', {})
+            })
+        return report
+
+
+class DiseaseRiskService:
+
+    # Hours pulled for a farm seen for the first time
+    INITIAL_BACKFILL_DAYS = 14
+
+    _engine = None
+    _engine_lock = threading.Lock()
+
+    @staticmethod
+    def get_engine():
+        """Shared engine (one per process)"""
+        with DiseaseRiskService._engine_lock:
+            if DiseaseRiskService._engine is None:
+                DiseaseRiskService._engine = DiseaseRiskEngine()
+            return DiseaseRiskService._engine
+
+    @staticmethod
+    def update_from_history(location_key, end_time=None):
+        """
+        Feed new hourly observations from the weather history store
+
+        Only rows after the engine's last ingested hour are read.
+
+        Args:
+            location_key: Location registered in WeatherHistoryService
+            end_time: Upper bound (default: now)
+
+        Returns:
+            list of dates whose risk changed
+        """
+        engine = DiseaseRiskService.get_engine()
+        last = engine.last_time(location_key)
+        end_time = end_time or pd.Timestamp.now().strftime('%Y-%m-%dT%H:%M')
+
+        if last is None:
+            start = (pd.Timestamp(end_time) - timedelta(days=DiseaseRiskService.INITIAL_BACKFILL_DAYS))
+        else:
+            start = pd.Timestamp(last) + timedelta(hours=1)
+
+        df = WeatherHistoryService.get_hourly(location_key, start.strftime('%Y-%m-%dT%H:%M'), end_time)
+        return engine.update_frame(location_key, df)
+
+    @staticmethod
+    def update_all_from_history(end_time=None):
+        """Incremental update for every registered history location"""
+        return {
+            location['location_key']: DiseaseRiskService.update_from_history(location['location_key'], end_time)
+            for location in WeatherHistoryService.get_locations()
+        }
+
+    @staticmethod
+    def get_risk_report(location_key):
+        """Latest daily risk per disease, linked to the pest/disease database"""
+        return DiseaseRiskService.get_engine().get_latest(location_key)
@@ -10,6 +10,7 @@ from data.growth_milestones import (
     get_phase_for_hst,
     calculate_health_score
 )
+from services.phenology_service import PhenologyService
 from datetime import datetime, timedelta
 
 class GrowthMonitoringService:
@@ -26,6 +27,20 @@ class GrowthMonitoringService:
         delta = today - planting_date
         return delta.days
     
+    @staticmethod
+    def calculate_thermal_hst(planting_date, lat, lon, elevation=None, location_key=None):
+        """
+        Thermal-time HST from growing degree days
+        
+        Calendar HST assumes every farm develops at the same speed; thermal
+        HST counts days at the reference temperature instead, so highland
+        farms progress slower and lowland farms faster.
+        
+        Returns:
+            Phenology status (gdd, thermal_hst, phase, predicted transitions)
+        """
+        return PhenologyService.get_status_for(planting_date, lat, lon, elevation, location_key)
+    
     @staticmethod
     def get_current_milestone(hst):
         """Get current milestone and phase for HST"""
@@ -0,0 +1,323 @@
+"""
+Monte Carlo Service
+Chunked, seeded yield/price/profit simulation per RAB scenario
+"""
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.analytics_service import AnalyticsService
+from services.rab_calculator_service import RABCalculatorService
+
+# Metrics tracked per draw (histograms are kept for each)
+METRICS = ['profit', 'yield_kg', 'revenue', 'roi']
+
+# Histogram resolution; percentile error is at most one bin width
+HISTOGRAM_BINS = 20000
+
+# z for the 5%/95% quantiles used to fit lognormal prices to min/max
+Z_95 = 1.645
+
+
+def _sample(spec, rng, n):
+    """Draw n values from a distribution spec dict"""
+    dist = spec['dist']
+    if dist == 'fixed':
+        values = np.full(n, float(spec['value']))
+    elif dist == 'normal':
+        values = rng.normal(spec['mean'], spec['sd'], n)
+    elif dist == 'lognormal':
+        values = rng.lognormal(spec['mu'], spec['sigma'], n)
+    elif dist == 'triangular':
+        values = rng.triangular(spec['left'], spec['mode'], spec['right'], n)
+    elif dist == 'uniform':
+        values = rng.uniform(spec['low'], spec['high'], n)
+    elif dist == 'beta':
+        values = rng.beta(spec['a'], spec['b'], n) * spec.get('scale', 1.0)
+    elif dist == 'gamma':
+        values = rng.gamma(spec['shape'], spec['scale'], n)
+    else:
+        raise ValueError(f"Distribusi tidak dikenal: {dist}")
+
+    if 'min' in spec or 'max' in spec:
+        values = np.clip(values, spec.get('min'), spec.get('max'))
+    return values
+
+
+def _simulate_draws(model, distributions, rng, n):
+    """One vectorized batch of draws -> dict of metric arrays"""
+    rainfall = _sample(distributions['rainfall_mm'], rng, n)
+    pest = _sample(distributions['pest_severity'], rng, n)
+    potential = _sample(distributions['yield_potential_kg'], rng, n)
+    price = _sample(distributions['price'], rng, n)
+    cost_factor = _sample(distributions['cost_factor'], rng, n)
+
+    # Same rainfall buckets and pest penalty as AnalyticsService.predict_yield
+    bounds, factors = model['rain_buckets']
+    rain_factor = np.asarray(factors)[np.digitize(rainfall, bounds)]
+    pest_factor = 1.0 - pest / 100 * 0.3
+
+    yield_kg = potential * rain_factor * pest_factor * model['luas_ha']
+    revenue = yield_kg * price
+    cost = model['total_biaya'] * cost_factor
+    profit = revenue - cost
+
+    return {
+        'profit': profit,
+        'yield_kg': yield_kg,
+        'revenue': revenue,
+        'roi': profit / cost * 100
+    }
+
+
+def _simulate_chunk(args):
+    """
+    Worker: simulate one chunk and reduce it to histograms + moments
+
+    Module level so it can run in a process pool.
+    """
+    model, distributions, seed_seq, n, ranges = args
+    rng = np.random.default_rng(seed_seq)
+    draws = _simulate_draws(model, distributions, rng, n)
+
+    summary = {}
+    for metric, values in draws.items():
+        low, high = ranges[metric]
+        counts, _ = np.histogram(np.clip(values, low, high), bins=HISTOGRAM_BINS, range=(low, high))
+        summary[metric] = {
+            'counts': counts,
+            'sum': float(values.sum()),
+            'sumsq': float(np.square(values).sum()),
+            'min': float(values.min()),
+            'max': float(values.max()),
+            'below_zero': int((values < 0).sum())
+        }
+    summary['n'] = n
+    return summary
+
+
+def _merge(total, part):
+    if total is None:
+        return part
+    for metric in METRICS:
+        t, p = total[metric], part[metric]
+        t['counts'] = t['counts'] + p['counts']
+        t['sum'] += p['sum']
+        t['sumsq'] += p['sumsq']
+        t['min'] = min(t['min'], p['min'])
+        t['max'] = max(t['max'], p['max'])
+        t['below_zero'] += p['below_zero']
+    total['n'] += part['n']
+    return total
+
+
+def _histogram_quantile(counts, low, high, q, observed_min, observed_max):
+    """Quantile from a fixed-range histogram (linear within the bin)"""
+    cumulative = np.cumsum(counts)
+    target = q * cumulative[-1]
+    idx = int(np.searchsorted(cumulative, target))
+    idx = min(idx, len(counts) - 1)
+    width = (high - low) / len(counts)
+    before = cumulative[idx - 1] if idx > 0 else 0
+    inside = counts[idx]
+    fraction = (target - before) / inside if inside else 0.5
+    value = low + (idx + fraction) * width
+    return float(np.clip(value, observed_min, observed_max))
+
+
+def _tail_mean(counts, low, high, q):
+    """Mean of the lowest q share of draws (expected shortfall) from the histogram"""
+    width = (high - low) / len(counts)
+    centers = low + (np.arange(len(counts)) + 0.5) * width
+    cumulative = np.cumsum(counts)
+    tail_n = q * cumulative[-1]
+    taken = np.clip(tail_n - (cumulative - counts), 0, counts)
+    return float((taken * centers).sum() / taken.sum()) if taken.sum() else float(centers[0])
+
+
+class MonteCarloService:
+
+    DEFAULT_DRAWS = 100000
+    DEFAULT_CHUNK = 100000
+    MAX_DRAWS = 1000000
+    PERCENTILES = [5, 10, 25, 50, 75, 90, 95]
+
+    # Pilot draws used to fix histogram ranges before the main run
+    PILOT_DRAWS = 20000
+
+    @staticmethod
+    def default_distributions(scenario_key):
+        """
+        Input distributions derived from the RAB template
+
+        - yield potential: triangular over estimasi_yield_min..max (kg/ha)
+        - price: lognormal with 5%/95% quantiles at harga_jual_min/max
+        - rainfall: seasonal total (mm), fixed 500 in a greenhouse
+        - pest severity: beta, lower in a greenhouse
+        - cost factor: +/-5% overrun on total RAB
+        """
+        template = RABCalculatorService.RAB_TEMPLATES[scenario_key]
+        params = template['params']
+        greenhouse = 'Greenhouse' in scenario_key
+
+        y_min, y_max = params['estimasi_yield_min'], params['estimasi_yield_max']
+        p_min, p_max = params['harga_jual_min'], params['harga_jual_max']
+
+        return {
+            'yield_potential_kg': {
+                'dist': 'triangular', 'left': y_min, 'mode': (y_min + y_max) / 2, 'right': y_max
+            },
+            'price': {
+                'dist': 'lognormal',
+                'mu': float(np.log(np.sqrt(p_min * p_max))),
+                'sigma': float(np.log(p_max / p_min) / (2 * Z_95))
+            },
+            'rainfall_mm': (
+                {'dist': 'fixed', 'value': 500} if greenhouse
+                else {'dist': 'gamma', 'shape': 11, 'scale': 500 / 11}
+            ),
+            'pest_severity': (
+                {'dist': 'beta', 'a': 1.5, 'b': 20, 'scale': 100} if greenhouse
+                else {'dist': 'beta', 'a': 2, 'b': 12, 'scale': 100}
+            ),
+            'cost_factor': {'dist': 'normal', 'mean': 1.0, 'sd': 0.05, 'min': 0.8, 'max': 1.3}
+        }
+
+    @staticmethod
+    def simulate(scenario_key, n_draws=None, luas_ha=1, distributions=None, seed=None,
+                 chunk_size=None, processes=1):
+        """
+        Monte Carlo profit distribution for one RAB scenario
+
+        Draws are generated in chunks of chunk_size and reduced to
+        fixed-range histograms + running moments, so memory stays
+        O(chunk_size + bins) for any number of draws. Each chunk gets
+        its own child of SeedSequence(seed), so a seeded run gives the
+        same result with any number of processes.
+
+        Args:
+            scenario_key: RAB_TEMPLATES key
+            n_draws: Number of draws (max MAX_DRAWS)
+            luas_ha: Land area (ha)
+            distributions: Overrides merged onto default_distributions
+            seed: Integer seed (None = random)
+            chunk_size: Draws per batch
+            processes: >1 runs chunks in a process pool
+
+        Returns:
+            dict with mean/std profit, percentiles per metric,
+            prob_loss, var_95 and cvar_95 (Rp, positive = loss)
+        """
+        n_draws = min(int(n_draws or MonteCarloService.DEFAULT_DRAWS), MonteCarloService.MAX_DRAWS)
+        chunk_size = int(chunk_size or MonteCarloService.DEFAULT_CHUNK)
+
+        rab = RABCalculatorService.calculate_rab(scenario_key, luas_ha)
+        if rab is None:
+            raise ValueError(f"Skenario tidak dikenal: {scenario_key}")
+
+        dists = MonteCarloService.default_distributions(scenario_key)
+        dists.update(distributions or {})
+        model = {
+            'luas_ha': luas_ha,
+            'total_biaya': rab['total_biaya'],
+            'rain_buckets': AnalyticsService.YIELD_FACTOR_BUCKETS['rainfall_mm']
+        }
+
+        root = np.random.SeedSequence(seed)
+        pilot_seq, main_seq = root.spawn(2)
+
+        # Pilot run fixes histogram ranges (padded; outliers land in edge bins)
+        pilot = _simulate_draws(model, dists, np.random.default_rng(pilot_seq), MonteCarloService.PILOT_DRAWS)
+        ranges = {}
+        for metric, values in pilot.items():
+            low, high = float(values.min()), float(values.max())
+            pad = max(high - low, 1.0) * 0.5
+            ranges[metric] = (low - pad, high + pad)
+
+        sizes = [chunk_size] * (n_draws // chunk_size)
+        if n_draws % chunk_size:
+            sizes.append(n_draws % chunk_size)
+        tasks = [
+            (model, dists, child, size, ranges)
+            for child, size in zip(main_seq.spawn(len(sizes)), sizes)
+        ]
+
+        total = None
+        if processes > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                for part in executor.map(_simulate_chunk, tasks):
+                    total = _merge(total, part)
+        else:
+            for task in tasks:
+                total = _merge(total, _simulate_chunk(task))
+
+        return MonteCarloService._summarize(rab, total, ranges, seed)
+
+    @staticmethod
+    def _summarize(rab, total, ranges, seed):
+        n = total['n']
+        summary = {
+            'scenario': rab['scenario'],
+            'luas_ha': rab['luas_ha'],
+            'total_biaya': rab['total_biaya'],
+            'n_draws': n,
+            'seed': seed,
+            'percentiles': {}
+        }
+
+        for metric in METRICS:
+            stats = total[metric]
+            low, high = ranges[metric]
+            mean = stats['sum'] / n
+            summary[f"mean_{metric}"] = mean
+            summary[f"std_{metric}"] = float(np.sqrt(max(stats['sumsq'] / n - mean ** 2, 0)))
+            summary['percentiles'][metric] = {
+                p: _histogram_quantile(stats['counts'], low, high, p / 100, stats['min'], stats['max'])
+                for p in MonteCarloService.PERCENTILES
+            }
+
+        profit = total['profit']
+        low, high = ranges['profit']
+        summary['prob_loss'] = profit['below_zero'] / n
+        summary['var_95'] = -summary['percentiles']['profit'][5]
+        summary['cvar_95'] = -_tail_mean(profit['counts'], low, high, 0.05)
+
+        return summary
+
+    @staticmethod
+    def simulate_all(n_draws=None, luas_ha=1, seed=None, processes=1):
+        """
+        Simulate every RAB scenario
+
+        Returns:
+            DataFrame, one row per scenario
+        """
+        rows = []
+        for i, key in enumerate(RABCalculatorService.RAB_TEMPLATES):
+            result = MonteCarloService.simulate(
+                key,
+                n_draws=n_draws,
+                luas_ha=luas_ha,
+                seed=None if seed is None else seed + i,
+                processes=processes
+            )
+            profit = result['percentiles']['profit']
+            rows.append({
+                'scenario_key': key,
+                'scenario': result['scenario'],
+                'mean_profit': result['mean_profit'],
+                'p5_profit': profit[5],
+                'p50_profit': profit[50],
+                'p95_profit': profit[95],
+                'prob_loss': result['prob_loss'],
+                'var_95': result['var_95'],
+                'cvar_95': result['cvar_95'],
+                'mean_roi': result['mean_roi']
+            })
+        return pd.DataFrame(rows)
@@ -0,0 +1,265 @@
+"""
+Phenology Service
+Growing-degree-day (GDD) phase tracking and harvest prediction per farm
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.growth_milestones import (
+    GDD_BASE_TEMP_C,
+    GDD_UPPER_TEMP_C,
+    REFERENCE_GDD_PER_DAY,
+    gdd_to_hst,
+    get_gdd_thresholds,
+    get_phase_for_gdd
+)
+from services.weather_history_service import WeatherHistoryService
+from utils.weather_simulator import DEFAULT_SEED, climatology, simulate_day
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+class PhenologyService:
+
+    # Projection horizon for phase/harvest predictions
+    MAX_SEASON_DAYS = 300
+
+    # Elevation when a farm has none (same default as the simulator backend)
+    DEFAULT_ELEVATION_M = 100
+
+    # Per-farm accumulations: daily GDD since planting, cumulative sum,
+    # last ingested date and the derived status (read in O(1)). States
+    # are never mutated in place; update() swaps in a new one (LRU bound)
+    _farms = OrderedDict()
+    _lock = threading.Lock()
+    _FARMS_CACHE_SIZE = 512
+
+    @staticmethod
+    def daily_gdd(tmax, tmin):
+        """
+        Daily GDD with horizontal cutoffs (vectorized)
+
+        Temperatures are clamped to [GDD_BASE_TEMP_C, GDD_UPPER_TEMP_C]
+        before averaging, so heat above the upper threshold adds nothing.
+        """
+        tmax = np.clip(np.asarray(tmax, dtype=float), GDD_BASE_TEMP_C, GDD_UPPER_TEMP_C)
+        tmin = np.clip(np.asarray(tmin, dtype=float), GDD_BASE_TEMP_C, GDD_UPPER_TEMP_C)
+        return (tmax + tmin) / 2 - GDD_BASE_TEMP_C
+
+    @staticmethod
+    def farm_key(planting_date, lat, lon):
+        return f"{_as_date(planting_date).isoformat()}@{round(float(lat), 2)},{round(float(lon), 2)}"
+
+    @staticmethod
+    def register_farm(farm_key, planting_date, lat, lon, elevation=None, location_key=None,
+                      seed=DEFAULT_SEED):
+        """
+        Register (or re-register) a farm
+
+        Args:
+            farm_key: Unique farm id
+            planting_date: Transplant date (HST 0)
+            lat, lon, elevation: Location (elevation drives the simulator)
+            location_key: WeatherHistoryService location with observed data
+            seed: Simulator seed for days without observations
+        """
+        planting_date = _as_date(planting_date)
+        with PhenologyService._lock:
+            farm = PhenologyService._farms.get(farm_key)
+            if farm and farm['planting_date'] == planting_date and farm['location_key'] == location_key:
+                return farm_key
+            PhenologyService._farms[farm_key] = {
+                'planting_date': planting_date,
+                'lat': float(lat),
+                'lon': float(lon),
+                'elevation': PhenologyService.DEFAULT_ELEVATION_M if elevation is None else elevation,
+                'location_key': location_key,
+                'seed': seed,
+                'daily': np.array([]),
+                'cumulative': np.array([]),
+                'last_date': planting_date - timedelta(days=1),
+                'status': None
+            }
+            PhenologyService._farms.move_to_end(farm_key)
+            while len(PhenologyService._farms) > PhenologyService._FARMS_CACHE_SIZE:
+                PhenologyService._farms.popitem(last=False)
+        return farm_key
+
+    @staticmethod
+    def _get_farm(farm_key):
+        with PhenologyService._lock:
+            farm = PhenologyService._farms[farm_key]
+            PhenologyService._farms.move_to_end(farm_key)
+        return farm
+
+    @staticmethod
+    def _observed_temperatures(farm, start, end):
+        """Daily tmax/tmin for [start, end]: history store first, simulator for gaps"""
+        n_days = (end - start).days + 1
+        days = [start + timedelta(days=i) for i in range(n_days)]
+        tmax = np.full(n_days, np.nan)
+        tmin = np.full(n_days, np.nan)
+
+        if farm['location_key']:
+            df = WeatherHistoryService.get_daily(farm['location_key'], start, end)
+            if not df.empty:
+                slots = np.array([(_as_date(d) - start).days for d in df['date']])
+                tmax[slots] = df['temp_max'].values
+                tmin[slots] = df['temp_min'].values
+
+        for i in np.nonzero(np.isnan(tmax) | np.isnan(tmin))[0]:
+            simulated = simulate_day(farm['lat'], farm['lon'], days[i], farm['seed'], farm['elevation'])['daily']
+            tmax[i] = simulated['temperature_2m_max']
+            tmin[i] = simulated['temperature_2m_min']
+
+        return tmax, tmin
+
+    @staticmethod
+    def _projected_gdd(farm, start, n_days):
+        """Expected daily GDD from the monthly climatology"""
+        months = np.array([(start + timedelta(days=i)).month for i in range(n_days)])
+        normals = {
+            m: climatology(farm['lat'], farm['lon'], m, farm['elevation'])
+            for m in np.unique(months)
+        }
+        tmax = np.array([normals[m]['tmax'] for m in months])
+        tmin = np.array([normals[m]['tmin'] for m in months])
+        return PhenologyService.daily_gdd(tmax, tmin)
+
+    @staticmethod
+    def update(farm_key, until=None):
+        """
+        Accumulate GDD up to `until` (default: yesterday) and refresh predictions
+
+        Only days after the last ingested date are read, so daily
+        updates cost one day of data plus a vectorized projection.
+
+        The new state is built outside the lock and swapped in only if
+        no other session replaced the farm meanwhile (otherwise it is
+        redone from that newer state), so days are never counted twice.
+
+        Returns:
+            Status dict (see get_status)
+        """
+        until = _as_date(until) if until else date.today() - timedelta(days=1)
+
+        while True:
+            farm = PhenologyService._get_farm(farm_key)
+            state = farm
+
+            start = farm['last_date'] + timedelta(days=1)
+            if until >= start:
+                tmax, tmin = PhenologyService._observed_temperatures(farm, start, until)
+                new_gdd = PhenologyService.daily_gdd(tmax, tmin)
+                base = farm['cumulative'][-1] if len(farm['cumulative']) else 0.0
+                state = dict(
+                    farm,
+                    daily=np.concatenate([farm['daily'], new_gdd]),
+                    cumulative=np.concatenate([farm['cumulative'], base + np.cumsum(new_gdd)]),
+                    last_date=until,
+                    status=None
+                )
+
+            if state['status'] is None:
+                state = dict(state, status=PhenologyService._build_status(state))
+            if state is farm:
+                return farm['status']
+
+            with PhenologyService._lock:
+                if PhenologyService._farms.get(farm_key) is farm:
+                    PhenologyService._farms[farm_key] = state
+                    return state['status']
+
+    @staticmethod
+    def _build_status(farm):
+        cumulative = farm['cumulative']
+        gdd = float(cumulative[-1]) if len(cumulative) else 0.0
+        recent = farm['daily'][-14:]
+        gdd_per_day = float(recent.mean()) if len(recent) else None
+
+        projection_start = farm['last_date'] + timedelta(days=1)
+        projected = gdd + np.cumsum(PhenologyService._projected_gdd(
+            farm, projection_start, PhenologyService.MAX_SEASON_DAYS
+        ))
+
+        transitions = {}
+        for name, threshold in get_gdd_thresholds().items():
+            if gdd >= threshold:
+                # Already passed: first observed day at or above the threshold
+                idx = int(np.searchsorted(cumulative, threshold))
+                transitions[name] = {'date': farm['planting_date'] + timedelta(days=idx), 'observed': True}
+            else:
+                idx = int(np.searchsorted(projected, threshold))
+                predicted = projection_start + timedelta(days=idx) if idx < len(projected) else None
+                transitions[name] = {'date': predicted, 'observed': False}
+
+        phase = get_phase_for_gdd(gdd)
+        # Earliest upcoming date, then lowest threshold (dict order is not chronological)
+        thresholds = get_gdd_thresholds()
+        upcoming = sorted(
+            ((n, t) for n, t in transitions.items() if not t['observed'] and t['date']),
+            key=lambda item: (item[1]['date'], thresholds[item[0]])
+        )
+        next_name, next_transition = upcoming[0] if upcoming else (None, {'date': None})
+
+        return {
+            'planting_date': farm['planting_date'],
+            'as_of': farm['last_date'],
+            'hst': (farm['last_date'] - farm['planting_date']).days + 1,
+            'gdd': round(gdd, 1),
+            'thermal_hst': gdd_to_hst(gdd),
+            'gdd_per_day': round(gdd_per_day, 1) if gdd_per_day is not None else None,
+            'development_rate': round(gdd_per_day / REFERENCE_GDD_PER_DAY, 2) if gdd_per_day else None,
+            'phase': phase if gdd < get_gdd_thresholds()['Berbuah'] else "Selesai",
+            'next_transition': next_name,
+            'next_transition_date': next_transition['date'],
+            'harvest_start_date': transitions['Panen Pertama']['date'],
+            'harvest_end_date': transitions['Akhir Panen']['date'],
+            'transitions': transitions
+        }
+
+    @staticmethod
+    def get_status(farm_key):
+        """
+        Cached phenology status; recomputed only when a new day arrives
+
+        Returns:
+            dict with gdd, thermal_hst, phase, next_transition(_date),
+            harvest_start_date, harvest_end_date and transitions
+        """
+        farm = PhenologyService._get_farm(farm_key)
+        if farm['status'] is not None and farm['last_date'] >= date.today() - timedelta(days=1):
+            return farm['status']
+        return PhenologyService.update(farm_key)
+
+    @staticmethod
+    def get_gdd_on(farm_key, on_date):
+        """Cumulative GDD at the end of a past date (O(1) lookup)"""
+        farm = PhenologyService._get_farm(farm_key)
+        idx = (_as_date(on_date) - farm['planting_date']).days
+        if idx < 0:
+            return 0.0
+        if idx >= len(farm['cumulative']):
+            return None
+        return float(farm['cumulative'][idx])
+
+    @staticmethod
+    def get_status_for(planting_date, lat, lon, elevation=None, location_key=None):
+        """Register-on-demand shortcut keyed by planting date and coordinates"""
+        key = PhenologyService.farm_key(planting_date, lat, lon)
+        PhenologyService.register_farm(key, planting_date, lat, lon, elevation, location_key)
+        return PhenologyService.get_status(key)
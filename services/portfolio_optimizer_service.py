@@ -0,0 +1,400 @@
+"""
+Portfolio Optimizer Service
+Assign RAB scenarios to land parcels under a budget (multiple-choice knapsack)
+"""
+
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.rab_calculator_service import RABCalculatorService
+
+# Template min/max revenue treated as 5%/95% quantiles (same convention as MonteCarloService)
+Z_95 = 1.645
+
+
+def _hull_increments(costs, values):
+    """
+    Upper convex hull of a parcel's (cost, value) options starting at (0, 0)
+
+    Returns (option index, delta cost, delta value) steps with decreasing
+    slope. Taking steps greedily (last one fractional) gives the LP
+    relaxation of the multiple-choice knapsack.
+    """
+    order = [i for i in np.argsort(costs) if values[i] > 0]
+    hull = [(-1, 0.0, 0.0)]
+    for i in order:
+        c, v = costs[i], values[i]
+        if v <= hull[-1][2]:
+            continue
+        if c == hull[-1][1]:
+            hull.pop()
+        while len(hull) >= 2:
+            (_, c1, v1), (_, c2, v2) = hull[-2], hull[-1]
+            # Drop the middle point if it lies on or below the segment
+            if (v2 - v1) * (c - c1) <= (v - v1) * (c2 - c1):
+                hull.pop()
+            else:
+                break
+        hull.append((i, c, v))
+    return [
+        (hull[k][0], hull[k][1] - hull[k - 1][1], hull[k][2] - hull[k - 1][2])
+        for k in range(1, len(hull))
+    ]
+
+
+class PortfolioOptimizerService:
+
+    OBJECTIVES = ('profit', 'risk_adjusted')
+
+    # Penalty per Rp of profit standard deviation in the risk-adjusted objective
+    DEFAULT_RISK_AVERSION = 0.5
+
+    # Brute force enumerates (scenarios + 1) ** parcels assignments
+    MAX_BRUTE_FORCE = 2000000
+
+    # Fallback branch-and-bound: node limit and relative optimality gap
+    MAX_NODES = 200000
+    MIP_GAP = 1e-6
+
+    @staticmethod
+    def milp_available():
+        try:
+            from scipy.optimize import milp  # noqa: F401 (scipy >= 1.9)
+        except ImportError:
+            return False
+        return True
+
+    @staticmethod
+    def _parcel_frame(parcels):
+        df = pd.DataFrame(parcels).copy()
+        if 'luas_ha' not in df.columns:
+            raise ValueError("Kolom wajib tidak ada: luas_ha")
+        if 'nama' not in df.columns:
+            df['nama'] = [f"Lahan {i + 1}" for i in range(len(df))]
+        if 'yield_factor' not in df.columns:
+            df['yield_factor'] = 1.0
+        if 'greenhouse_ok' not in df.columns:
+            df['greenhouse_ok'] = True
+        df['luas_ha'] = df['luas_ha'].astype(float)
+        df['yield_factor'] = df['yield_factor'].fillna(1.0).astype(float)
+        df['greenhouse_ok'] = df['greenhouse_ok'].fillna(True).astype(bool)
+        return df.reset_index(drop=True)
+
+    @staticmethod
+    def parcel_options(parcels, scenarios=None, objective='profit', risk_aversion=None):
+        """
+        Cost, expected profit and risk of every (parcel, scenario) option
+
+        Expected profit follows compare_scenarios (mean of min and max
+        revenue) scaled by the parcel's yield_factor. Profit sd treats
+        the template min/max revenue as 5%/95% quantiles. Parcels share
+        one market, so their risks are taken as fully correlated and
+        portfolio sd is the sum of parcel sds, which keeps the
+        risk-adjusted objective linear.
+
+        Args:
+            parcels: DataFrame or list of dicts with luas_ha and optional
+                nama, yield_factor (default 1) and greenhouse_ok (default True)
+            scenarios: Allowed scenario keys (default: all)
+            objective: 'profit' or 'risk_adjusted'
+            risk_aversion: Penalty per Rp of sd for 'risk_adjusted'
+
+        Returns:
+            dict with parcels (DataFrame), keys, and [parcel, scenario]
+            arrays cost, profit, sd, score and allowed
+        """
+        if objective not in PortfolioOptimizerService.OBJECTIVES:
+            raise ValueError(f"Objective tidak dikenal: {objective}")
+        if risk_aversion is None:
+            risk_aversion = PortfolioOptimizerService.DEFAULT_RISK_AVERSION
+
+        df = PortfolioOptimizerService._parcel_frame(parcels)
+        compiled = RABCalculatorService.compile_templates()
+        keys = list(compiled['keys'])
+        for key in scenarios or []:
+            if key not in keys:
+                raise ValueError(f"Skenario tidak dikenal: {key}")
+
+        revenue_min = compiled['yield_min'] * compiled['harga_min']
+        revenue_max = compiled['yield_max'] * compiled['harga_max']
+        area = df['luas_ha'].values[:, None]
+        factor = df['yield_factor'].values[:, None]
+
+        cost = area * compiled['total_ha']
+        profit = area * factor * (revenue_min + revenue_max) / 2 - cost
+        sd = area * factor * (revenue_max - revenue_min) / (2 * Z_95)
+        score = profit - risk_aversion * sd if objective == 'risk_adjusted' else profit
+
+        greenhouse = np.array(['Greenhouse' in key for key in keys])
+        allowed = ~greenhouse[None, :] | df['greenhouse_ok'].values[:, None]
+        if scenarios is not None:
+            allowed &= np.isin(keys, list(scenarios))[None, :]
+
+        return {
+            'parcels': df,
+            'keys': keys,
+            'cost': cost,
+            'profit': profit,
+            'sd': sd,
+            'score': score,
+            'allowed': allowed
+        }
+
+    @staticmethod
+    def optimize(parcels, budget, objective='profit', risk_aversion=None, scenarios=None,
+                 method=None, time_limit=30):
+        """
+        Best scenario (or none) per parcel with total RAB cost <= budget
+
+        Solved exactly as a MILP (scipy HiGHS) with one binary per
+        allowed (parcel, scenario), one "at most one scenario" row per
+        parcel and one budget row. Without scipy a branch-and-bound with
+        LP-relaxation bounds is used.
+
+        Args:
+            parcels: See parcel_options
+            budget: Total capital available (Rp)
+            objective: 'profit' or 'risk_adjusted'
+            risk_aversion: Penalty per Rp of sd for 'risk_adjusted'
+            scenarios: Allowed scenario keys (default: all)
+            method: 'milp', 'branch_bound' or 'brute_force' (default: milp if available)
+            time_limit: Solver time limit in seconds (milp only)
+
+        Returns:
+            dict with status, method, objective_value, expected_profit,
+            profit_sd, total_cost, budget_left, solve_ms, assignment
+            (DataFrame per parcel) and by_scenario (DataFrame)
+        """
+        options = PortfolioOptimizerService.parcel_options(parcels, scenarios, objective, risk_aversion)
+        if method is None:
+            method = 'milp' if PortfolioOptimizerService.milp_available() else 'branch_bound'
+
+        solvers = {
+            'milp': PortfolioOptimizerService._solve_milp,
+            'branch_bound': PortfolioOptimizerService._solve_branch_bound,
+            'brute_force': PortfolioOptimizerService._solve_brute_force
+        }
+        if method not in solvers:
+            raise ValueError(f"Metode tidak dikenal: {method}")
+
+        start = time.perf_counter()
+        if method == 'milp':
+            choice, status = solvers[method](options, budget, time_limit)
+        else:
+            choice, status = solvers[method](options, budget)
+        solve_ms = (time.perf_counter() - start) * 1000
+
+        return PortfolioOptimizerService._summarize(options, choice, budget, status, method, solve_ms)
+
+    @staticmethod
+    def _candidates(options):
+        """(parcel, scenario) pairs worth considering: allowed and positive score"""
+        mask = options['allowed'] & (options['score'] > 0)
+        return np.nonzero(mask)
+
+    @staticmethod
+    def _solve_milp(options, budget, time_limit):
+        from scipy.optimize import Bounds, LinearConstraint, milp
+        from scipy.sparse import csr_matrix
+
+        n = len(options['parcels'])
+        choice = np.full(n, -1)
+        rows, cols = PortfolioOptimizerService._candidates(options)
+        if len(rows) == 0:
+            return choice, 'optimal'
+
+        k = len(rows)
+        costs = options['cost'][rows, cols]
+        # One row per parcel (sum of its binaries <= 1) + the budget row
+        a_parcel = csr_matrix((np.ones(k), (rows, np.arange(k))), shape=(n, k))
+        constraints = [
+            LinearConstraint(a_parcel, 0, 1),
+            LinearConstraint(costs[None, :], 0, budget)
+        ]
+        result = milp(
+            c=-options['score'][rows, cols],
+            constraints=constraints,
+            integrality=np.ones(k),
+            bounds=Bounds(0, 1),
+            options={'time_limit': time_limit}
+        )
+        if result.x is None:
+            return choice, 'infeasible'
+
+        picked = result.x > 0.5
+        choice[rows[picked]] = cols[picked]
+        return choice, 'optimal' if result.status == 0 else 'time_limit'
+
+    @staticmethod
+    def _solve_branch_bound(options, budget):
+        """
+        Depth-first branch-and-bound over parcels
+
+        Each node's bound is the current score plus the LP relaxation of
+        the remaining parcels (greedy over convex-hull increments, sorted
+        once by slope). The search starts from the rounded-down LP
+        solution, so hitting MAX_NODES still returns a solution within
+        one parcel's score of the optimum.
+        """
+        n = len(options['parcels'])
+        score = np.where(options['allowed'], options['score'], -np.inf)
+        cost = options['cost']
+
+        per_parcel = []
+        for i in range(n):
+            valid = np.nonzero(np.isfinite(score[i]) & (score[i] > 0) & (cost[i] <= budget))[0]
+            per_parcel.append(sorted(valid, key=lambda j: -score[i, j]))
+
+        order = sorted(range(n), key=lambda i: -(score[i, per_parcel[i][0]] if per_parcel[i] else 0))
+        order = [i for i in order if per_parcel[i]]
+        depth_of = {parcel: d for d, parcel in enumerate(order)}
+
+        # All hull increments, sorted by slope once; a node skips parcels already fixed
+        increments = []
+        for i in order:
+            hull = _hull_increments(cost[i, per_parcel[i]], score[i, per_parcel[i]])
+            increments.extend(
+                (dv / dc if dc > 0 else np.inf, depth_of[i], dc, dv, per_parcel[i][k]) for k, dc, dv in hull
+            )
+        increments.sort(key=lambda x: -x[0])
+
+        def bound(depth, remaining):
+            total = 0.0
+            for _, d, dc, dv, _ in increments:
+                if d < depth:
+                    continue
+                if dc <= remaining:
+                    total += dv
+                    remaining -= dc
+                else:
+                    total += dv * remaining / dc
+                    break
+            return total
+
+        # Incumbent: LP greedy without the fractional step, then upgrade parcels with leftover budget
+        greedy = np.full(n, -1)
+        frozen = set()
+        remaining = float(budget)
+        for _, d, dc, dv, j in increments:
+            if d in frozen:
+                continue
+            if dc <= remaining:
+                greedy[order[d]] = j
+                remaining -= dc
+            else:
+                frozen.add(d)
+        for i in order:
+            held = greedy[i]
+            base_cost = cost[i, held] if held >= 0 else 0.0
+            base_score = score[i, held] if held >= 0 else 0.0
+            for j in per_parcel[i]:
+                if score[i, j] > base_score and cost[i, j] - base_cost <= remaining:
+                    remaining -= cost[i, j] - base_cost
+                    greedy[i] = j
+                    break
+        greedy_value = sum(score[i, greedy[i]] for i in order if greedy[i] >= 0)
+
+        best = {'value': greedy_value, 'choice': greedy}
+        current = np.full(n, -1)
+        gap = PortfolioOptimizerService.MIP_GAP
+        nodes = [0]
+        status = ['optimal']
+
+        def search(depth, value, remaining):
+            nodes[0] += 1
+            if nodes[0] > PortfolioOptimizerService.MAX_NODES:
+                status[0] = 'node_limit'
+                return
+            if value > best['value']:
+                best['value'] = value
+                best['choice'] = current.copy()
+            if depth == len(order) or value + bound(depth, remaining) <= best['value'] * (1 + gap) + 1e-6:
+                return
+            parcel = order[depth]
+            for j in per_parcel[parcel]:
+                if cost[parcel, j] <= remaining:
+                    current[parcel] = j
+                    search(depth + 1, value + score[parcel, j], remaining - cost[parcel, j])
+                    current[parcel] = -1
+            # Leave the parcel idle
+            search(depth + 1, value, remaining)
+
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, len(order) + 100))
+        try:
+            search(0, 0.0, float(budget))
+        finally:
+            sys.setrecursionlimit(limit)
+        return best['choice'], status[0]
+
+    @staticmethod
+    def _solve_brute_force(options, budget):
+        """Enumerate every assignment (reference for small cases)"""
+        n = len(options['parcels'])
+        per_parcel = [[-1] + list(np.nonzero(options['allowed'][i])[0]) for i in range(n)]
+        combinations = int(np.prod([len(choices) for choices in per_parcel], dtype=float))
+        if combinations > PortfolioOptimizerService.MAX_BRUTE_FORCE:
+            raise ValueError(f"Terlalu banyak kombinasi untuk brute force: {combinations:,}")
+
+        score = options['score']
+        cost = options['cost']
+        best_value, best_choice = 0.0, np.full(n, -1)
+        for assignment in itertools.product(*per_parcel):
+            total_cost = sum(cost[i, j] for i, j in enumerate(assignment) if j >= 0)
+            if total_cost > budget:
+                continue
+            value = sum(score[i, j] for i, j in enumerate(assignment) if j >= 0)
+            if value > best_value:
+                best_value, best_choice = value, np.array(assignment)
+        return best_choice, 'optimal'
+
+    @staticmethod
+    def _summarize(options, choice, budget, status, method, solve_ms):
+        df = options['parcels']
+        keys = options['keys']
+        idx = np.arange(len(df))
+        active = choice >= 0
+        pick = np.where(active, choice, 0)
+
+        def picked(values):
+            return np.where(active, values[idx, pick], 0.0)
+
+        templates = RABCalculatorService.RAB_TEMPLATES
+        assignment = pd.DataFrame({
+            'nama': df['nama'],
+            'luas_ha': df['luas_ha'],
+            'scenario_key': [keys[j] if j >= 0 else None for j in choice],
+            'scenario': [templates[keys[j]]['nama'] if j >= 0 else 'Tidak ditanam' for j in choice],
+            'investasi': picked(options['cost']),
+            'profit_avg': picked(options['profit']),
+            'profit_sd': picked(options['sd'])
+        })
+
+        planted = assignment[active]
+        by_scenario = planted.groupby('scenario', as_index=False).agg(
+            parcels=('nama', 'count'),
+            luas_ha=('luas_ha', 'sum'),
+            investasi=('investasi', 'sum'),
+            profit_avg=('profit_avg', 'sum')
+        )
+
+        total_cost = float(assignment['investasi'].sum())
+        return {
+            'status': status,
+            'method': method,
+            'objective_value': float(picked(options['score']).sum()),
+            'expected_profit': float(assignment['profit_avg'].sum()),
+            'profit_sd': float(assignment['profit_sd'].sum()),
+            'total_cost': total_cost,
+            'budget_left': float(budget - total_cost),
+            'solve_ms': solve_ms,
+            'assignment': assignment,
+            'by_scenario': by_scenario
+        }
@@ -0,0 +1,568 @@
+"""
+Price Forecast Service
+Per-market price models fitted in the background and cached by data version
+"""
+
+import importlib.util
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.price_history_service import PriceHistoryService
+from utils.price_simulator import simulate_prices
+
+# Models work on weekly mean log prices; one season = one year
+FREQ = 'W-SUN'
+SEASON_LENGTH = 52
+
+# z for the 90% prediction interval
+Z_90 = 1.645
+
+
+class SeasonalNaiveModel:
+    """Last year's value for the same week, shifted by the year-on-year level change"""
+
+    name = 'seasonal_naive'
+
+    def __init__(self, season_length=SEASON_LENGTH):
+        self.m = season_length
+        self.y = np.array([])
+
+    def fit(self, dates, y):
+        self.y = np.asarray(y, dtype=float)
+        return self
+
+    def update(self, dates, y, n_new):
+        self.y = np.asarray(y, dtype=float)
+        return True
+
+    def predict(self, horizon):
+        y, m = self.y, self.m
+        steps = np.arange(1, horizon + 1)
+
+        if len(y) < m + 4:
+            # Too short for a seasonal lag: naive random walk
+            sigma = np.std(np.diff(y)) if len(y) > 2 else 0.1
+            mean = np.full(horizon, y[-1])
+            spread = Z_90 * sigma * np.sqrt(steps)
+            return mean, mean - spread, mean + spread
+
+        # Level shift: last 4 weeks vs the same 4 weeks one season earlier
+        shift = y[-4:].mean() - y[-m - 4:-m].mean()
+        lags = len(y) - m * np.ceil(steps / m).astype(int) + steps - 1
+        mean = y[lags] + shift
+        sigma = np.std(y[m:] - y[:-m])
+        spread = Z_90 * sigma * np.sqrt(np.ceil(steps / m))
+        return mean, mean - spread, mean + spread
+
+
+class ETSModel:
+    """
+    Additive Holt-Winters with damped trend (on log prices)
+
+    Smoothing parameters are picked by grid search; the recursion runs
+    once over time with every grid candidate as a vector lane. update()
+    continues the recursion from the saved state for new weeks only.
+    """
+
+    name = 'ets'
+
+    ALPHAS = np.array([0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9])
+    BETAS = np.array([0.0, 0.01, 0.05, 0.1])
+    GAMMAS = np.array([0.05, 0.1, 0.2, 0.3])
+    PHIS = np.array([0.9, 0.98])
+
+    def __init__(self, season_length=SEASON_LENGTH):
+        self.m = season_length
+        self.params = None
+        self.state = None
+
+    def _run(self, y, alpha, beta, gamma, phi, level, trend, seasonal, t0):
+        """Recursion over y for G parameter lanes; returns final state and SSE"""
+        sse = np.zeros_like(level)
+        for i, value in enumerate(y):
+            slot = (t0 + i) % seasonal.shape[1]
+            damped = phi * trend
+            error = value - (level + damped + seasonal[:, slot])
+            sse += error ** 2
+            level = level + damped + alpha * error
+            trend = damped + beta * error
+            seasonal[:, slot] += gamma * error
+        return level, trend, seasonal, sse
+
+    def fit(self, dates, y):
+        y = np.asarray(y, dtype=float)
+        n = len(y)
+        seasonal_fit = n >= 2 * self.m
+        m = self.m if seasonal_fit else 1
+
+        grid = np.array(np.meshgrid(
+            self.ALPHAS,
+            self.BETAS,
+            self.GAMMAS if seasonal_fit else [0.0],
+            self.PHIS,
+            indexing='ij'
+        )).reshape(4, -1)
+        alpha, beta, gamma, phi = grid
+        lanes = grid.shape[1]
+
+        if seasonal_fit:
+            first = y[:m]
+            level0 = first.mean()
+            trend0 = (y[m:2 * m].mean() - level0) / m
+            seasonal0 = first - level0
+        else:
+            level0, trend0, seasonal0 = y[0], 0.0, np.zeros(1)
+
+        level, trend, seasonal, sse = self._run(
+            y, alpha, beta, gamma, phi,
+            np.full(lanes, level0), np.full(lanes, trend0), np.tile(seasonal0, (lanes, 1)), 0
+        )
+
+        best = int(np.argmin(sse))
+        self.params = {'alpha': alpha[best], 'beta': beta[best], 'gamma': gamma[best], 'phi': phi[best]}
+        self.state = {
+            'level': level[best],
+            'trend': trend[best],
+            'seasonal': seasonal[best].copy(),
+            't': n,
+            'sse': sse[best],
+            'n': n
+        }
+        return self
+
+    def update(self, dates, y, n_new):
+        """Extend the fit with the last n_new observations (parameters kept)"""
+        if self.state is None:
+            return False
+        p, s = self.params, self.state
+        new = np.asarray(y, dtype=float)[-n_new:]
+        level, trend, seasonal, sse = self._run(
+            new,
+            np.array([p['alpha']]), np.array([p['beta']]), np.array([p['gamma']]), np.array([p['phi']]),
+            np.array([s['level']]), np.array([s['trend']]), s['seasonal'][np.newaxis, :].copy(), s['t']
+        )
+        self.state = {
+            'level': level[0],
+            'trend': trend[0],
+            'seasonal': seasonal[0],
+            't': s['t'] + n_new,
+            'sse': s['sse'] + sse[0],
+            'n': s['n'] + n_new
+        }
+        return True
+
+    def predict(self, horizon):
+        p, s = self.params, self.state
+        steps = np.arange(1, horizon + 1)
+        damping = np.cumsum(p['phi'] ** steps)
+        slots = (s['t'] + steps - 1) % len(s['seasonal'])
+        mean = s['level'] + damping * s['trend'] + s['seasonal'][slots]
+
+        sigma = np.sqrt(s['sse'] / max(s['n'], 1))
+        spread = Z_90 * sigma * np.sqrt(1 + (steps - 1) * p['alpha'] ** 2)
+        return mean, mean - spread, mean + spread
+
+
+class ProphetModel:
+    """Prophet with yearly seasonality; refits warm-start from the previous fit"""
+
+    name = 'prophet'
+
+    def __init__(self, season_length=SEASON_LENGTH):
+        self.model = None
+
+    @staticmethod
+    def _frame(dates, y):
+        return pd.DataFrame({'ds': pd.DatetimeIndex(dates), 'y': np.asarray(y, dtype=float)})
+
+    def _fit(self, dates, y, init=None):
+        from prophet import Prophet
+
+        model = Prophet(
+            yearly_seasonality=True,
+            weekly_seasonality=False,
+            daily_seasonality=False,
+            interval_width=0.9
+        )
+        model.fit(self._frame(dates, y), init=init)
+        self.model = model
+        return self
+
+    def fit(self, dates, y):
+        return self._fit(dates, y)
+
+    def update(self, dates, y, n_new):
+        if self.model is None:
+            return False
+        params = self.model.params
+        init = {name: params[name][0][0] for name in ('k', 'm', 'sigma_obs')}
+        init.update({name: params[name][0] for name in ('delta', 'beta')})
+        self._fit(dates, y, init=init)
+        return True
+
+    def predict(self, horizon):
+        future = self.model.make_future_dataframe(periods=horizon, freq=FREQ, include_history=False)
+        forecast = self.model.predict(future)
+        return forecast['yhat'].values, forecast['yhat_lower'].values, forecast['yhat_upper'].values
+
+
+MODELS = {
+    ETSModel.name: ETSModel,
+    SeasonalNaiveModel.name: SeasonalNaiveModel,
+    ProphetModel.name: ProphetModel
+}
+
+
+class PriceForecastService:
+
+    DEFAULT_COMMODITY = 'cabai_merah_keriting'
+    DEFAULT_MARKET = 'kramat_jati'
+    DEFAULT_HORIZON_WEEKS = 12
+
+    # Full refit after this many incrementally added weeks
+    REFIT_EVERY_WEEKS = 13
+
+    # Weekly series per (commodity, market) with a version bumped on every ingest
+    _series = {}
+    # Simulated demo prices per (commodity, market); memory only, never stored
+    _demo = {}
+    # Fitted models per (commodity, market, model name)
+    _models = {}
+    # Forecasts per (commodity, market, model, version, horizon)
+    _forecasts = OrderedDict()
+    _FORECAST_CACHE_SIZE = 256
+
+    _lock = threading.Lock()
+    _pending = set()
+    _executor = None
+    _stats = {'fits': 0, 'incremental_fits': 0, 'fit_errors': 0, 'forecast_hits': 0, 'forecast_misses': 0}
+
+    @staticmethod
+    def prophet_available():
+        return importlib.util.find_spec('prophet') is not None
+
+    @staticmethod
+    def default_model():
+        """Prophet when installed, otherwise the NumPy ETS model"""
+        return ProphetModel.name if PriceForecastService.prophet_available() else ETSModel.name
+
+    @staticmethod
+    def demo_history(commodity, market):
+        """
+        Seeded demo prices for a series the store does not have yet
+
+        Kept in memory only, so simulated prices never mix with imported
+        data; as soon as a real series is ingested it is used instead.
+        """
+        key = (commodity, market)
+        with PriceForecastService._lock:
+            demo = PriceForecastService._demo.get(key)
+        if demo is None:
+            demo = simulate_prices(commodity, market)
+            with PriceForecastService._lock:
+                demo = PriceForecastService._demo.setdefault(key, demo)
+        return demo
+
+    @staticmethod
+    def is_demo(commodity, market):
+        """True while a series has no imported prices (demo data is served)"""
+        return PriceHistoryService.get_version(commodity, market) == 0
+
+    @staticmethod
+    def _to_weekly(daily):
+        """Weekly mean log price over complete weeks only"""
+        daily = daily.dropna()
+        if daily.empty:
+            return pd.Series(dtype=float)
+        weekly = np.log(daily).resample(FREQ).mean()
+        if daily.index[-1] < weekly.index[-1]:
+            weekly = weekly.iloc[:-1]
+        return weekly.dropna()
+
+    @staticmethod
+    def ingest(commodity, market, prices, fit=True):
+        """
+        Store new daily prices and schedule a refit
+
+        Rows for dates already stored replace the old value. When every
+        new row is after the last stored date the refit is incremental.
+
+        Args:
+            commodity, market: Series key
+            prices: DataFrame with date and price columns
+            fit: Schedule a background fit for the default model
+
+        Returns:
+            New data version
+        """
+        PriceHistoryService.ingest_frame(prices, commodity, market)
+        series = PriceForecastService._get_series(commodity, market)
+        if fit:
+            PriceForecastService.fit_async(commodity, market)
+        return series['version']
+
+    @staticmethod
+    def _get_series(commodity, market):
+        """
+        In-memory daily/weekly series, synced with the price store version
+
+        When the store moved one version ahead only the changed range
+        is read back; an append-only change is marked for incremental
+        model updates.
+        """
+        key = (commodity, market)
+        info = PriceHistoryService.get_series_info(commodity, market)
+        version = info['version'] if info else 0
+
+        with PriceForecastService._lock:
+            current = PriceForecastService._series.get(key)
+        if current is not None and current['version'] == version:
+            return current
+
+        appended = False
+        if info is None:
+            # Nothing imported yet: version 0 is the in-memory demo series
+            demo = PriceForecastService.demo_history(commodity, market)
+            daily = pd.Series(demo['price'].values, index=pd.DatetimeIndex(demo['date']))
+        elif current is not None and not current['demo'] and current['version'] == version - 1:
+            changed = PriceHistoryService.query(commodity, market, start=info['changed_from'])
+            new = pd.Series(changed['price'].values, index=pd.DatetimeIndex(changed['date']))
+            appended = len(new) > 0 and new.index[0] > current['daily'].index[-1]
+            daily = pd.concat([current['daily'], new])
+            daily = daily[~daily.index.duplicated(keep='last')].sort_index()
+        else:
+            history = PriceHistoryService.query(commodity, market)
+            daily = pd.Series(history['price'].values, index=pd.DatetimeIndex(history['date']))
+
+        series = {
+            'daily': daily,
+            'weekly': PriceForecastService._to_weekly(daily),
+            'version': version,
+            'demo': info is None,
+            # Weeks that only extend the previous version (incremental refit)
+            'append_from': len(current['weekly']) if appended else None,
+            'updated_at': time.time()
+        }
+        with PriceForecastService._lock:
+            latest = PriceForecastService._series.get(key)
+            if latest is None or latest['version'] < series['version']:
+                PriceForecastService._series[key] = series
+            return PriceForecastService._series[key]
+
+    @staticmethod
+    def get_history(commodity=None, market=None, freq='D'):
+        """
+        Stored prices as a DataFrame with date and price
+
+        Args:
+            freq: 'D' daily, 'W' weekly or 'M' monthly mean
+        """
+        commodity = commodity or PriceForecastService.DEFAULT_COMMODITY
+        market = market or PriceForecastService.DEFAULT_MARKET
+        if PriceForecastService.is_demo(commodity, market):
+            return PriceHistoryService.resample(PriceForecastService.demo_history(commodity, market), freq)
+        return PriceHistoryService.query(commodity, market, freq=freq)
+
+    @staticmethod
+    def get_price_stats(commodity=None, market=None, days=365):
+        """
+        Recent price summary (PriceHistoryService.get_price_stats), from
+        the demo series while nothing is imported
+
+        Returns:
+            Stats dict plus demo (True when computed from simulated prices)
+        """
+        commodity = commodity or PriceForecastService.DEFAULT_COMMODITY
+        market = market or PriceForecastService.DEFAULT_MARKET
+        if PriceForecastService.is_demo(commodity, market):
+            stats = PriceHistoryService.summarize_prices(PriceForecastService.demo_history(commodity, market), days)
+        else:
+            stats = PriceHistoryService.get_price_stats(commodity, market, days)
+        return dict(stats, demo=PriceForecastService.is_demo(commodity, market)) if stats else None
+
+    @staticmethod
+    def _fit(commodity, market, model_name):
+        """Fit (or incrementally update) a model for the current data version"""
+        key = (commodity, market, model_name)
+        series = PriceForecastService._get_series(commodity, market)
+        weekly = series['weekly']
+        if len(weekly) < 8:
+            raise ValueError(f"Data harga terlalu sedikit: {len(weekly)} minggu")
+
+        with PriceForecastService._lock:
+            entry = PriceForecastService._models.get(key)
+
+        start = time.time()
+        incremental = False
+        if (
+            entry is not None
+            and entry['version'] == series['version'] - 1
+            and series['append_from'] is not None
+            and entry['weeks_since_full'] + len(weekly) - entry['weeks'] <= PriceForecastService.REFIT_EVERY_WEEKS
+        ):
+            model = entry['model']
+            n_new = len(weekly) - entry['weeks']
+            incremental = n_new == 0 or model.update(weekly.index, weekly.values, n_new)
+
+        if not incremental:
+            model = MODELS[model_name]().fit(weekly.index, weekly.values)
+
+        new_entry = {
+            'model': model,
+            'version': series['version'],
+            'demo': series['demo'],
+            'weeks': len(weekly),
+            'last_week': weekly.index[-1],
+            'weeks_since_full': (entry['weeks_since_full'] + len(weekly) - entry['weeks']) if incremental else 0,
+            'fitted_at': time.time(),
+            'fit_s': round(time.time() - start, 3),
+            'incremental': incremental
+        }
+        with PriceForecastService._lock:
+            current = PriceForecastService._models.get(key)
+            if current is None or current['version'] <= new_entry['version']:
+                PriceForecastService._models[key] = new_entry
+            PriceForecastService._stats['incremental_fits' if incremental else 'fits'] += 1
+        return new_entry
+
+    @staticmethod
+    def fit_async(commodity=None, market=None, model_name=None):
+        """
+        Fit in the background worker (single-flight per series and model)
+
+        Returns:
+            True when a job was scheduled
+        """
+        commodity = commodity or PriceForecastService.DEFAULT_COMMODITY
+        market = market or PriceForecastService.DEFAULT_MARKET
+        model_name = model_name or PriceForecastService.default_model()
+        key = (commodity, market, model_name)
+
+        with PriceForecastService._lock:
+            if key in PriceForecastService._pending:
+                return False
+            PriceForecastService._pending.add(key)
+            if PriceForecastService._executor is None:
+                PriceForecastService._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="price-fit")
+            executor = PriceForecastService._executor
+
+        def job():
+            try:
+                # Data may change while fitting; loop until the model is current
+                while True:
+                    entry = PriceForecastService._fit(commodity, market, model_name)
+                    if entry['version'] >= PriceForecastService._get_series(commodity, market)['version']:
+                        break
+            except Exception:
+                with PriceForecastService._lock:
+                    PriceForecastService._stats['fit_errors'] += 1
+            finally:
+                with PriceForecastService._lock:
+                    PriceForecastService._pending.discard(key)
+
+        executor.submit(job)
+        return True
+
+    @staticmethod
+    def get_forecast(commodity=None, market=None, horizon_weeks=None, model_name=None, wait=False):
+        """
+        Weekly price forecast served from the model cache
+
+        The newest fitted model is used even when it lags the data
+        (stale=True); a background refit is scheduled in that case.
+
+        Args:
+            commodity: Commodity key (utils.price_simulator.COMMODITIES)
+            market: Market key (utils.price_simulator.MARKETS)
+            horizon_weeks: Weeks ahead
+            model_name: 'prophet', 'ets' or 'seasonal_naive' (default: best available)
+            wait: Fit in the calling thread when no model exists yet
+
+        Returns:
+            dict with forecast (DataFrame: date, forecast, lower, upper),
+            last_date, last_price, model, version, stale, demo (fitted on
+            simulated prices) and fitted_at;
+            None when no model is ready and wait is False
+        """
+        commodity = commodity or PriceForecastService.DEFAULT_COMMODITY
+        market = market or PriceForecastService.DEFAULT_MARKET
+        horizon = int(horizon_weeks or PriceForecastService.DEFAULT_HORIZON_WEEKS)
+        model_name = model_name or PriceForecastService.default_model()
+        key = (commodity, market, model_name)
+
+        series = PriceForecastService._get_series(commodity, market)
+        with PriceForecastService._lock:
+            entry = PriceForecastService._models.get(key)
+        # A model fitted on demo prices is never served once real data exists
+        if entry is not None and entry['demo'] and not series['demo']:
+            entry = None
+
+        if entry is None or entry['version'] < series['version']:
+            if entry is None and wait:
+                entry = PriceForecastService._fit(commodity, market, model_name)
+            else:
+                PriceForecastService.fit_async(commodity, market, model_name)
+        if entry is None:
+            return None
+
+        cache_key = key + (entry['version'], horizon)
+        with PriceForecastService._lock:
+            forecast = PriceForecastService._forecasts.get(cache_key)
+            if forecast is not None:
+                PriceForecastService._forecasts.move_to_end(cache_key)
+                PriceForecastService._stats['forecast_hits'] += 1
+
+        if forecast is None:
+            mean, lower, upper = entry['model'].predict(horizon)
+            forecast = pd.DataFrame({
+                'date': pd.date_range(entry['last_week'], periods=horizon + 1, freq=FREQ)[1:],
+                'forecast': np.exp(mean).round(-1),
+                'lower': np.exp(lower).round(-1),
+                'upper': np.exp(upper).round(-1)
+            })
+            with PriceForecastService._lock:
+                PriceForecastService._forecasts[cache_key] = forecast
+                PriceForecastService._stats['forecast_misses'] += 1
+                while len(PriceForecastService._forecasts) > PriceForecastService._FORECAST_CACHE_SIZE:
+                    PriceForecastService._forecasts.popitem(last=False)
+
+        daily = series['daily']
+        return {
+            'commodity': commodity,
+            'market': market,
+            'model': model_name,
+            'version': entry['version'],
+            'stale': entry['version'] < series['version'],
+            'demo': entry['demo'],
+            'fitted_at': entry['fitted_at'],
+            'last_date': daily.index[-1],
+            'last_price': float(daily.iloc[-1]),
+            'forecast': forecast.copy()
+        }
+
+    @staticmethod
+    def get_status():
+        """Cached models and worker statistics"""
+        with PriceForecastService._lock:
+            models = [
+                {
+                    'commodity': key[0],
+                    'market': key[1],
+                    'model': key[2],
+                    'version': entry['version'],
+                    'weeks': entry['weeks'],
+                    'fit_s': entry['fit_s'],
+                    'incremental': entry['incremental']
+                }
+                for key, entry in PriceForecastService._models.items()
+            ]
+            return dict(PriceForecastService._stats, models=models, pending=len(PriceForecastService._pending))
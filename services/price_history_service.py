@@ -0,0 +1,392 @@
+"""
+Price History Service
+Columnar on-disk price store partitioned by commodity, market and month
+"""
+
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class PriceHistoryService:
+    """
+    Daily prices stored as one .npz file per (commodity, market, month)
+
+    Each partition holds two columns (date as datetime64[D], price as
+    float64) sorted by date with one row per day. Range queries only
+    open the months they cover; a small manifest tracks a version per
+    series so caches downstream (price models) know when to refresh.
+    """
+
+    DATA_DIR = "data/price_history"
+    MANIFEST = "_manifest.json"
+
+    # Header aliases accepted on ingestion (Indonesian exports)
+    COLUMN_ALIASES = {
+        'tanggal': 'date',
+        'harga': 'price',
+        'komoditas': 'commodity',
+        'pasar': 'market'
+    }
+
+    # Resample frequencies: 'D' daily, 'W' weekly (ending Sunday), 'M' monthly
+    FREQ_RULES = {'D': 'D', 'W': 'W-SUN', 'M': 'MS'}
+
+    CSV_CHUNK_ROWS = 500000
+
+    _lock = threading.RLock()
+    _manifest = None
+    # Loaded partitions keyed by path, validated by file mtime
+    _partitions = OrderedDict()
+    _PARTITION_CACHE_SIZE = 512
+
+    # ===== LAYOUT =====
+
+    @staticmethod
+    def _series_dir(commodity, market):
+        return os.path.join(PriceHistoryService.DATA_DIR, commodity, market)
+
+    @staticmethod
+    def _partition_path(commodity, market, month):
+        return os.path.join(PriceHistoryService._series_dir(commodity, market), f"{month}.npz")
+
+    @staticmethod
+    def _load_manifest():
+        with PriceHistoryService._lock:
+            if PriceHistoryService._manifest is None:
+                path = os.path.join(PriceHistoryService.DATA_DIR, PriceHistoryService.MANIFEST)
+                try:
+                    with open(path, encoding='utf-8') as f:
+                        PriceHistoryService._manifest = json.load(f)
+                except (OSError, ValueError):
+                    PriceHistoryService._manifest = {}
+            return PriceHistoryService._manifest
+
+    @staticmethod
+    def _save_manifest():
+        path = os.path.join(PriceHistoryService.DATA_DIR, PriceHistoryService.MANIFEST)
+        os.makedirs(PriceHistoryService.DATA_DIR, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(PriceHistoryService._manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _read_partition(path):
+        """(dates, prices) for one month; empty arrays when missing"""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return np.array([], dtype='datetime64[D]'), np.array([], dtype=float)
+
+        with PriceHistoryService._lock:
+            cached = PriceHistoryService._partitions.get(path)
+            if cached is not None and cached[0] == mtime:
+                PriceHistoryService._partitions.move_to_end(path)
+                return cached[1], cached[2]
+
+        with np.load(path) as data:
+            dates, prices = data['date'], data['price']
+
+        with PriceHistoryService._lock:
+            PriceHistoryService._partitions[path] = (mtime, dates, prices)
+            while len(PriceHistoryService._partitions) > PriceHistoryService._PARTITION_CACHE_SIZE:
+                PriceHistoryService._partitions.popitem(last=False)
+        return dates, prices
+
+    @staticmethod
+    def _write_partition(path, dates, prices):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, 'wb') as f:
+            np.savez(f, date=dates, price=prices)
+        os.replace(tmp, path)
+
+    # ===== INGESTION =====
+
+    @staticmethod
+    def _normalize(df, commodity=None, market=None):
+        df = df.rename(columns=lambda c: PriceHistoryService.COLUMN_ALIASES.get(str(c).strip().lower(), str(c).strip().lower()))
+        if commodity is not None:
+            df = df.assign(commodity=commodity)
+        if market is not None:
+            df = df.assign(market=market)
+
+        missing = {'date', 'price', 'commodity', 'market'} - set(df.columns)
+        if missing:
+            raise ValueError(f"Kolom wajib tidak ada: {', '.join(sorted(missing))}")
+
+        out = pd.DataFrame({
+            'commodity': df['commodity'].astype(str),
+            'market': df['market'].astype(str),
+            'date': pd.to_datetime(df['date'], errors='coerce').dt.normalize(),
+            'price': pd.to_numeric(df['price'], errors='coerce')
+        })
+        out = out.dropna(subset=['date', 'price'])
+        return out[out['price'] > 0]
+
+    @staticmethod
+    def ingest_frame(df, commodity=None, market=None):
+        """
+        Upsert daily prices (bulk)
+
+        Duplicate (commodity, market, date) rows keep the last value,
+        both within the batch and against stored data. Partitions whose
+        content does not change are not rewritten and do not bump the
+        series version, so re-ingesting a file is a no-op.
+
+        Args:
+            df: DataFrame with date and price (+ commodity, market unless
+                given as arguments); Indonesian headers are accepted
+            commodity, market: Apply to every row
+
+        Returns:
+            dict with rows, duplicates (within the batch), inserted,
+            updated, unchanged and the series changed {"commodity/market": first changed date}
+        """
+        batch = PriceHistoryService._normalize(df, commodity, market)
+        rows = len(batch)
+        batch = batch.drop_duplicates(subset=['commodity', 'market', 'date'], keep='last')
+        batch['month'] = batch['date'].dt.strftime('%Y-%m')
+
+        summary = {
+            'rows': rows,
+            'duplicates': rows - len(batch),
+            'inserted': 0,
+            'updated': 0,
+            'unchanged': 0,
+            'series': {}
+        }
+        coverage = {}
+
+        with PriceHistoryService._lock:
+            manifest = PriceHistoryService._load_manifest()
+
+            for (c, m, month), part in batch.groupby(['commodity', 'market', 'month'], sort=True):
+                path = PriceHistoryService._partition_path(c, m, month)
+                old_dates, old_prices = PriceHistoryService._read_partition(path)
+                new_dates = part['date'].values.astype('datetime64[D]')
+                new_prices = part['price'].values.astype(float)
+
+                # Classify incoming rows against what is stored
+                exists = np.zeros(len(new_dates), dtype=bool)
+                same = np.zeros(len(new_dates), dtype=bool)
+                if len(old_dates):
+                    pos = np.minimum(np.searchsorted(old_dates, new_dates), len(old_dates) - 1)
+                    exists = old_dates[pos] == new_dates
+                    same[exists] = old_prices[pos[exists]] == new_prices[exists]
+
+                summary['inserted'] += int((~exists).sum())
+                summary['updated'] += int((exists & ~same).sum())
+                summary['unchanged'] += int(same.sum())
+                if same.all():
+                    continue
+
+                merged = pd.Series(
+                    np.concatenate([old_prices, new_prices]),
+                    index=np.concatenate([old_dates, new_dates])
+                )
+                merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+                PriceHistoryService._write_partition(
+                    path, merged.index.values.astype('datetime64[D]'), merged.values
+                )
+
+                series_key = f"{c}/{m}"
+                changed = str(new_dates[~same].min())
+                covered = coverage.setdefault(series_key, {'inserted': 0, 'first': changed, 'last': changed})
+                covered['inserted'] += int((~exists).sum())
+                covered['first'] = min(covered['first'], str(new_dates.min()))
+                covered['last'] = max(covered['last'], str(new_dates.max()))
+                summary['series'][series_key] = min(summary['series'].get(series_key, changed), changed)
+
+            for series_key, changed_from in summary['series'].items():
+                covered = coverage[series_key]
+                info = manifest.get(series_key)
+                manifest[series_key] = {
+                    'version': (info['version'] if info else 0) + 1,
+                    'changed_from': changed_from,
+                    'rows': (info['rows'] if info else 0) + covered['inserted'],
+                    'first_date': min(info['first_date'], covered['first']) if info else covered['first'],
+                    'last_date': max(info['last_date'], covered['last']) if info else covered['last'],
+                    'updated_at': datetime.now().isoformat(timespec='seconds')
+                }
+
+            if summary['series']:
+                PriceHistoryService._save_manifest()
+
+        return summary
+
+    @staticmethod
+    def ingest_csv(path, commodity=None, market=None, chunksize=None):
+        """
+        Bulk-load a CSV in chunks (long format: date, commodity, market, price)
+
+        Returns:
+            Combined ingest summary
+        """
+        total = {'rows': 0, 'duplicates': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'series': {}}
+        for chunk in pd.read_csv(path, chunksize=chunksize or PriceHistoryService.CSV_CHUNK_ROWS):
+            PriceHistoryService._add_summary(total, PriceHistoryService.ingest_frame(chunk, commodity, market))
+        return total
+
+    @staticmethod
+    def ingest_parquet(path, commodity=None, market=None):
+        """Bulk-load a Parquet file (needs pyarrow or fastparquet)"""
+        try:
+            df = pd.read_parquet(path)
+        except ImportError as e:
+            raise ImportError("Impor Parquet membutuhkan pyarrow atau fastparquet") from e
+        return PriceHistoryService.ingest_frame(df, commodity, market)
+
+    @staticmethod
+    def ingest_file(path, commodity=None, market=None):
+        """Ingest a .csv or .parquet file by extension"""
+        if str(path).lower().endswith(('.parquet', '.pq')):
+            return PriceHistoryService.ingest_parquet(path, commodity, market)
+        return PriceHistoryService.ingest_csv(path, commodity, market)
+
+    @staticmethod
+    def _add_summary(total, part):
+        for field in ('rows', 'duplicates', 'inserted', 'updated', 'unchanged'):
+            total[field] += part[field]
+        for key, changed in part['series'].items():
+            total['series'][key] = min(total['series'].get(key, changed), changed)
+
+    # ===== QUERIES =====
+
+    @staticmethod
+    def list_months(commodity, market):
+        """Stored partitions (YYYY-MM) of a series, sorted"""
+        try:
+            names = os.listdir(PriceHistoryService._series_dir(commodity, market))
+        except OSError:
+            return []
+        return sorted(n[:-4] for n in names if n.endswith('.npz'))
+
+    @staticmethod
+    def list_series():
+        """
+        Stored series with version and coverage
+
+        Returns:
+            DataFrame with commodity, market, rows, first_date, last_date, version
+        """
+        manifest = PriceHistoryService._load_manifest()
+        rows = []
+        for key, info in sorted(manifest.items()):
+            commodity, market = key.split('/')
+            rows.append({
+                'commodity': commodity,
+                'market': market,
+                'rows': info['rows'],
+                'first_date': info['first_date'],
+                'last_date': info['last_date'],
+                'version': info['version']
+            })
+        return pd.DataFrame(rows, columns=['commodity', 'market', 'rows', 'first_date', 'last_date', 'version'])
+
+    @staticmethod
+    def get_series_info(commodity, market):
+        """Manifest entry (version, changed_from, rows, first/last date) or None"""
+        return PriceHistoryService._load_manifest().get(f"{commodity}/{market}")
+
+    @staticmethod
+    def get_version(commodity, market):
+        """Data version of a series (0 when not stored)"""
+        info = PriceHistoryService.get_series_info(commodity, market)
+        return info['version'] if info else 0
+
+    @staticmethod
+    def _month_range(start, end):
+        return pd.period_range(start, end, freq='M').strftime('%Y-%m')
+
+    @staticmethod
+    def query(commodity, market, start=None, end=None, freq='D', how='mean'):
+        """
+        Prices of one series over [start, end]
+
+        Args:
+            commodity, market: Series key
+            start, end: Inclusive date bounds (default: whole series)
+            freq: 'D', 'W' or 'M'
+            how: Resample aggregation ('mean', 'min', 'max', 'median', 'last')
+
+        Returns:
+            DataFrame with date and price (sorted, no gaps filled)
+        """
+        info = PriceHistoryService.get_series_info(commodity, market)
+        if info is None:
+            return pd.DataFrame({'date': pd.to_datetime([]), 'price': pd.Series([], dtype=float)})
+
+        start = np.datetime64(pd.Timestamp(start or info['first_date']).date(), 'D')
+        end = np.datetime64(pd.Timestamp(end or info['last_date']).date(), 'D')
+
+        dates, prices = [], []
+        for month in PriceHistoryService._month_range(str(start), str(end)):
+            d, p = PriceHistoryService._read_partition(
+                PriceHistoryService._partition_path(commodity, market, month)
+            )
+            if len(d):
+                lo = np.searchsorted(d, start, side='left')
+                hi = np.searchsorted(d, end, side='right')
+                dates.append(d[lo:hi])
+                prices.append(p[lo:hi])
+
+        df = pd.DataFrame({
+            'date': pd.to_datetime(np.concatenate(dates)) if dates else pd.to_datetime([]),
+            'price': np.concatenate(prices) if prices else np.array([], dtype=float)
+        })
+        return PriceHistoryService.resample(df, freq, how)
+
+    @staticmethod
+    def resample(df, freq='D', how='mean'):
+        """Aggregate a daily date/price frame to 'D', 'W' or 'M'"""
+        if freq == 'D' or df.empty:
+            return df.reset_index(drop=True)
+        rule = PriceHistoryService.FREQ_RULES[freq]
+        out = df.set_index('date')['price'].resample(rule).agg(how).dropna()
+        return pd.DataFrame({'date': out.index, 'price': out.values})
+
+    @staticmethod
+    def get_price_stats(commodity, market, days=365):
+        """
+        Summary of recent prices for decision inputs
+
+        Returns:
+            dict with latest, mean_30d, mean, min, max, p10, p90 and
+            last_date over the last `days` days; None when not stored
+        """
+        info = PriceHistoryService.get_series_info(commodity, market)
+        if info is None:
+            return None
+        end = pd.Timestamp(info['last_date'])
+        df = PriceHistoryService.query(commodity, market, end - pd.Timedelta(days=days - 1), end)
+        return PriceHistoryService.summarize_prices(df, days)
+
+    @staticmethod
+    def summarize_prices(df, days=365):
+        """get_price_stats over a date/price frame (last `days` days of it)"""
+        if df.empty:
+            return None
+        end = pd.Timestamp(df['date'].max())
+        df = df[df['date'] > end - pd.Timedelta(days=days)]
+        prices = df['price'].values
+        recent = df[df['date'] > end - pd.Timedelta(days=30)]['price']
+        return {
+            'last_date': end.date(),
+            'latest': float(prices[-1]),
+            'mean_30d': float(recent.mean()),
+            'mean': float(prices.mean()),
+            'min': float(prices.min()),
+            'max': float(prices.max()),
+            'p10': float(np.percentile(prices, 10)),
+            'p90': float(np.percentile(prices, 90))
+        }
@@ -3,6 +3,12 @@ RAB (Rencana Anggaran Biaya) Calculator Service
 For 6 Chili Cultivation Scenarios
 """
 
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
 class RABCalculatorService:
     """Service untuk menghitung RAB budidaya cabai"""
     
@@ -255,11 +261,88 @@ class RABCalculatorService:
         }
     }
     
+    # Cache hasil compile_templates dan calculate_rab
+    # (panggil clear_cache() jika RAB_TEMPLATES diubah)
+    _compiled = None
+    _rab_cache = OrderedDict()
+    RAB_CACHE_SIZE = 256
+    
+    @staticmethod
+    def clear_cache():
+        """Hapus template ter-compile dan hasil calculate_rab yang di-cache"""
+        RABCalculatorService._compiled = None
+        RABCalculatorService._rab_cache.clear()
+    
+    @staticmethod
+    def compile_templates():
+        """
+        Compile RAB_TEMPLATES menjadi vektor biaya per hektar
+        
+        Semua item di-template bersifat linear terhadap luas, jadi satu
+        skenario cukup diwakili biaya per kategori per ha. Hasil di-cache.
+        
+        Returns:
+            Dict dengan:
+            - keys: scenario key (urutan baris)
+            - categories: kategori biaya (urutan kolom)
+            - category_order: per skenario, indeks kategori yang dipakai
+              (urutan kemunculan di template, untuk breakdown)
+            - cost_ha: array [skenario, kategori] biaya Rp/ha
+            - total_ha: array [skenario] total biaya Rp/ha
+            - yield_min, yield_max: array [skenario] kg/ha
+            - harga_min, harga_max: array [skenario] Rp/kg
+            - payback_bulan: array [skenario]
+        """
+        compiled = RABCalculatorService._compiled
+        if compiled is not None:
+            return compiled
+        
+        templates = RABCalculatorService.RAB_TEMPLATES
+        keys = list(templates.keys())
+        categories = []
+        for template in templates.values():
+            for item in template['items']:
+                if item['kategori'] not in categories:
+                    categories.append(item['kategori'])
+        
+        cost_ha = np.zeros((len(keys), len(categories)))
+        category_order = []
+        for row, key in enumerate(keys):
+            order = []
+            for item in templates[key]['items']:
+                col = categories.index(item['kategori'])
+                cost_ha[row, col] += item['volume'] * item['harga']
+                if col not in order:
+                    order.append(col)
+            category_order.append(order)
+        
+        def param(name):
+            return np.array([templates[key]['params'][name] for key in keys], dtype=float)
+        
+        compiled = {
+            'keys': keys,
+            'categories': categories,
+            'category_order': category_order,
+            'cost_ha': cost_ha,
+            'total_ha': cost_ha.sum(axis=1),
+            'yield_min': param('estimasi_yield_min'),
+            'yield_max': param('estimasi_yield_max'),
+            'harga_min': param('harga_jual_min'),
+            'harga_max': param('harga_jual_max'),
+            'payback_bulan': np.array([templates[key]['roi_bulan'] for key in keys])
+        }
+        RABCalculatorService._compiled = compiled
+        return compiled
+    
     @staticmethod
     def calculate_rab(scenario_key, luas_ha=1):
         """
         Hitung RAB untuk skenario tertentu
         
+        Biaya linear terhadap luas, jadi hasil = biaya per kategori per ha
+        (dari compile_templates) x luas_ha. Hasil di-memoize per
+        (skenario, luas) dan dikembalikan sebagai salinan.
+        
         Args:
             scenario_key: Key skenario (Organik_Terbuka, dll)
             luas_ha: Luas lahan dalam hektar
@@ -271,18 +354,37 @@ class RABCalculatorService:
         if not template:
             return None
         
-        # Hitung total biaya
-        total_biaya = 0
-        breakdown = {}
+        cache = RABCalculatorService._rab_cache
+        cache_key = (scenario_key, luas_ha)
+        result = cache.get(cache_key)
+        if result is None:
+            result = RABCalculatorService._evaluate(scenario_key, luas_ha)
+            cache[cache_key] = result
+            if len(cache) > RABCalculatorService.RAB_CACHE_SIZE:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(cache_key)
         
-        for item in template['items']:
-            biaya_item = item['volume'] * item['harga'] * luas_ha
-            total_biaya += biaya_item
-            
-            kategori = item['kategori']
-            if kategori not in breakdown:
-                breakdown[kategori] = 0
-            breakdown[kategori] += biaya_item
+        # Salinan supaya pemanggil tidak mengubah isi cache
+        return {
+            **result,
+            'luas_ha': luas_ha,
+            'breakdown': dict(result['breakdown']),
+            'proyeksi': dict(result['proyeksi'])
+        }
+    
+    @staticmethod
+    def _evaluate(scenario_key, luas_ha):
+        """Hitung RAB dari vektor biaya ter-compile (tanpa cache)"""
+        template = RABCalculatorService.RAB_TEMPLATES[scenario_key]
+        compiled = RABCalculatorService.compile_templates()
+        row = compiled['keys'].index(scenario_key)
+        
+        cost = compiled['cost_ha'][row] * luas_ha
+        total_biaya = float(cost.sum())
+        breakdown = {
+            compiled['categories'][col]: float(cost[col]) for col in compiled['category_order'][row]
+        }
         
         # Proyeksi pendapatan
         params = template['params']
@@ -330,18 +432,56 @@ class RABCalculatorService:
     @staticmethod
     def compare_scenarios(luas_ha=1):
         """Bandingkan semua 6 skenario"""
-        comparisons = []
+        columns = RABCalculatorService._compare_arrays([luas_ha])
+        return [
+            {
+                'scenario': columns['scenario'][i],
+                'investasi': float(columns['investasi'][i]),
+                'pendapatan_avg': float(columns['pendapatan_avg'][i]),
+                'profit_avg': float(columns['profit_avg'][i]),
+                'roi_avg': float(columns['roi_avg'][i]),
+                'payback_bulan': int(columns['payback_bulan'][i])
+            }
+            for i in range(len(columns['scenario']))
+        ]
+    
+    @staticmethod
+    def compare_scenarios_batch(luas_values):
+        """
+        Bandingkan semua skenario untuk banyak luas lahan sekaligus
+        
+        Args:
+            luas_values: List/array luas lahan (ha)
+        
+        Returns:
+            DataFrame (satu baris per luas x skenario) dengan luas_ha,
+            scenario_key, scenario, investasi, pendapatan_avg, profit_avg,
+            roi_avg, payback_bulan
+        """
+        return pd.DataFrame(RABCalculatorService._compare_arrays(luas_values))
+    
+    @staticmethod
+    def _compare_arrays(luas_values):
+        """Kolom perbandingan (luas x skenario, diratakan) dari vektor ter-compile"""
+        compiled = RABCalculatorService.compile_templates()
+        luas = np.atleast_1d(np.asarray(luas_values, dtype=float))[:, None]
         
-        for key in RABCalculatorService.RAB_TEMPLATES.keys():
-            result = RABCalculatorService.calculate_rab(key, luas_ha)
-            if result:
-                comparisons.append({
-                    'scenario': result['scenario'],
-                    'investasi': result['total_biaya'],
-                    'pendapatan_avg': result['proyeksi']['pendapatan_avg'],
-                    'profit_avg': result['proyeksi']['profit_avg'],
-                    'roi_avg': result['proyeksi']['roi_avg_persen'],
-                    'payback_bulan': result['proyeksi']['payback_bulan']
-                })
+        # [luas, skenario]
+        investasi = luas * compiled['total_ha']
+        pendapatan_avg = luas * (
+            compiled['yield_min'] * compiled['harga_min'] + compiled['yield_max'] * compiled['harga_max']
+        ) / 2
+        profit_avg = pendapatan_avg - investasi
         
-        return comparisons
+        n_luas, n_skenario = investasi.shape
+        names = [RABCalculatorService.RAB_TEMPLATES[key]['nama'] for key in compiled['keys']]
+        return {
+            'luas_ha': np.repeat(luas[:, 0], n_skenario),
+            'scenario_key': compiled['keys'] * n_luas,
+            'scenario': names * n_luas,
+            'investasi': investasi.ravel(),
+            'pendapatan_avg': pendapatan_avg.ravel(),
+            'profit_avg': profit_avg.ravel(),
+            'roi_avg': (profit_avg / investasi * 100).ravel(),
+            'payback_bulan': np.tile(compiled['payback_bulan'], n_luas)
+        }
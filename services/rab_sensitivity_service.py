@@ -0,0 +1,177 @@
+"""
+RAB Sensitivity Service
+Profit grids, break-even surfaces and tornado data over compiled RAB cost vectors
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.rab_calculator_service import RABCalculatorService
+
+
+class RABSensitivityService:
+
+    # Grid cells (scenario x area x yield x price) allowed in one call
+    MAX_GRID_CELLS = 50000000
+
+    # Default one-at-a-time swing for tornado charts (+/-20%)
+    TORNADO_SWING = 0.2
+
+    @staticmethod
+    def _scenario_rows(scenarios):
+        """Row indices into the compiled templates for scenario keys (None = all)"""
+        compiled = RABCalculatorService.compile_templates()
+        if scenarios is None:
+            return list(compiled['keys']), np.arange(len(compiled['keys']))
+        if isinstance(scenarios, str):
+            scenarios = [scenarios]
+        rows = []
+        for key in scenarios:
+            if key not in compiled['keys']:
+                raise ValueError(f"Skenario tidak dikenal: {key}")
+            rows.append(compiled['keys'].index(key))
+        return list(scenarios), np.array(rows)
+
+    @staticmethod
+    def evaluate_grid(prices, yields_ton_ha, areas_ha=1.0, scenarios=None, cost_factor=1.0):
+        """
+        Profit and ROI over every price x yield x area x scenario combination
+
+        All RAB costs scale linearly with area, so the per-hectare margin
+        is computed once on a [scenario, yield, price] grid and multiplied
+        by area through broadcasting. ROI does not depend on area and is
+        returned as a broadcast view (no extra memory).
+
+        Args:
+            prices: Selling prices (Rp/kg), scalar or 1-D
+            yields_ton_ha: Yields (ton/ha), scalar or 1-D
+            areas_ha: Land areas (ha), scalar or 1-D
+            scenarios: Scenario key, list of keys, or None for all
+            cost_factor: Multiplier on total RAB cost (e.g. 1.1 = 10% overrun)
+
+        Returns:
+            dict with axes (scenarios, areas, yields, prices), cost_ha per
+            scenario, and profit / roi arrays shaped [scenario, area, yield, price]
+        """
+        prices = np.atleast_1d(np.asarray(prices, dtype=float))
+        yields = np.atleast_1d(np.asarray(yields_ton_ha, dtype=float))
+        areas = np.atleast_1d(np.asarray(areas_ha, dtype=float))
+        keys, rows = RABSensitivityService._scenario_rows(scenarios)
+
+        cells = len(rows) * len(areas) * len(yields) * len(prices)
+        if cells > RABSensitivityService.MAX_GRID_CELLS:
+            raise ValueError(f"Grid terlalu besar: {cells:,} sel (maks {RABSensitivityService.MAX_GRID_CELLS:,})")
+
+        cost_ha = RABCalculatorService.compile_templates()['total_ha'][rows] * cost_factor
+
+        # [scenario, yield, price] margin per hektar
+        revenue_ha = np.multiply.outer(yields * 1000, prices)
+        margin_ha = revenue_ha[None, :, :] - cost_ha[:, None, None]
+
+        profit = margin_ha[:, None, :, :] * areas[None, :, None, None]
+        roi = margin_ha / cost_ha[:, None, None] * 100
+
+        return {
+            'scenarios': keys,
+            'areas': areas,
+            'yields': yields,
+            'prices': prices,
+            'cost_ha': cost_ha,
+            'profit': profit,
+            'roi': np.broadcast_to(roi[:, None, :, :], profit.shape)
+        }
+
+    @staticmethod
+    def break_even_surface(scenario_key, prices, yields_ton_ha, luas_ha=1.0, total_biaya=None):
+        """
+        Profit surface over price x yield with its break-even curve
+
+        Args:
+            scenario_key: RAB_TEMPLATES key
+            prices: Selling prices (Rp/kg), 1-D
+            yields_ton_ha: Yields (ton/ha), 1-D
+            luas_ha: Land area (ha)
+            total_biaya: Override total cost (Rp) for the whole area
+
+        Returns:
+            dict with prices, yields, profit [yield, price] (Rp),
+            break_even_price per yield (Rp/kg), break_even_yield per
+            price (ton/ha) and profitable_share (0-1) of the grid
+        """
+        prices = np.asarray(prices, dtype=float)
+        yields = np.asarray(yields_ton_ha, dtype=float)
+
+        if total_biaya is None:
+            grid = RABSensitivityService.evaluate_grid(prices, yields, luas_ha, scenario_key)
+            profit = grid['profit'][0, 0]
+            cost_ha = grid['cost_ha'][0]
+        else:
+            cost_ha = total_biaya / luas_ha
+            profit = (np.multiply.outer(yields * 1000, prices) - cost_ha) * luas_ha
+
+        with np.errstate(divide='ignore'):
+            break_even_price = cost_ha / (yields * 1000)
+            break_even_yield = cost_ha / (prices * 1000)
+
+        return {
+            'prices': prices,
+            'yields': yields,
+            'profit': profit,
+            'break_even_price': break_even_price,
+            'break_even_yield': break_even_yield,
+            'profitable_share': float((profit > 0).mean())
+        }
+
+    @staticmethod
+    def tornado(scenario_key, harga_jual, yield_ton_ha, luas_ha=1.0, swing=None):
+        """
+        One-at-a-time profit swings for a tornado chart
+
+        Price, yield and each cost category are moved by +/-swing while
+        everything else stays at its base value. All cases are evaluated
+        in one broadcast over a [case, input] multiplier matrix.
+
+        Args:
+            scenario_key: RAB_TEMPLATES key
+            harga_jual: Base selling price (Rp/kg)
+            yield_ton_ha: Base yield (ton/ha)
+            luas_ha: Land area (ha)
+            swing: Relative change (default TORNADO_SWING)
+
+        Returns:
+            dict with base_profit and data: DataFrame (variabel,
+            profit_low, profit_high, range) sorted by range, widest first
+        """
+        swing = RABSensitivityService.TORNADO_SWING if swing is None else swing
+        compiled = RABCalculatorService.compile_templates()
+        _, rows = RABSensitivityService._scenario_rows(scenario_key)
+        category_cost = compiled['cost_ha'][rows[0]]
+        used = category_cost > 0
+        names = ['Harga Jual', 'Yield'] + [
+            c if c.startswith('Biaya') else f"Biaya {c}" for c, u in zip(compiled['categories'], used) if u
+        ]
+        base = np.concatenate([[harga_jual, yield_ton_ha * 1000], category_cost[used]])
+
+        # Row 0: base case; rows 1..n: input i low; rows n+1..2n: input i high
+        n = len(base)
+        multipliers = np.ones((2 * n + 1, n))
+        multipliers[1 + np.arange(n), np.arange(n)] = 1 - swing
+        multipliers[1 + n + np.arange(n), np.arange(n)] = 1 + swing
+        values = multipliers * base
+
+        profit = (values[:, 0] * values[:, 1] - values[:, 2:].sum(axis=1)) * luas_ha
+        low, high = profit[1:n + 1], profit[n + 1:]
+
+        data = pd.DataFrame({
+            'variabel': names,
+            'profit_low': low,
+            'profit_high': high,
+            'range': np.abs(high - low)
+        }).sort_values('range', ascending=False).reset_index(drop=True)
+
+        return {'base_profit': float(profit[0]), 'swing': swing, 'data': data}
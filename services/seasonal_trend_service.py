@@ -0,0 +1,340 @@
+"""
+Seasonal Trend Service
+Per-farmer YoY growth, CAGR, rolling volatility and trend regressions over recorded seasons
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import warnings
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.benchmark_service import BenchmarkService, season_label, season_ordinal
+from services.database_service import DatabaseService
+
+
+def _last_valid(valid):
+    """Column index of the last True per row (-1 if none)"""
+    flipped = np.argmax(valid[:, ::-1], axis=1)
+    return np.where(valid.any(axis=1), valid.shape[1] - 1 - flipped, -1)
+
+
+def _first_valid(valid):
+    return np.where(valid.any(axis=1), np.argmax(valid, axis=1), -1)
+
+
+def _take(values, idx):
+    """values[row, idx[row]] with NaN where idx < 0"""
+    rows = np.arange(len(values))
+    return np.where(idx >= 0, values[rows, np.clip(idx, 0, None)], np.nan)
+
+
+def rolling_std(changes, window):
+    """Rolling sample std along axis 1, NaN-aware, at least 2 values per window"""
+    padded = np.pad(changes, ((0, 0), (window - 1, 0)), constant_values=np.nan)
+    windows = sliding_window_view(padded, window, axis=1)
+    counts = np.sum(~np.isnan(windows), axis=2)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        std = np.nanstd(windows, axis=2, ddof=1)
+    return np.where(counts >= 2, std, np.nan)
+
+
+def season_changes(values, relative=True):
+    """
+    Season-over-season change matrix [farmer, T - 1]
+
+    Log growth (x100, ~%) for positive metrics, plain differences for
+    metrics that can be negative (ROI in percentage points).
+    """
+    prev, curr = values[:, :-1], values[:, 1:]
+    if not relative:
+        return curr - prev
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where((prev > 0) & (curr > 0), np.log(curr / prev) * 100, np.nan)
+
+
+def trend_metrics(values, ordinals, window=4, relative=True):
+    """
+    Trend statistics for every row of a [farmer, season] matrix at once
+
+    Args:
+        values: 2-D array, NaN where a farmer has no closed season
+        ordinals: season_ordinal of each column (consecutive)
+        window: Seasons in the rolling volatility window
+        relative: False for metrics that can be negative (ROI)
+
+    Returns:
+        dict of 1-D arrays: seasons, last, yoy_pct (vs the same season a
+        year earlier), cagr_pct, volatility_pct (latest rolling std of
+        season changes), slope (per year), r2 and forecast (next season)
+    """
+    values = np.asarray(values, dtype=float)
+    ordinals = np.asarray(ordinals)
+    valid = ~np.isnan(values)
+    n = valid.sum(axis=1)
+
+    last_idx = _last_valid(valid)
+    first_idx = _first_valid(valid)
+    last = _take(values, last_idx)
+    first = _take(values, first_idx)
+
+    # Year-over-year: same season type is two ordinals back
+    year_ago = _take(values, np.where(last_idx >= 2, last_idx - 2, -1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        yoy = np.where(year_ago != 0, (last - year_ago) / np.abs(year_ago) * 100, np.nan)
+
+    years = np.where(last_idx >= 0, (ordinals[last_idx] - ordinals[first_idx]) / 2, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cagr = np.where(
+            (years > 0) & (first > 0) & (last > 0),
+            (np.power(last / first, 1 / np.where(years > 0, years, 1)) - 1) * 100,
+            np.nan
+        )
+
+    if values.shape[1] > 1:
+        volatility = rolling_std(season_changes(values, relative), window)
+        volatility = _take(volatility, np.where(last_idx >= 1, last_idx - 1, -1))
+    else:
+        volatility = np.full(len(values), np.nan)
+
+    # Least squares y = a + b * t (t in years), masked sums per row
+    t = np.where(valid, ordinals[None, :] / 2, 0.0)
+    y = np.where(valid, values, 0.0)
+    sx, sy = t.sum(axis=1), y.sum(axis=1)
+    sxx, sxy = (t * t).sum(axis=1), (t * y).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        denom = n * sxx - sx * sx
+        slope = np.where((n >= 2) & (denom > 0), (n * sxy - sx * sy) / denom, np.nan)
+        intercept = (sy - slope * sx) / n
+        fitted = intercept[:, None] + slope[:, None] * t
+        ss_res = np.where(valid, (values - fitted) ** 2, 0).sum(axis=1)
+        ss_tot = np.where(valid, (values - (sy / n)[:, None]) ** 2, 0).sum(axis=1)
+        r2 = np.where((n >= 3) & (ss_tot > 0), 1 - ss_res / ss_tot, np.nan)
+        next_t = np.where(last_idx >= 0, (ordinals[last_idx] + 1) / 2, np.nan)
+        forecast = intercept + slope * next_t
+
+    return {
+        'seasons': n,
+        'last': last,
+        'yoy_pct': yoy,
+        'cagr_pct': cagr,
+        'volatility_pct': volatility,
+        'slope': slope,
+        'r2': r2,
+        'forecast': forecast
+    }
+
+
+class SeasonalTrendService:
+
+    # Metric -> (benchmark_seasons column, relative changes)
+    METRICS = {
+        'yield': ('yield_ton_ha', True),
+        'cost': ('cost_ha', True),
+        'roi': ('roi_pct', False)
+    }
+
+    STATS = ('last', 'yoy_pct', 'cagr_pct', 'volatility_pct', 'slope', 'r2', 'forecast')
+
+    ROLLING_WINDOW = 4
+
+    _lock = threading.RLock()
+
+    @staticmethod
+    def _columns():
+        return [f"{metric}_{stat}" for metric in SeasonalTrendService.METRICS for stat in SeasonalTrendService.STATS]
+
+    @staticmethod
+    def _connect():
+        conn = sqlite3.connect(DatabaseService.DB_PATH)
+        BenchmarkService._ensure_tables(conn)
+        columns = ',\n'.join(f"                {column} REAL" for column in SeasonalTrendService._columns())
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS seasonal_trends (
+                farmer_name TEXT PRIMARY KEY,
+                signature TEXT,
+                seasons INTEGER,
+                first_season TEXT,
+                latest_season TEXT,
+{columns}
+            )
+        ''')
+        return conn
+
+    @staticmethod
+    def _closed_seasons(conn, farmers=None):
+        query = "SELECT farmer_name, season, yield_ton_ha, cost_ha, roi_pct FROM benchmark_seasons WHERE closed = 1"
+        params = []
+        if farmers is not None:
+            query += f" AND farmer_name IN ({','.join('?' * len(farmers))})"
+            params = list(farmers)
+        return pd.read_sql_query(query, conn, params=params)
+
+    @staticmethod
+    def compute(seasons):
+        """
+        Trend statistics for every farmer in one vectorized pass
+
+        Args:
+            seasons: DataFrame with farmer_name, season and the
+                yield_ton_ha / cost_ha / roi_pct columns (closed seasons)
+
+        Returns:
+            DataFrame, one row per farmer: seasons, first_season,
+            latest_season and <metric>_<stat> for every metric and STATS
+        """
+        columns = ['farmer_name', 'seasons', 'first_season', 'latest_season'] + SeasonalTrendService._columns()
+        if seasons.empty:
+            return pd.DataFrame(columns=columns)
+
+        farmer_idx, farmers = pd.factorize(seasons['farmer_name'])
+        ordinal = seasons['season'].map(season_ordinal).values
+        first_ordinal = ordinal.min()
+        col_idx = ordinal - first_ordinal
+        ordinals = np.arange(first_ordinal, ordinal.max() + 1)
+
+        result = {'farmer_name': farmers}
+        observed = np.zeros((len(farmers), len(ordinals)), dtype=bool)
+        observed[farmer_idx, col_idx] = True
+        result['seasons'] = observed.sum(axis=1)
+        result['first_season'] = [season_label(o) for o in ordinals[_first_valid(observed)]]
+        result['latest_season'] = [season_label(o) for o in ordinals[_last_valid(observed)]]
+
+        for metric, (column, relative) in SeasonalTrendService.METRICS.items():
+            matrix = np.full((len(farmers), len(ordinals)), np.nan)
+            matrix[farmer_idx, col_idx] = seasons[column].astype(float).values
+            stats = trend_metrics(matrix, ordinals, SeasonalTrendService.ROLLING_WINDOW, relative)
+            for stat in SeasonalTrendService.STATS:
+                result[f"{metric}_{stat}"] = stats[stat]
+
+        return pd.DataFrame(result)[columns]
+
+    # ===== INCREMENTAL UPDATES =====
+
+    @staticmethod
+    def refresh():
+        """
+        Recompute trends for farmers whose closed seasons changed
+
+        Benchmark seasons are synced first. Each farmer's closed seasons
+        are summarized into a signature with one grouped query; only
+        farmers whose signature differs from the stored one (a season
+        closed, or a rebuild changed values) are recomputed and upserted.
+
+        Returns:
+            Number of farmers recomputed
+        """
+        BenchmarkService.sync()
+        with SeasonalTrendService._lock:
+            conn = SeasonalTrendService._connect()
+            try:
+                current = pd.read_sql_query('''
+                    SELECT farmer_name,
+                           COUNT(*) || '|' || MAX(season) || '|' || TOTAL(yield_ton_ha)
+                               || '|' || TOTAL(cost_ha) || '|' || TOTAL(roi_pct) AS signature
+                    FROM benchmark_seasons
+                    WHERE closed = 1
+                    GROUP BY farmer_name
+                ''', conn)
+                stored = pd.read_sql_query("SELECT farmer_name, signature FROM seasonal_trends", conn)
+
+                merged = current.merge(stored, on='farmer_name', how='left', suffixes=('', '_stored'))
+                changed = merged.loc[merged['signature'] != merged['signature_stored'], 'farmer_name'].tolist()
+                removed = sorted(set(stored['farmer_name']) - set(current['farmer_name']))
+
+                if removed:
+                    conn.executemany("DELETE FROM seasonal_trends WHERE farmer_name = ?", [(f,) for f in removed])
+
+                if changed:
+                    trends = SeasonalTrendService.compute(SeasonalTrendService._closed_seasons(conn, changed))
+                    trends = trends.merge(current, on='farmer_name')
+                    columns = ['farmer_name', 'signature', 'seasons', 'first_season', 'latest_season'] + \
+                        SeasonalTrendService._columns()
+                    rows = [
+                        tuple(None if isinstance(v, float) and np.isnan(v) else v for v in row)
+                        for row in trends[columns].astype(object).itertuples(index=False)
+                    ]
+                    updates = ', '.join(f"{c} = excluded.{c}" for c in columns[1:])
+                    conn.executemany(
+                        f"INSERT INTO seasonal_trends ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                        f"ON CONFLICT(farmer_name) DO UPDATE SET {updates}",
+                        rows
+                    )
+                conn.commit()
+            finally:
+                conn.close()
+        return len(changed)
+
+    # ===== QUERIES =====
+
+    @staticmethod
+    def get_trends(farmer_name=None, refresh=True):
+        """
+        Stored trend statistics
+
+        Args:
+            farmer_name: One farmer, or None for all
+            refresh: Fold newly closed seasons in first
+
+        Returns:
+            DataFrame, one row per farmer
+        """
+        if refresh:
+            SeasonalTrendService.refresh()
+        conn = SeasonalTrendService._connect()
+        try:
+            if farmer_name is None:
+                return pd.read_sql_query("SELECT * FROM seasonal_trends ORDER BY farmer_name", conn)
+            return pd.read_sql_query(
+                "SELECT * FROM seasonal_trends WHERE farmer_name = ?", conn, params=(farmer_name,)
+            )
+        finally:
+            conn.close()
+
+    @staticmethod
+    def get_series(farmer_name):
+        """
+        A farmer's closed seasons with YoY change and rolling volatility
+
+        Returns:
+            DataFrame sorted by season: season, yield/cost/roi values,
+            <metric>_yoy_pct and <metric>_volatility_pct
+        """
+        BenchmarkService.sync()
+        conn = SeasonalTrendService._connect()
+        try:
+            seasons = SeasonalTrendService._closed_seasons(conn, [farmer_name])
+        finally:
+            conn.close()
+        if seasons.empty:
+            return pd.DataFrame()
+
+        ordinal = seasons['season'].map(season_ordinal).values
+        ordinals = np.arange(ordinal.min(), ordinal.max() + 1)
+        col_idx = ordinal - ordinals[0]
+        series = pd.DataFrame({'season': [season_label(o) for o in ordinals]})
+
+        for metric, (column, relative) in SeasonalTrendService.METRICS.items():
+            row = np.full((1, len(ordinals)), np.nan)
+            row[0, col_idx] = seasons[column].astype(float).values
+            year_ago = np.concatenate([[np.nan, np.nan], row[0, :-2]])[:len(ordinals)]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                yoy = np.where(year_ago != 0, (row[0] - year_ago) / np.abs(year_ago) * 100, np.nan)
+            if len(ordinals) > 1:
+                volatility = np.concatenate([
+                    [np.nan], rolling_std(season_changes(row, relative), SeasonalTrendService.ROLLING_WINDOW)[0]
+                ])
+            else:
+                volatility = np.array([np.nan])
+            series[metric] = row[0]
+            series[f"{metric}_yoy_pct"] = yoy
+            series[f"{metric}_volatility_pct"] = volatility
+
+        return series[series[[m for m in SeasonalTrendService.METRICS]].notna().any(axis=1)].reset_index(drop=True)
@@ -0,0 +1,300 @@
+"""
+Spray Window Service
+Hourly spray-window planner scored against the forecast and pesticide rain-fastness
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from data.pesticide_database import get_rainfast_hours
+from services.weather_client import WeatherClient
+from services.weather_service import WeatherService
+
+
+class SprayWindowService:
+
+    # Hourly fields fetched once per update cycle (cached by WeatherClient)
+    HOURLY_PARAMS = {
+        "hourly": [
+            "temperature_2m",
+            "relative_humidity_2m",
+            "precipitation_probability",
+            "precipitation",
+            "wind_speed_10m"
+        ],
+        "timezone": "Asia/Jakarta",
+        "forecast_days": 3
+    }
+
+    FIELDS = {
+        'temperature_2m': 'temp',
+        'relative_humidity_2m': 'humidity',
+        'precipitation_probability': 'rain_prob',
+        'precipitation': 'rain',
+        'wind_speed_10m': 'wind'
+    }
+
+    # Batas keras (hard limits) per jam
+    WORK_HOURS = (6, 18)
+    MAX_WIND_KMH = 15
+    MIN_WIND_KMH = 1
+    MAX_TEMP_C = 32
+    MIN_HUMIDITY = 40
+    MAX_RAIN_PROB = 40
+    MAX_RAIN_MM = 0.2
+
+    # Converted hourly arrays, keyed by the cache entries they came from
+    _arrays_cache = OrderedDict()
+    _arrays_lock = threading.Lock()
+    _ARRAYS_CACHE_SIZE = 16
+
+    @staticmethod
+    def _fetch_nowait(coords):
+        """Cache-only bulk read; misses and expired entries refresh in the background"""
+        client = WeatherService.get_client()
+        results = {}
+        errors = {}
+        for idx, (lat, lon) in enumerate(coords):
+            entry = client.fetch_stale(lat, lon, SprayWindowService.HOURLY_PARAMS)
+            if entry is None:
+                errors[idx] = "Sedang dimuat di latar belakang"
+            else:
+                results[idx] = entry
+        return {'results': results, 'errors': errors}
+
+    @staticmethod
+    def load_hourly(locations=None, timeout=5, max_workers=8, wait=True):
+        """
+        Fetch hourly forecasts and convert them to (N, H) arrays
+
+        Raw responses come from the shared client cache; the converted
+        arrays are memoized per set of cache entries, so repeated plans
+        within one update cycle skip both HTTP and parsing.
+
+        Args:
+            locations: Dict name -> {'lat', 'lon'} (default: WeatherService.LOCATIONS)
+            wait: False serves cached (possibly stale) data only and
+                refreshes in the background; uncached farms are reported
+                in failed
+
+        Returns:
+            dict with names (N), times (H), hour (H) and one (N, H) float
+            array per field, plus failed {name: error}
+        """
+        locations = locations or WeatherService.LOCATIONS
+        names = list(locations.keys())
+        coords = [(locations[n]['lat'], locations[n]['lon']) for n in names]
+
+        if wait:
+            bulk = WeatherService.get_client().fetch_many(
+                coords,
+                SprayWindowService.HOURLY_PARAMS,
+                max_workers=max_workers,
+                timeout=timeout
+            )
+        else:
+            bulk = SprayWindowService._fetch_nowait(coords)
+
+        ok = [i for i in range(len(names)) if i in bulk['results']]
+        failed = {names[i]: bulk['errors'].get(i, "Tidak ada respons") for i in range(len(names)) if i not in bulk['results']}
+
+        # Coordinates are part of the key: one refresher sweep gives every
+        # location the same fetched_at
+        signature = tuple(
+            (
+                names[i],
+                WeatherClient.cache_key(*coords[i], SprayWindowService.HOURLY_PARAMS),
+                bulk['results'][i]['fetched_at']
+            )
+            for i in ok
+        )
+        with SprayWindowService._arrays_lock:
+            arrays = SprayWindowService._arrays_cache.get(signature)
+            if arrays is not None:
+                SprayWindowService._arrays_cache.move_to_end(signature)
+                return dict(arrays, failed=failed)
+
+        arrays = SprayWindowService.to_arrays(
+            [names[i] for i in ok],
+            [bulk['results'][i]['data'] for i in ok]
+        )
+
+        with SprayWindowService._arrays_lock:
+            SprayWindowService._arrays_cache[signature] = arrays
+            while len(SprayWindowService._arrays_cache) > SprayWindowService._ARRAYS_CACHE_SIZE:
+                SprayWindowService._arrays_cache.popitem(last=False)
+
+        return dict(arrays, failed=failed)
+
+    @staticmethod
+    def to_arrays(names, responses):
+        """
+        Stack Open-Meteo hourly blocks into (N, H) arrays
+
+        Farms with a shorter horizon are NaN-padded at the end.
+        """
+        hourly = [r.get('hourly', {}) for r in responses]
+        horizon = max((len(h.get('time', [])) for h in hourly), default=0)
+        longest = max(hourly, key=lambda h: len(h.get('time', [])), default={})
+        times = np.array(longest.get('time', []), dtype=object)
+
+        arrays = {
+            'names': np.array(names, dtype=object),
+            'times': times,
+            'hour': np.array([int(t[11:13]) for t in times], dtype=np.int16)
+        }
+        for api_field, column in SprayWindowService.FIELDS.items():
+            values = np.full((len(names), horizon), np.nan)
+            for i, h in enumerate(hourly):
+                series = np.array(h.get(api_field, []), dtype=float)
+                values[i, :len(series)] = series
+            arrays[column] = values
+
+        return arrays
+
+    @staticmethod
+    def first_hour(now=None):
+        """
+        Earliest plannable forecast hour label: the current hour when it
+        has just begun, otherwise the next one (forecast timezone)
+        """
+        now = now or datetime.now(ZoneInfo(SprayWindowService.HOURLY_PARAMS['timezone']))
+        if now.minute or now.second or now.microsecond:
+            now = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        return now.strftime('%Y-%m-%dT%H:00')
+
+    @staticmethod
+    def score_hours(arrays, rainfast_hours=6, now=None):
+        """
+        Score every farm-hour for spraying (vectorized)
+
+        An hour is eligible when it is inside working hours, wind is
+        low but not calm (inversion drift), it is not too hot or dry,
+        and no rain is expected for the product's rain-fast period.
+        Hours whose rain-fast period runs past the forecast horizon, and
+        hours that have already started, are not eligible.
+
+        Args:
+            arrays: Output of load_hourly / to_arrays
+            rainfast_hours: Rain-free hours needed after application
+            now: Reference time (default: now in the forecast timezone)
+
+        Returns:
+            (score, eligible) arrays of shape (N, H); score is 0-100
+        """
+        temp = arrays['temp']
+        humidity = arrays['humidity']
+        wind = arrays['wind']
+        rainfast = max(int(rainfast_hours), 1)
+
+        # Worst rain probability / total rain over [t, t + rainfast)
+        pad = ((0, 0), (0, rainfast - 1))
+        prob_ahead = np.pad(arrays['rain_prob'], pad, constant_values=np.inf)
+        rain_ahead = np.pad(arrays['rain'], pad, constant_values=np.inf)
+        with np.errstate(invalid='ignore'):
+            prob_max = sliding_window_view(prob_ahead, rainfast, axis=1).max(axis=2)
+            rain_sum = sliding_window_view(rain_ahead, rainfast, axis=1).sum(axis=2)
+
+            start, end = SprayWindowService.WORK_HOURS
+            # Forecasts start at 00:00 today; hours already started are out
+            upcoming = np.asarray(arrays['times'], dtype=str) >= SprayWindowService.first_hour(now)
+            eligible = (
+                ((arrays['hour'] >= start) & (arrays['hour'] <= end) & upcoming)[np.newaxis, :]
+                & (wind >= SprayWindowService.MIN_WIND_KMH)
+                & (wind <= SprayWindowService.MAX_WIND_KMH)
+                & (temp <= SprayWindowService.MAX_TEMP_C)
+                & (humidity >= SprayWindowService.MIN_HUMIDITY)
+                & (prob_max <= SprayWindowService.MAX_RAIN_PROB)
+                & (rain_sum <= SprayWindowService.MAX_RAIN_MM)
+            )
+
+            # Penalti lunak: angin ideal 3-10 km/h, suhu <= 28°C, RH 50-90%
+            score = (
+                100
+                - 0.6 * prob_max
+                - 3 * np.clip(wind - 10, 0, None)
+                - 3 * np.clip(3 - wind, 0, None)
+                - 5 * np.clip(temp - 28, 0, None)
+                - 1.5 * np.clip(humidity - 90, 0, None)
+                - 1.0 * np.clip(50 - humidity, 0, None)
+            )
+
+        score = np.where(eligible, np.clip(score, 0, 100), 0.0)
+        return score, eligible
+
+    @staticmethod
+    def find_windows(arrays, score, eligible, top_k=3, min_hours=1):
+        """
+        Best contiguous eligible windows per farm
+
+        Returns:
+            dict name -> list of windows sorted by mean score, each with
+            start, end, hours, score and best_hour
+        """
+        n, horizon = eligible.shape
+        times = arrays['times']
+
+        # Run boundaries on a zero-padded mask (no run crosses farms)
+        padded = np.zeros((n, horizon + 2), dtype=np.int8)
+        padded[:, 1:-1] = eligible
+        edges = np.diff(padded, axis=1)
+        starts = np.nonzero(edges == 1)
+        ends = np.nonzero(edges == -1)
+
+        cumulative = np.zeros((n, horizon + 1))
+        cumulative[:, 1:] = np.cumsum(score, axis=1)
+
+        windows = {}
+        for farm, start, end in zip(starts[0], starts[1], ends[1]):
+            length = end - start
+            if length < min_hours:
+                continue
+            mean = (cumulative[farm, end] - cumulative[farm, start]) / length
+            best = start + int(np.argmax(score[farm, start:end]))
+            windows.setdefault(arrays['names'][farm], []).append({
+                'start': times[start],
+                'end': times[end - 1],
+                'hours': int(length),
+                'score': round(float(mean), 1),
+                'best_hour': times[best]
+            })
+
+        for name in windows:
+            windows[name].sort(key=lambda w: (-w['score'], -w['hours']))
+            windows[name] = windows[name][:top_k]
+
+        return windows
+
+    @staticmethod
+    def plan(locations=None, pesticide=None, top_k=3, min_hours=1, wait=True, now=None):
+        """
+        Plan the best spray windows for many farms
+
+        Args:
+            locations: Dict name -> {'lat', 'lon'} (default: WeatherService.LOCATIONS)
+            pesticide: Product name from PESTICIDE_DATABASE (sets rain-fastness)
+            top_k: Windows returned per farm
+            min_hours: Minimum window length
+            wait: False never blocks on the network (see load_hourly)
+            now: Reference time; earlier hours are never proposed
+
+        Returns:
+            dict with windows {name: [window]}, rainfast_hours and failed
+        """
+        arrays = SprayWindowService.load_hourly(locations, wait=wait)
+        rainfast = get_rainfast_hours(pesticide)
+
+        if len(arrays['names']) == 0:
+            return {'windows': {}, 'rainfast_hours': rainfast, 'failed': arrays['failed']}
+
+        score, eligible = SprayWindowService.score_hours(arrays, rainfast, now)
+        return {
+            'windows': SprayWindowService.find_windows(arrays, score, eligible, top_k, min_hours),
+            'rainfast_hours': rainfast,
+            'failed': arrays['failed']
+        }
@@ -0,0 +1,238 @@
+"""
+Weather Alert Engine
+Vectorized alert and spray-window rules over forecasts for many farms
+"""
+
+from itertools import chain
+
+import numpy as np
+
+# Spray status codes (same labels as WeatherService.get_spray_recommendations)
+SPRAY_STATUS = np.array(['Ideal', 'Tidak Disarankan', 'Kurang Ideal', 'Cukup Baik'])
+
+
+class WeatherAlertEngine:
+
+    # Rule thresholds (mirror WeatherService.check_alerts)
+    HEAVY_RAIN_MM = 50
+    HEAVY_RAIN_DAYS = 3
+    EXTREME_HEAT_C = 35
+    STRONG_WIND_KMH = 30
+    DROUGHT_TOTAL_MM = 5
+
+    # Open-Meteo response field per column: daily (N, D) and current (N)
+    DAILY_FIELDS = {
+        'rainfall': 'precipitation_sum',
+        'rainfall_prob': 'precipitation_probability_max',
+        'wind_speed': 'wind_speed_10m_max',
+        'temp_max': 'temperature_2m_max'
+    }
+    CURRENT_FIELDS = {
+        'current_temp': 'temperature_2m',
+        'current_wind': 'wind_speed_10m'
+    }
+
+    @staticmethod
+    def _matrix(rows, days, dtype=float, fill=np.nan):
+        """Stack per-farm lists into (N, days); short rows are padded with fill"""
+        if rows and all(len(row) == days for row in rows):
+            # Common case: one flat pass over every value, then reshape
+            try:
+                flat = np.fromiter(chain.from_iterable(rows), dtype=dtype, count=len(rows) * days)
+                return flat.reshape(len(rows), days)
+            except TypeError:
+                pass  # null values: np.array turns None into NaN below
+        out = np.full((len(rows), days), fill, dtype=dtype)
+        for i, row in enumerate(rows):
+            row = row[:days]
+            out[i, :len(row)] = row
+        return out
+
+    @staticmethod
+    def from_responses(responses_by_farm, days=7):
+        """
+        Columnar arrays straight from raw Open-Meteo forecast responses
+
+        Daily fields are already arrays in the response, so each column
+        is one NumPy conversion of N lists; no per-day dicts are built.
+        Values are rounded to 0.1 like WeatherService._parse_forecast.
+
+        Args:
+            responses_by_farm: Dict farm_id -> raw response (with current
+                and daily blocks as requested by FORECAST_PARAMS)
+            days: Forecast days to keep (shorter forecasts are NaN-padded)
+
+        Returns:
+            Same arrays as to_columns
+        """
+        farm_ids = np.array(list(responses_by_farm.keys()), dtype=object)
+        responses = list(responses_by_farm.values())
+        daily = [data['daily'] for data in responses]
+        current = [data['current'] for data in responses]
+
+        columns = {
+            'farm_ids': farm_ids,
+            'dates': WeatherAlertEngine._matrix([d['time'] for d in daily], days, dtype=object, fill='')
+        }
+        for column, field in WeatherAlertEngine.DAILY_FIELDS.items():
+            columns[column] = WeatherAlertEngine._matrix([d[field] for d in daily], days)
+        # Rules compare rounded values (rainfall_prob is already an integer)
+        for column in ('rainfall', 'wind_speed', 'temp_max'):
+            np.round(columns[column], 1, out=columns[column])
+        for column, field in WeatherAlertEngine.CURRENT_FIELDS.items():
+            columns[column] = np.round(np.array([c[field] for c in current], dtype=float).reshape(-1), 1)
+        return columns
+
+    @staticmethod
+    def to_columns(weather_by_farm, days=7):
+        """
+        Convert parsed weather dicts for N farms into columnar arrays
+
+        Prefer from_responses when the raw responses are at hand; this
+        walks every forecast day of every farm.
+
+        Args:
+            weather_by_farm: Dict farm_id -> weather dict (WeatherService.get_weather)
+            days: Forecast days to keep (shorter forecasts are NaN-padded)
+
+        Returns:
+            dict of numpy arrays: farm_ids (N), dates (N, D), rainfall,
+            rainfall_prob, wind_speed, temp_max (N, D), current_temp,
+            current_wind (N)
+        """
+        farm_ids = np.array(list(weather_by_farm.keys()), dtype=object)
+        forecasts = [weather['forecast'][:days] for weather in weather_by_farm.values()]
+        current = [weather['current'] for weather in weather_by_farm.values()]
+
+        columns = {
+            'farm_ids': farm_ids,
+            'dates': WeatherAlertEngine._matrix(
+                [[day['date'] for day in f] for f in forecasts], days, dtype=object, fill=''
+            )
+        }
+        for column in WeatherAlertEngine.DAILY_FIELDS:
+            columns[column] = WeatherAlertEngine._matrix([[day[column] for day in f] for f in forecasts], days)
+        columns['current_temp'] = np.array([c['temperature'] for c in current], dtype=float).reshape(-1)
+        columns['current_wind'] = np.array([c['wind_speed'] for c in current], dtype=float).reshape(-1)
+        return columns
+
+    @staticmethod
+    def evaluate_masks(columns):
+        """
+        Evaluate every rule as a vectorized expression
+
+        NaN (missing day) compares False, so padded days never trigger.
+
+        Returns:
+            dict of boolean masks plus spray status codes (N, D)
+        """
+        rain = columns['rainfall']
+        prob = columns['rainfall_prob']
+        wind = columns['wind_speed']
+
+        with np.errstate(invalid='ignore'):
+            heavy_rain = rain[:, :WeatherAlertEngine.HEAVY_RAIN_DAYS] > WeatherAlertEngine.HEAVY_RAIN_MM
+            heat = columns['current_temp'] > WeatherAlertEngine.EXTREME_HEAT_C
+            strong_wind = columns['current_wind'] > WeatherAlertEngine.STRONG_WIND_KMH
+            drought = np.nansum(rain, axis=1) < WeatherAlertEngine.DROUGHT_TOTAL_MM
+
+            ideal = (prob < 30) & (rain < 5) & (wind < 15)
+            not_advised = (prob > 60) | (rain > 10)
+            windy = wind > 20
+            valid = ~np.isnan(rain)
+
+        spray_code = np.select([ideal, not_advised, windy], [0, 1, 2], default=3)
+        spray_code = np.where(valid, spray_code, -1)
+
+        return {
+            'heavy_rain': heavy_rain,
+            'heat': heat,
+            'strong_wind': strong_wind,
+            'drought': drought,
+            'spray_code': spray_code
+        }
+
+    @staticmethod
+    def evaluate(columns):
+        """
+        Evaluate alerts for all farms and return only what triggered
+
+        Args:
+            columns: Output of to_columns (or equivalent arrays)
+
+        Returns:
+            dict with alerts {farm_id: [alert dicts]} and
+            spray_windows {farm_id: [ideal dates]} (farms without
+            triggers are omitted), plus summary counts
+        """
+        masks = WeatherAlertEngine.evaluate_masks(columns)
+        farm_ids = columns['farm_ids']
+        alerts = {}
+
+        def _add(i, alert):
+            alerts.setdefault(farm_ids[i], []).append(alert)
+
+        # Only the triggered cells are turned back into dicts
+        for i, j in zip(*np.nonzero(masks['heavy_rain'])):
+            rainfall = round(float(columns['rainfall'][i, j]), 1)
+            _add(i, {
+                'type': 'Hujan Lebat',
+                'severity': 'Tinggi',
+                'date': columns['dates'][i, j],
+                'description': f"Hujan lebat diprediksi ({rainfall}mm)",
+                'impact': 'Risiko banjir, tanaman stress',
+                'actions': ['Cek drainase', 'Tunda penyemprotan', 'Lindungi tanaman']
+            })
+
+        for i in np.nonzero(masks['heat'])[0]:
+            _add(i, {
+                'type': 'Panas Ekstrem',
+                'severity': 'Tinggi',
+                'date': 'Hari ini',
+                'description': f"Suhu sangat tinggi ({columns['current_temp'][i]}°C)",
+                'impact': 'Tanaman stress, kebutuhan air tinggi',
+                'actions': ['Penyiraman ekstra', 'Naungan jika perlu', 'Monitor tanaman']
+            })
+
+        for i in np.nonzero(masks['strong_wind'])[0]:
+            _add(i, {
+                'type': 'Angin Kencang',
+                'severity': 'Sedang',
+                'date': 'Hari ini',
+                'description': f"Angin kencang ({columns['current_wind'][i]} km/h)",
+                'impact': 'Tanaman roboh, spray tidak efektif',
+                'actions': ['Pasang ajir', 'Tunda penyemprotan', 'Cek tanaman']
+            })
+
+        for i in np.nonzero(masks['drought'])[0]:
+            _add(i, {
+                'type': 'Kekeringan',
+                'severity': 'Sedang',
+                'date': '7 hari ke depan',
+                'description': "Tidak ada hujan signifikan dalam 7 hari",
+                'impact': 'Tanaman kekurangan air',
+                'actions': ['Penyiraman rutin', 'Mulsa untuk retensi air', 'Monitor kelembaban tanah']
+            })
+
+        spray_windows = {}
+        for i, j in zip(*np.nonzero(masks['spray_code'] == 0)):
+            spray_windows.setdefault(farm_ids[i], []).append(columns['dates'][i, j])
+
+        return {
+            'alerts': alerts,
+            'spray_windows': spray_windows,
+            'summary': {
+                'farms': len(farm_ids),
+                'farms_with_alerts': len(alerts),
+                'heavy_rain': int(masks['heavy_rain'].any(axis=1).sum()),
+                'heat': int(masks['heat'].sum()),
+                'strong_wind': int(masks['strong_wind'].sum()),
+                'drought': int(masks['drought'].sum())
+            }
+        }
+
+    @staticmethod
+    def spray_status_table(columns):
+        """Spray status label per farm/day as an (N, D) string array"""
+        codes = WeatherAlertEngine.evaluate_masks(columns)['spray_code']
+        return np.where(codes >= 0, SPRAY_STATUS[np.clip(codes, 0, None)], '')
@@ -0,0 +1,461 @@
+"""
+Weather Client for Open-Meteo
+Pooled HTTP session with a TTL response cache keyed by rounded coordinates
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class WeatherClient:
+    """
+    HTTP client for Open-Meteo with connection pooling and caching
+
+    Responses are cached per (rounded lat, rounded lon, request params).
+    An entry expires at the next Open-Meteo update boundary, so users in
+    the same region share one upstream request per update cycle.
+    """
+
+    BASE_URL = "https://api.open-meteo.com/v1/forecast"
+    ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+
+    # Open-Meteo refreshes "current" conditions every 15 minutes
+    UPDATE_INTERVAL_S = 900
+
+    # 2 decimals ~ 1.1 km, finer than the Open-Meteo model grid
+    COORD_PRECISION = 2
+
+    # Persisted cache is written at most once per interval (debounced)
+    SAVE_INTERVAL_S = 5.0
+
+    def __init__(self, base_url=None, timeout=10, cache_path=None, max_entries=2048,
+                 pool_size=16, retries=2, archive_url=None, record_dir=None):
+        """
+        Args:
+            base_url: Forecast endpoint (override for the local stub server)
+            archive_url: Historical archive endpoint
+            timeout: Per-request timeout in seconds
+            cache_path: Optional JSON file to persist the cache across restarts
+                (written at most every SAVE_INTERVAL_S; call flush() to force)
+            max_entries: LRU bound on cached responses
+            pool_size: Max pooled connections per host
+            retries: Retries on connection errors and 5xx/429 responses
+            record_dir: Save every raw response here (fixtures for replay)
+        """
+        self.base_url = base_url or self.BASE_URL
+        self.archive_url = archive_url or self.ARCHIVE_URL
+        self.record_dir = record_dir
+        self.timeout = timeout
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",)
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'errors': 0, 'stale_served': 0, 'refreshes': 0}
+
+        # Background revalidation (stale-while-revalidate)
+        self._refreshing = set()
+        self._refresh_executor = None
+
+        # Cache persistence: one writer at a time, dirty flag + pending timer
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._save_timer = None
+
+        if cache_path:
+            self._load_cache()
+            atexit.register(self.flush)
+
+    # ===== CACHE KEYS & EXPIRY =====
+
+    @classmethod
+    def round_coords(cls, lat, lon):
+        """Round coordinates to the cache grid"""
+        return round(float(lat), cls.COORD_PRECISION), round(float(lon), cls.COORD_PRECISION)
+
+    @classmethod
+    def cache_key(cls, lat, lon, params):
+        """Stable cache key for coordinates + request params"""
+        rlat, rlon = cls.round_coords(lat, lon)
+        signature = json.dumps(params, sort_keys=True, default=str)
+        digest = hashlib.sha1(signature.encode('utf-8')).hexdigest()[:12]
+        return f"{rlat:.{cls.COORD_PRECISION}f},{rlon:.{cls.COORD_PRECISION}f}:{digest}"
+
+    @classmethod
+    def next_update(cls, now=None):
+        """Epoch seconds of the next Open-Meteo update boundary"""
+        now = time.time() if now is None else now
+        return (int(now // cls.UPDATE_INTERVAL_S) + 1) * cls.UPDATE_INTERVAL_S
+
+    # ===== FETCH =====
+
+    def fetch(self, lat, lon, params, use_cache=True):
+        """
+        Get a forecast response for one location
+
+        Args:
+            lat, lon: Coordinates
+            params: Open-Meteo query params (without latitude/longitude)
+            use_cache: Serve fresh cache entries when available
+
+        Returns:
+            dict with data (raw JSON), fetched_at (epoch), expires_at, from_cache
+
+        Raises:
+            requests.RequestException on network/HTTP failure
+        """
+        key = self.cache_key(lat, lon, params)
+
+        if use_cache:
+            entry = self.get_cached(key)
+            if entry is not None:
+                return dict(entry, from_cache=True)
+
+        rlat, rlon = self.round_coords(lat, lon)
+        query = dict(params, latitude=rlat, longitude=rlon)
+
+        try:
+            data = self._get(self.base_url, query, self.timeout)
+        except (requests.RequestException, ValueError):
+            with self._lock:
+                self._stats['errors'] += 1
+            raise
+
+        return dict(self.store(key, data), from_cache=False)
+
+    def fetch_stale(self, lat, lon, params):
+        """
+        Stale-while-revalidate read; never waits on the network
+
+        Returns the cached entry even when expired and schedules a
+        background refresh when it is expired or missing. The refreshed
+        value is served on the next call.
+
+        Returns:
+            dict with data, fetched_at, expires_at, from_cache, stale;
+            None when nothing is cached yet (a refresh is then in flight)
+        """
+        key = self.cache_key(lat, lon, params)
+        entry = self.get_cached(key, allow_stale=True)
+        stale = entry is None or entry['expires_at'] <= time.time()
+
+        if stale:
+            self.refresh_async(lat, lon, params)
+        if entry is None:
+            return None
+
+        if stale:
+            with self._lock:
+                self._stats['stale_served'] += 1
+        return dict(entry, from_cache=True, stale=stale)
+
+    def refresh_async(self, lat, lon, params):
+        """
+        Refetch one location in the background (one in flight per key)
+
+        Returns:
+            Future, or None when a refresh for this key is already running
+        """
+        key = self.cache_key(lat, lon, params)
+        with self._lock:
+            if key in self._refreshing:
+                return None
+            self._refreshing.add(key)
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="weather-refresh")
+            self._stats['refreshes'] += 1
+
+        def _done(_future):
+            with self._lock:
+                self._refreshing.discard(key)
+
+        future = self._refresh_executor.submit(self._refresh, lat, lon, params)
+        future.add_done_callback(_done)
+        return future
+
+    def _refresh(self, lat, lon, params):
+        try:
+            return self.fetch(lat, lon, params, use_cache=False)
+        except (requests.RequestException, ValueError):
+            # Already counted in fetch; the stale entry stays in place
+            return None
+
+    def fetch_many(self, coords, params, use_cache=True, chunk_size=50, max_workers=8, timeout=None):
+        """
+        Get forecasts for many locations concurrently
+
+        Cache hits are served directly. Misses are grouped into
+        Open-Meteo multi-coordinate requests (comma-separated lat/lon) that
+        run in a bounded thread pool. A failed group is retried one
+        coordinate at a time so a single bad location can't fail the rest.
+
+        Args:
+            coords: List of (lat, lon)
+            params: Open-Meteo query params (without latitude/longitude)
+            use_cache: Serve fresh cache entries when available
+            chunk_size: Coordinates per multi-coordinate request
+            max_workers: Concurrent HTTP requests
+            timeout: Per-request timeout (default: client timeout)
+
+        Returns:
+            dict with results {index: entry} and errors {index: message}
+        """
+        timeout = timeout or self.timeout
+        results = {}
+        errors = {}
+
+        # Deduplicate on the cache grid: nearby farms share one request
+        pending = OrderedDict()
+        for idx, (lat, lon) in enumerate(coords):
+            key = self.cache_key(lat, lon, params)
+            if use_cache and key not in pending:
+                entry = self.get_cached(key)
+                if entry is not None:
+                    results[idx] = dict(entry, from_cache=True)
+                    continue
+            pending.setdefault(key, {'coords': self.round_coords(lat, lon), 'indices': []})
+            pending[key]['indices'].append(idx)
+
+        keys = list(pending.keys())
+        chunks = [keys[i:i + chunk_size] for i in range(0, len(keys), chunk_size)]
+        fetched = {}
+        failed_keys = []
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._get_group, [pending[k]['coords'] for k in chunk], params, timeout): chunk
+                for chunk in chunks
+            }
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    for key, data in zip(chunk, future.result()):
+                        fetched[key] = data
+                except (requests.RequestException, ValueError):
+                    failed_keys.extend(chunk)
+
+            # Isolate failures coordinate by coordinate
+            retries = {
+                executor.submit(self._get_group, [pending[k]['coords']], params, timeout): k
+                for k in failed_keys
+            }
+            for future in as_completed(retries):
+                key = retries[future]
+                try:
+                    fetched[key] = future.result()[0]
+                except (requests.RequestException, ValueError) as e:
+                    with self._lock:
+                        self._stats['errors'] += 1
+                    for idx in pending[key]['indices']:
+                        errors[idx] = str(e)
+
+        now = time.time()
+        for key, data in fetched.items():
+            entry = self.store(key, data, fetched_at=now, persist=False)
+            for idx in pending[key]['indices']:
+                results[idx] = dict(entry, from_cache=False)
+
+        if fetched and self.cache_path:
+            self._schedule_save()
+
+        return {'results': results, 'errors': errors}
+
+    def _get_group(self, coords, params, timeout):
+        """One (multi-)coordinate request; always returns a list of responses"""
+        query = dict(
+            params,
+            latitude=",".join(str(lat) for lat, _ in coords),
+            longitude=",".join(str(lon) for _, lon in coords)
+        )
+        data = self._get(self.base_url, query, timeout)
+        data = data if isinstance(data, list) else [data]
+        if len(data) != len(coords):
+            raise ValueError("Jumlah respons tidak sesuai jumlah koordinat")
+        return data
+
+    def fetch_archive(self, lat, lon, start_date, end_date, daily=None, hourly=None,
+                      timezone="Asia/Jakarta"):
+        """
+        Get historical observations (uncached; history does not change)
+
+        Args:
+            lat, lon: Coordinates
+            start_date, end_date: ISO dates (inclusive)
+            daily: Daily variable names
+            hourly: Hourly variable names
+
+        Returns:
+            raw Open-Meteo archive JSON
+        """
+        rlat, rlon = self.round_coords(lat, lon)
+        query = {
+            'latitude': rlat,
+            'longitude': rlon,
+            'start_date': str(start_date),
+            'end_date': str(end_date),
+            'timezone': timezone
+        }
+        if daily:
+            query['daily'] = list(daily)
+        if hourly:
+            query['hourly'] = list(hourly)
+
+        return self._get(self.archive_url, query, self.timeout)
+
+    def _get(self, url, params, timeout):
+        """Single pooled GET; every HTTP call goes through here"""
+        response = self.session.get(url, params=params, timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+
+        if self.record_dir:
+            self._record(url, params, data)
+
+        return data
+
+    @staticmethod
+    def recording_name(url, params):
+        """File name of a recorded response for url + params"""
+        endpoint = url.rstrip('/').rsplit('/', 1)[-1]
+        # Coordinates arrive as floats (fetch) or joined strings (fetch_many)
+        normalized = {
+            k: str(v) if k in ('latitude', 'longitude') else v for k, v in params.items()
+        }
+        signature = json.dumps(normalized, sort_keys=True, default=str)
+        digest = hashlib.sha1(signature.encode('utf-8')).hexdigest()[:16]
+        return f"{endpoint}_{digest}.json"
+
+    def _record(self, url, params, data):
+        os.makedirs(self.record_dir, exist_ok=True)
+        path = os.path.join(self.record_dir, self.recording_name(url, params))
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'url': url, 'params': params, 'response': data}, f)
+
+    def get_cached(self, key, allow_stale=False):
+        """Return a cache entry, or None when missing/expired"""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and (allow_stale or entry['expires_at'] > time.time()):
+                self._cache.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry
+            self._stats['misses'] += 1
+            return None
+
+    def store(self, key, data, fetched_at=None, persist=True):
+        """Insert a response into the cache (evicting LRU entries)"""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        entry = {
+            'data': data,
+            'fetched_at': fetched_at,
+            'expires_at': self.next_update(fetched_at)
+        }
+
+        with self._lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+        if persist and self.cache_path:
+            self._schedule_save()
+
+        return entry
+
+    # ===== STATS & PERSISTENCE =====
+
+    def get_stats(self):
+        """Cache hit-rate statistics"""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                'hits': self._stats['hits'],
+                'misses': self._stats['misses'],
+                'errors': self._stats['errors'],
+                'stale_served': self._stats['stale_served'],
+                'refreshes': self._stats['refreshes'],
+                'hit_rate': round(self._stats['hits'] / lookups * 100, 1) if lookups else 0.0,
+                'entries': len(self._cache)
+            }
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _load_cache(self):
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        with self._lock:
+            for key, entry in entries.items():
+                self._cache[key] = entry
+
+    def _schedule_save(self):
+        """Mark the cache dirty and write it once SAVE_INTERVAL_S has passed"""
+        with self._lock:
+            self._dirty = True
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self.SAVE_INTERVAL_S, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """Write pending cache changes to cache_path now"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._dirty:
+                return
+        self._save_cache()
+
+    def _save_cache(self):
+        with self._save_lock:
+            with self._lock:
+                snapshot = dict(self._cache)
+                self._dirty = False
+
+            directory = os.path.dirname(self.cache_path) or '.'
+            os.makedirs(directory, exist_ok=True)
+
+            # Write-then-rename so a crash never leaves a truncated cache;
+            # unique temp file so concurrent writers never share one
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.weather_cache_', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp_path, self.cache_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                with self._lock:
+                    self._dirty = True
+                raise
@@ -0,0 +1,483 @@
+"""
+Weather History Service
+Local SQLite time-series store of daily/hourly observations per farm,
+with incremental backfill from the Open-Meteo archive
+"""
+
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta, date
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.weather_client import WeatherClient
+
+
+class WeatherHistoryService:
+
+    DB_PATH = "data/weather_history.db"
+
+    # Open-Meteo archive variables -> local column names
+    DAILY_VARIABLES = {
+        "temperature_2m_max": "temp_max",
+        "temperature_2m_min": "temp_min",
+        "temperature_2m_mean": "temp_mean",
+        "precipitation_sum": "rainfall",
+        "relative_humidity_2m_mean": "humidity_mean",
+        "wind_speed_10m_max": "wind_speed_max"
+    }
+
+    HOURLY_VARIABLES = {
+        "temperature_2m": "temperature",
+        "relative_humidity_2m": "humidity",
+        "dew_point_2m": "dew_point",
+        "precipitation": "rainfall",
+        "wind_speed_10m": "wind_speed"
+    }
+
+    # Days fetched per archive request during backfill
+    SYNC_CHUNK_DAYS = 92
+
+    # Default backfill horizon for a new location
+    DEFAULT_BACKFILL_DAYS = 365
+
+    _client = None
+
+    # DB_PATH whose schema has been created by this process
+    _schema_path = None
+
+    @staticmethod
+    def _connect():
+        conn = sqlite3.connect(WeatherHistoryService.DB_PATH)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @staticmethod
+    def _ensure_schema():
+        """Create the tables once per DB_PATH, so reads on a fresh store return empty"""
+        if WeatherHistoryService._schema_path != WeatherHistoryService.DB_PATH:
+            WeatherHistoryService.init_database()
+            WeatherHistoryService._schema_path = WeatherHistoryService.DB_PATH
+
+    @staticmethod
+    def get_client():
+        """Archive client (shares nothing with the forecast TTL cache)"""
+        if WeatherHistoryService._client is None:
+            WeatherHistoryService._client = WeatherClient(
+                archive_url=os.environ.get("WEATHER_ARCHIVE_URL", WeatherClient.ARCHIVE_URL)
+            )
+        return WeatherHistoryService._client
+
+    @staticmethod
+    def set_client(client):
+        """Swap the archive client (replay/simulation backends, tests)"""
+        WeatherHistoryService._client = client
+
+    @staticmethod
+    def init_database():
+        """Create tables and indexes if not exist"""
+        directory = os.path.dirname(WeatherHistoryService.DB_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = WeatherHistoryService._connect()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS weather_locations (
+                location_key TEXT PRIMARY KEY,
+                name TEXT,
+                lat REAL NOT NULL,
+                lon REAL NOT NULL,
+                last_daily_date TEXT,
+                last_hourly_time TEXT,
+                synced_at TIMESTAMP
+            )
+        ''')
+
+        # Clustered on (location, time) so range scans are sequential reads
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS weather_daily (
+                location_key TEXT NOT NULL,
+                date TEXT NOT NULL,
+                temp_max REAL,
+                temp_min REAL,
+                temp_mean REAL,
+                rainfall REAL,
+                humidity_mean REAL,
+                wind_speed_max REAL,
+                PRIMARY KEY (location_key, date)
+            ) WITHOUT ROWID
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS weather_hourly (
+                location_key TEXT NOT NULL,
+                time TEXT NOT NULL,
+                temperature REAL,
+                humidity REAL,
+                dew_point REAL,
+                rainfall REAL,
+                wind_speed REAL,
+                PRIMARY KEY (location_key, time)
+            ) WITHOUT ROWID
+        ''')
+
+        conn.commit()
+        conn.close()
+
+        return True
+
+    # ===== LOCATIONS =====
+
+    @staticmethod
+    def register_location(location_key, lat, lon, name=None):
+        """Register (or update) a farm/location to keep history for"""
+        WeatherHistoryService.init_database()
+        conn = WeatherHistoryService._connect()
+        conn.execute('''
+            INSERT INTO weather_locations (location_key, name, lat, lon)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(location_key) DO UPDATE SET
+                name = excluded.name, lat = excluded.lat, lon = excluded.lon
+        ''', (location_key, name or location_key, lat, lon))
+        conn.commit()
+        conn.close()
+
+        return True
+
+    @staticmethod
+    def get_locations():
+        """All registered locations with their sync watermarks"""
+        WeatherHistoryService.init_database()
+        conn = WeatherHistoryService._connect()
+        df = pd.read_sql_query("SELECT * FROM weather_locations ORDER BY location_key", conn)
+        conn.close()
+
+        return df.to_dict('records') if not df.empty else []
+
+    # ===== INGESTION =====
+
+    @staticmethod
+    def ingest_response(location_key, data):
+        """
+        Store one raw Open-Meteo archive/forecast response
+
+        Rows whose values are all null (archive not yet available) are
+        skipped, so the next sync fetches them again.
+
+        Args:
+            location_key: Registered location key
+            data: Raw JSON dict (may contain 'daily' and/or 'hourly')
+
+        Returns:
+            dict with number of daily and hourly rows written
+        """
+        daily_rows = WeatherHistoryService._to_rows(
+            data.get('daily'), WeatherHistoryService.DAILY_VARIABLES, location_key
+        )
+        hourly_rows = WeatherHistoryService._to_rows(
+            data.get('hourly'), WeatherHistoryService.HOURLY_VARIABLES, location_key
+        )
+
+        conn = WeatherHistoryService._connect()
+        cursor = conn.cursor()
+
+        daily_cols = list(WeatherHistoryService.DAILY_VARIABLES.values())
+        hourly_cols = list(WeatherHistoryService.HOURLY_VARIABLES.values())
+
+        if daily_rows:
+            cursor.executemany(
+                f"INSERT OR REPLACE INTO weather_daily (location_key, date, {', '.join(daily_cols)}) "
+                f"VALUES ({', '.join(['?'] * (len(daily_cols) + 2))})",
+                daily_rows
+            )
+            cursor.execute('''
+                UPDATE weather_locations SET last_daily_date = (
+                    SELECT MAX(date) FROM weather_daily WHERE location_key = ?
+                ), synced_at = CURRENT_TIMESTAMP WHERE location_key = ?
+            ''', (location_key, location_key))
+
+        if hourly_rows:
+            cursor.executemany(
+                f"INSERT OR REPLACE INTO weather_hourly (location_key, time, {', '.join(hourly_cols)}) "
+                f"VALUES ({', '.join(['?'] * (len(hourly_cols) + 2))})",
+                hourly_rows
+            )
+            cursor.execute('''
+                UPDATE weather_locations SET last_hourly_time = (
+                    SELECT MAX(time) FROM weather_hourly WHERE location_key = ?
+                ), synced_at = CURRENT_TIMESTAMP WHERE location_key = ?
+            ''', (location_key, location_key))
+
+        conn.commit()
+        conn.close()
+
+        return {'daily_rows': len(daily_rows), 'hourly_rows': len(hourly_rows)}
+
+    @staticmethod
+    def ingest_fixture(location_key, path):
+        """Ingest a recorded response file (raw JSON or WeatherClient recording)"""
+        with open(path, encoding='utf-8') as f:
+            payload = json.load(f)
+
+        data = payload.get('response', payload)
+        return WeatherHistoryService.ingest_response(location_key, data)
+
+    @staticmethod
+    def _to_rows(block, variables, location_key):
+        """Columnar Open-Meteo block -> list of row tuples (skip all-null rows)"""
+        if not block or 'time' not in block:
+            return []
+
+        columns = [block.get(src, [None] * len(block['time'])) for src in variables]
+        rows = []
+        for i, stamp in enumerate(block['time']):
+            values = [col[i] for col in columns]
+            if all(v is None for v in values):
+                continue
+            rows.append((location_key, stamp, *values))
+
+        return rows
+
+    # ===== INCREMENTAL SYNC =====
+
+    @staticmethod
+    def sync_location(location_key, end_date=None, backfill_days=None, hourly=True):
+        """
+        Incrementally backfill/append observations for one location
+
+        Fetches every day missing between the first stored day (or
+        backfill_days ago for a new location) and end_date: the tail after
+        the watermark as well as gaps inside the stored range (e.g. days
+        the archive had not published yet). Each missing run is fetched in
+        SYNC_CHUNK_DAYS chunks.
+
+        Args:
+            location_key: Registered location key
+            end_date: Last date to sync (default: yesterday)
+            backfill_days: History to fetch for a new location
+            hourly: Also sync hourly observations
+
+        Returns:
+            dict with synced range, number of missing runs and rows written
+        """
+        WeatherHistoryService.init_database()
+        conn = WeatherHistoryService._connect()
+        row = conn.execute(
+            "SELECT lat, lon, last_daily_date FROM weather_locations WHERE location_key = ?",
+            (location_key,)
+        ).fetchone()
+
+        if row is None:
+            conn.close()
+            raise ValueError(f"Lokasi belum terdaftar: {location_key}")
+
+        lat, lon, last_daily = row
+        end_date = WeatherHistoryService._as_date(end_date) if end_date else date.today() - timedelta(days=1)
+
+        first_daily = conn.execute(
+            "SELECT MIN(date) FROM weather_daily WHERE location_key = ?", (location_key,)
+        ).fetchone()[0] if last_daily else None
+        if first_daily:
+            window_start = WeatherHistoryService._as_date(first_daily)
+        else:
+            days = backfill_days or WeatherHistoryService.DEFAULT_BACKFILL_DAYS
+            window_start = end_date - timedelta(days=days - 1)
+
+        stored = {
+            d for (d,) in conn.execute(
+                "SELECT date FROM weather_daily WHERE location_key = ? AND date BETWEEN ? AND ?",
+                (location_key, window_start.isoformat(), end_date.isoformat())
+            )
+        }
+        conn.close()
+        missing = WeatherHistoryService._missing_runs(window_start, end_date, stored)
+
+        totals = {'daily_rows': 0, 'hourly_rows': 0}
+        if not missing:
+            return {'location_key': location_key, 'start_date': None, 'end_date': None, 'gaps': 0, **totals}
+
+        client = WeatherHistoryService.get_client()
+        for run_start, run_end in missing:
+            chunk_start = run_start
+            while chunk_start <= run_end:
+                chunk_end = min(run_end, chunk_start + timedelta(days=WeatherHistoryService.SYNC_CHUNK_DAYS - 1))
+                data = client.fetch_archive(
+                    lat, lon, chunk_start, chunk_end,
+                    daily=list(WeatherHistoryService.DAILY_VARIABLES),
+                    hourly=list(WeatherHistoryService.HOURLY_VARIABLES) if hourly else None
+                )
+                written = WeatherHistoryService.ingest_response(location_key, data)
+                totals['daily_rows'] += written['daily_rows']
+                totals['hourly_rows'] += written['hourly_rows']
+                chunk_start = chunk_end + timedelta(days=1)
+
+        return {
+            'location_key': location_key,
+            'start_date': missing[0][0].isoformat(),
+            'end_date': missing[-1][1].isoformat(),
+            'gaps': len(missing),
+            **totals
+        }
+
+    @staticmethod
+    def _missing_runs(start_date, end_date, stored):
+        """Contiguous (start, end) date runs in [start_date, end_date] absent from stored ISO dates"""
+        runs = []
+        day = start_date
+        while day <= end_date:
+            if day.isoformat() not in stored:
+                if runs and runs[-1][1] == day - timedelta(days=1):
+                    runs[-1] = (runs[-1][0], day)
+                else:
+                    runs.append((day, day))
+            day += timedelta(days=1)
+        return runs
+
+    @staticmethod
+    def sync_all(end_date=None):
+        """Sync every registered location; failures are reported per location"""
+        results = {}
+        for location in WeatherHistoryService.get_locations():
+            key = location['location_key']
+            try:
+                results[key] = WeatherHistoryService.sync_location(key, end_date=end_date)
+            except Exception as e:
+                results[key] = {'error': str(e)}
+
+        return results
+
+    @staticmethod
+    def _as_date(value):
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+    # ===== QUERIES =====
+
+    @staticmethod
+    def get_daily(location_key, start_date, end_date):
+        """Daily observations in [start_date, end_date] as DataFrame"""
+        WeatherHistoryService._ensure_schema()
+        conn = WeatherHistoryService._connect()
+        df = pd.read_sql_query('''
+            SELECT * FROM weather_daily
+            WHERE location_key = ? AND date BETWEEN ? AND ?
+            ORDER BY date
+        ''', conn, params=(location_key, str(start_date)[:10], str(end_date)[:10]))
+        conn.close()
+
+        return df
+
+    @staticmethod
+    def get_hourly(location_key, start_time, end_time):
+        """Hourly observations in [start_time, end_time] as DataFrame"""
+        WeatherHistoryService._ensure_schema()
+        # ISO strings sort chronologically; pad a bare end date to end of day
+        end_time = str(end_time)
+        if len(end_time) == 10:
+            end_time += "T23:59"
+
+        conn = WeatherHistoryService._connect()
+        df = pd.read_sql_query('''
+            SELECT * FROM weather_hourly
+            WHERE location_key = ? AND time BETWEEN ? AND ?
+            ORDER BY time
+        ''', conn, params=(location_key, str(start_time), end_time))
+        conn.close()
+
+        return df
+
+    @staticmethod
+    def get_aggregates(location_key, start_date, end_date, period='month'):
+        """
+        Aggregate daily observations per period in SQL
+
+        Args:
+            period: 'month', 'week' or 'year'
+
+        Returns:
+            DataFrame with rainfall total, rainy days, mean temperature/humidity
+        """
+        WeatherHistoryService._ensure_schema()
+        period_expr = {
+            'month': "substr(date, 1, 7)",
+            'week': "strftime('%Y-W%W', date)",
+            'year': "substr(date, 1, 4)"
+        }[period]
+
+        conn = WeatherHistoryService._connect()
+        df = pd.read_sql_query(f'''
+            SELECT
+                {period_expr} AS period,
+                COUNT(*) AS days,
+                SUM(rainfall) AS rainfall_total,
+                SUM(CASE WHEN rainfall >= 1 THEN 1 ELSE 0 END) AS rainy_days,
+                AVG(temp_mean) AS temp_mean,
+                MAX(temp_max) AS temp_max,
+                MIN(temp_min) AS temp_min,
+                AVG(humidity_mean) AS humidity_mean
+            FROM weather_daily
+            WHERE location_key = ? AND date BETWEEN ? AND ?
+            GROUP BY period
+            ORDER BY period
+        ''', conn, params=(location_key, str(start_date)[:10], str(end_date)[:10]))
+        conn.close()
+
+        return df
+
+    @staticmethod
+    def get_cumulative_rainfall(location_key, season_start, season_end):
+        """
+        Cumulative rainfall over a growing season (window function in SQL)
+
+        Returns:
+            DataFrame with date, rainfall and cumulative_rainfall
+        """
+        WeatherHistoryService._ensure_schema()
+        conn = WeatherHistoryService._connect()
+        df = pd.read_sql_query('''
+            SELECT
+                date,
+                rainfall,
+                SUM(COALESCE(rainfall, 0)) OVER (ORDER BY date) AS cumulative_rainfall
+            FROM weather_daily
+            WHERE location_key = ? AND date BETWEEN ? AND ?
+            ORDER BY date
+        ''', conn, params=(location_key, str(season_start)[:10], str(season_end)[:10]))
+        conn.close()
+
+        return df
+
+    @staticmethod
+    def get_season_summary(location_key, season_start, season_end):
+        """Single-row season totals used by yield and disease analytics"""
+        WeatherHistoryService._ensure_schema()
+        conn = WeatherHistoryService._connect()
+        row = conn.execute('''
+            SELECT
+                COUNT(*),
+                SUM(rainfall),
+                SUM(CASE WHEN rainfall >= 1 THEN 1 ELSE 0 END),
+                AVG(temp_mean),
+                AVG(humidity_mean)
+            FROM weather_daily
+            WHERE location_key = ? AND date BETWEEN ? AND ?
+        ''', (location_key, str(season_start)[:10], str(season_end)[:10])).fetchone()
+        conn.close()
+
+        days, rain, rainy_days, temp, humidity = row
+        return {
+            'days_observed': days,
+            'rainfall_total': round(rain or 0, 1),
+            'rainy_days': rainy_days or 0,
+            'temp_mean': round(temp, 1) if temp is not None else None,
+            'humidity_mean': round(humidity, 1) if humidity is not None else None
+        }
@@ -0,0 +1,116 @@
+"""
+Weather Refresher
+Background thread that keeps the weather cache warm for configured farm locations
+"""
+
+import threading
+import time
+from datetime import datetime
+
+
+class WeatherRefresher:
+    """
+    Refresh a fixed set of locations once per Open-Meteo update cycle
+
+    Runs a bulk fetch (fetch_many) for every params set right after each
+    update boundary, so reads through WeatherClient.fetch_stale almost
+    always find a fresh entry and never wait on the network.
+    """
+
+    # Retry sooner than the next boundary when a sweep had failures
+    RETRY_AFTER_S = 60
+
+    def __init__(self, client, locations, params_list, max_workers=4, timeout=10, offset_s=30):
+        """
+        Args:
+            client: WeatherClient (any backend) whose cache is kept warm
+            locations: Dict name -> {'lat', 'lon'}
+            params_list: Open-Meteo query params to refresh (e.g. daily + hourly)
+            max_workers: Concurrent HTTP requests per sweep
+            timeout: Per-request timeout
+            offset_s: Delay after the update boundary before sweeping
+        """
+        self.client = client
+        self.locations = dict(locations)
+        self.params_list = list(params_list)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.offset_s = offset_s
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._status_lock = threading.Lock()
+        self._status = {
+            'runs': 0,
+            'last_run': None,
+            'last_duration_s': None,
+            'last_errors': 0,
+            'next_run': None
+        }
+
+    def start(self):
+        """Start the refresh thread (no-op when already running)"""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="weather-refresher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def refresh_now(self):
+        """
+        One sweep over all locations and params sets
+
+        Returns:
+            Number of locations that failed
+        """
+        coords = [(loc['lat'], loc['lon']) for loc in self.locations.values()]
+        start = time.time()
+        errors = 0
+
+        for params in self.params_list:
+            bulk = self.client.fetch_many(
+                coords,
+                params,
+                use_cache=True,
+                max_workers=self.max_workers,
+                timeout=self.timeout
+            )
+            errors += len(bulk['errors'])
+
+        with self._status_lock:
+            self._status['runs'] += 1
+            self._status['last_run'] = datetime.fromtimestamp(start)
+            self._status['last_duration_s'] = round(time.time() - start, 3)
+            self._status['last_errors'] = errors
+
+        return errors
+
+    def get_status(self):
+        with self._status_lock:
+            return dict(self._status, running=self.is_running(), locations=len(self.locations))
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                errors = self.refresh_now()
+            except Exception:
+                # Never let one bad sweep kill the thread; stale data stays served
+                errors = len(self.locations)
+                with self._status_lock:
+                    self._status['last_errors'] = errors
+
+            next_run = self.client.next_update() + self.offset_s
+            if errors:
+                next_run = min(next_run, time.time() + self.RETRY_AFTER_S)
+            with self._status_lock:
+                self._status['next_run'] = datetime.fromtimestamp(next_run)
+            self._stop.wait(max(next_run - time.time(), 1))
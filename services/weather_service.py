@@ -3,31 +3,127 @@ Weather Service using Open-Meteo API
 Free weather data with no API key required
 """
 
-import requests
+import os
+import sys
+import threading
 from datetime import datetime, timedelta
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.weather_client import WeatherClient
+from services.weather_backends import ReplayWeatherClient, SimulatedWeatherClient
+from services.weather_alert_engine import WeatherAlertEngine
+from services.weather_refresher import WeatherRefresher
+from utils.weather_simulator import build_forecast
+
 class WeatherService:
     
     BASE_URL = "https://api.open-meteo.com/v1/forecast"
     
     # Common chili-growing regions in Indonesia
     LOCATIONS = {
-        "Jakarta": {"lat": -6.2088, "lon": 106.8456, "name": "Jakarta"},
-        "Bandung": {"lat": -6.9175, "lon": 107.6191, "name": "Bandung"},
-        "Surabaya": {"lat": -7.2575, "lon": 112.7521, "name": "Surabaya"},
-        "Yogyakarta": {"lat": -7.7956, "lon": 110.3695, "name": "Yogyakarta"},
-        "Semarang": {"lat": -6.9667, "lon": 110.4167, "name": "Semarang"},
-        "Malang": {"lat": -7.9797, "lon": 112.6304, "name": "Malang"},
-        "Bogor": {"lat": -6.5950, "lon": 106.8166, "name": "Bogor"},
-        "Garut": {"lat": -7.2211, "lon": 107.9066, "name": "Garut"}
+        "Jakarta": {"lat": -6.2088, "lon": 106.8456, "name": "Jakarta", "elevation": 8},
+        "Bandung": {"lat": -6.9175, "lon": 107.6191, "name": "Bandung", "elevation": 768},
+        "Surabaya": {"lat": -7.2575, "lon": 112.7521, "name": "Surabaya", "elevation": 5},
+        "Yogyakarta": {"lat": -7.7956, "lon": 110.3695, "name": "Yogyakarta", "elevation": 113},
+        "Semarang": {"lat": -6.9667, "lon": 110.4167, "name": "Semarang", "elevation": 10},
+        "Malang": {"lat": -7.9797, "lon": 112.6304, "name": "Malang", "elevation": 444},
+        "Bogor": {"lat": -6.5950, "lon": 106.8166, "name": "Bogor", "elevation": 265},
+        "Garut": {"lat": -7.2211, "lon": 107.9066, "name": "Garut", "elevation": 717}
+    }
+    
+    # Query params for current conditions + 7-day daily forecast
+    FORECAST_PARAMS = {
+        "current": [
+            "temperature_2m",
+            "relative_humidity_2m",
+            "precipitation",
+            "weather_code",
+            "wind_speed_10m",
+            "apparent_temperature"
+        ],
+        "daily": [
+            "temperature_2m_max",
+            "temperature_2m_min",
+            "precipitation_sum",
+            "precipitation_probability_max",
+            "weather_code",
+            "wind_speed_10m_max"
+        ],
+        "timezone": "Asia/Jakarta",
+        "forecast_days": 7
     }
     
+    # Optional on-disk cache so restarts don't refetch every location
+    CACHE_PATH = os.environ.get("WEATHER_CACHE_PATH")
+    
+    # live | simulated | replay (offline demos, reproducible load tests)
+    BACKEND = os.environ.get("WEATHER_BACKEND", "live")
+    SIMULATION_SEED = int(os.environ.get("WEATHER_SEED", "42"))
+    REPLAY_DIR = os.environ.get("WEATHER_REPLAY_DIR", "data/weather_recordings")
+    RECORD_DIR = os.environ.get("WEATHER_RECORD_DIR")
+    
+    _client = None
+    _client_lock = threading.Lock()
+    
+    @staticmethod
+    def get_client():
+        """Shared pooled/cached Open-Meteo client (one per process)"""
+        with WeatherService._client_lock:
+            if WeatherService._client is None:
+                WeatherService._client = WeatherService.create_client(WeatherService.BACKEND)
+            return WeatherService._client
+    
+    @staticmethod
+    def create_client(backend="live"):
+        """
+        Build a client for a backend; all share the WeatherClient interface
+        
+        Args:
+            backend: 'live' (Open-Meteo), 'simulated' (seeded climatology)
+                or 'replay' (responses recorded in REPLAY_DIR)
+        """
+        common = {
+            'base_url': os.environ.get("WEATHER_API_URL", WeatherService.BASE_URL),
+            'cache_path': WeatherService.CACHE_PATH,
+            'record_dir': WeatherService.RECORD_DIR
+        }
+        
+        if backend == "simulated":
+            return SimulatedWeatherClient(
+                seed=WeatherService.SIMULATION_SEED,
+                elevations=WeatherService.get_elevations(),
+                **common
+            )
+        if backend == "replay":
+            return ReplayWeatherClient(WeatherService.REPLAY_DIR, **common)
+        if backend != "live":
+            raise ValueError(f"Backend cuaca tidak dikenal: {backend}")
+        return WeatherClient(**common)
+    
+    @staticmethod
+    def get_elevations():
+        """Elevation (m) of the known locations keyed by rounded coordinates"""
+        return {
+            WeatherClient.round_coords(loc['lat'], loc['lon']): loc['elevation']
+            for loc in WeatherService.LOCATIONS.values()
+        }
+    
+    @staticmethod
+    def set_client(client):
+        """Swap the client (e.g. pointing at the local stub server)"""
+        with WeatherService._client_lock:
+            WeatherService._client = client
+    
     @staticmethod
     def get_weather(lat, lon):
         """
         Get current weather and 7-day forecast from Open-Meteo
         
+        Responses are shared through the client's TTL cache, so repeated
+        calls for the same area within one update cycle don't hit the API.
+        
         Args:
             lat: Latitude
             lon: Longitude
@@ -36,70 +132,198 @@ class WeatherService:
             dict with current weather and forecast
         """
         try:
-            # API parameters
-            params = {
-                "latitude": lat,
-                "longitude": lon,
-                "current": [
-                    "temperature_2m",
-                    "relative_humidity_2m",
-                    "precipitation",
-                    "weather_code",
-                    "wind_speed_10m",
-                    "apparent_temperature"
-                ],
-                "daily": [
-                    "temperature_2m_max",
-                    "temperature_2m_min",
-                    "precipitation_sum",
-                    "precipitation_probability_max",
-                    "weather_code",
-                    "wind_speed_10m_max"
-                ],
-                "timezone": "Asia/Jakarta",
-                "forecast_days": 7
-            }
-            
-            response = requests.get(WeatherService.BASE_URL, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Parse current weather
-            current = {
-                'temperature': round(data['current']['temperature_2m'], 1),
-                'feels_like': round(data['current']['apparent_temperature'], 1),
-                'humidity': data['current']['relative_humidity_2m'],
-                'rainfall': round(data['current']['precipitation'], 1),
-                'wind_speed': round(data['current']['wind_speed_10m'], 1),
-                'weather_code': data['current']['weather_code'],
-                'condition': WeatherService._get_weather_condition(data['current']['weather_code']),
-                'timestamp': datetime.now()
-            }
-            
-            # Parse forecast
-            forecast = []
-            for i in range(7):
-                forecast.append({
-                    'date': data['daily']['time'][i],
-                    'temp_max': round(data['daily']['temperature_2m_max'][i], 1),
-                    'temp_min': round(data['daily']['temperature_2m_min'][i], 1),
-                    'rainfall': round(data['daily']['precipitation_sum'][i], 1),
-                    'rainfall_prob': data['daily']['precipitation_probability_max'][i],
-                    'weather_code': data['daily']['weather_code'][i],
-                    'condition': WeatherService._get_weather_condition(data['daily']['weather_code'][i]),
-                    'wind_speed': round(data['daily']['wind_speed_10m_max'][i], 1)
-                })
-            
-            return {
-                'current': current,
-                'forecast': forecast,
-                'location': {'lat': lat, 'lon': lon}
-            }
+            entry = WeatherService.get_client().fetch(lat, lon, WeatherService.FORECAST_PARAMS)
+            return WeatherService._parse_forecast(entry['data'], lat, lon, entry['fetched_at'])
         
         except Exception as e:
             # Return simulated data as fallback
             return WeatherService._get_simulated_weather(lat, lon)
     
+    @staticmethod
+    def get_weather_nowait(lat, lon):
+        """
+        Weather without waiting on the network (stale-while-revalidate)
+        
+        Serves the cached forecast immediately, even when expired, and
+        refreshes it in the background; the next call sees the new data.
+        On a cold cache the seeded simulation is returned, flagged with
+        placeholder=True, while the first fetch runs.
+        
+        Returns:
+            weather dict as get_weather, plus stale and placeholder flags
+        """
+        entry = WeatherService.get_client().fetch_stale(lat, lon, WeatherService.FORECAST_PARAMS)
+        
+        if entry is not None:
+            try:
+                weather = WeatherService._parse_forecast(entry['data'], lat, lon, entry['fetched_at'])
+                weather.update(stale=entry['stale'], placeholder=False)
+                return weather
+            except (KeyError, IndexError, TypeError):
+                pass
+        
+        weather = WeatherService._get_simulated_weather(lat, lon)
+        weather.update(stale=True, placeholder=True)
+        return weather
+    
+    @staticmethod
+    def create_refresher(locations=None, extra_params=()):
+        """
+        Background refresher that keeps the shared cache warm
+        
+        Args:
+            locations: Dict name -> {'lat', 'lon'} (default: LOCATIONS)
+            extra_params: Additional query param sets (e.g. hourly spray fields)
+        
+        Returns:
+            WeatherRefresher (call .start())
+        """
+        return WeatherRefresher(
+            WeatherService.get_client(),
+            locations or WeatherService.LOCATIONS,
+            [WeatherService.FORECAST_PARAMS] + list(extra_params)
+        )
+    
+    @staticmethod
+    def _parse_forecast(data, lat, lon, fetched_at=None):
+        """Convert a raw Open-Meteo response into the app's weather dict"""
+        # Parse current weather
+        current = {
+            'temperature': round(data['current']['temperature_2m'], 1),
+            'feels_like': round(data['current']['apparent_temperature'], 1),
+            'humidity': data['current']['relative_humidity_2m'],
+            'rainfall': round(data['current']['precipitation'], 1),
+            'wind_speed': round(data['current']['wind_speed_10m'], 1),
+            'weather_code': data['current']['weather_code'],
+            'condition': WeatherService._get_weather_condition(data['current']['weather_code']),
+            'timestamp': datetime.fromtimestamp(fetched_at) if fetched_at else datetime.now()
+        }
+        
+        # Parse forecast
+        forecast = []
+        for i in range(len(data['daily']['time'])):
+            forecast.append({
+                'date': data['daily']['time'][i],
+                'temp_max': round(data['daily']['temperature_2m_max'][i], 1),
+                'temp_min': round(data['daily']['temperature_2m_min'][i], 1),
+                'rainfall': round(data['daily']['precipitation_sum'][i], 1),
+                'rainfall_prob': data['daily']['precipitation_probability_max'][i],
+                'weather_code': data['daily']['weather_code'][i],
+                'condition': WeatherService._get_weather_condition(data['daily']['weather_code'][i]),
+                'wind_speed': round(data['daily']['wind_speed_10m_max'][i], 1)
+            })
+        
+        return {
+            'current': current,
+            'forecast': forecast,
+            'location': {'lat': lat, 'lon': lon}
+        }
+    
+    @staticmethod
+    def get_weather_bulk(locations=None, timeout=5, max_workers=8):
+        """
+        Get weather for many locations at once
+        
+        Uses Open-Meteo multi-coordinate requests in parallel, with
+        per-request timeouts. Failures are reported per location instead of
+        failing the whole sweep.
+        
+        Args:
+            locations: Dict name -> {'lat', 'lon'} (default: LOCATIONS)
+            timeout: Per-request timeout in seconds
+            max_workers: Concurrent HTTP requests
+        
+        Returns:
+            dict with weather {name: weather dict}, failed {name: error}
+            and stats
+        """
+        start = datetime.now()
+        names, coords, bulk = WeatherService._fetch_bulk(locations, timeout, max_workers)
+        
+        weather = {}
+        failed = {}
+        for idx, name in enumerate(names):
+            lat, lon = coords[idx]
+            if idx in bulk['results']:
+                entry = bulk['results'][idx]
+                try:
+                    weather[name] = WeatherService._parse_forecast(entry['data'], lat, lon, entry['fetched_at'])
+                except (KeyError, IndexError, TypeError) as e:
+                    failed[name] = f"Respons tidak valid: {e}"
+            else:
+                failed[name] = bulk['errors'].get(idx, "Tidak ada respons")
+        
+        return {
+            'weather': weather,
+            'failed': failed,
+            'stats': {
+                'requested': len(names),
+                'succeeded': len(weather),
+                'failed': len(failed),
+                'from_cache': sum(1 for e in bulk['results'].values() if e['from_cache']),
+                'elapsed_s': round((datetime.now() - start).total_seconds(), 3)
+            }
+        }
+    
+    @staticmethod
+    def _fetch_bulk(locations, timeout, max_workers):
+        """Raw multi-coordinate fetch shared by the bulk weather/alert paths"""
+        locations = locations or WeatherService.LOCATIONS
+        names = list(locations.keys())
+        coords = [(locations[n]['lat'], locations[n]['lon']) for n in names]
+        bulk = WeatherService.get_client().fetch_many(
+            coords,
+            WeatherService.FORECAST_PARAMS,
+            max_workers=max_workers,
+            timeout=timeout
+        )
+        return names, coords, bulk
+    
+    @staticmethod
+    def get_alerts_bulk(locations=None, timeout=5, max_workers=8):
+        """
+        Fetch weather for many locations and evaluate alerts in one pass
+        
+        Columns are built straight from the raw responses; no per-day
+        weather dicts are parsed for locations that only need alerts.
+        
+        Returns:
+            dict with alerts {name: [alert]}, spray_windows {name: [date]},
+            summary, and the failed locations of the fetch
+        """
+        names, _, bulk = WeatherService._fetch_bulk(locations, timeout, max_workers)
+        
+        responses = {}
+        failed = {}
+        for idx, name in enumerate(names):
+            entry = bulk['results'].get(idx)
+            if entry is None:
+                failed[name] = bulk['errors'].get(idx, "Tidak ada respons")
+            elif not WeatherService._has_alert_fields(entry['data']):
+                failed[name] = "Respons tidak valid"
+            else:
+                responses[name] = entry['data']
+        
+        result = WeatherAlertEngine.evaluate(WeatherAlertEngine.from_responses(responses))
+        result['failed'] = failed
+        return result
+    
+    @staticmethod
+    def _has_alert_fields(data):
+        """Raw response carries every field WeatherAlertEngine.from_responses reads"""
+        try:
+            return (
+                all(field in data['daily'] for field in ['time', *WeatherAlertEngine.DAILY_FIELDS.values()])
+                and all(field in data['current'] for field in WeatherAlertEngine.CURRENT_FIELDS.values())
+            )
+        except (KeyError, TypeError):
+            return False
+    
+    @staticmethod
+    def get_cache_stats():
+        """Hit-rate statistics of the shared weather cache"""
+        return WeatherService.get_client().get_stats()
+    
     @staticmethod
     def _get_weather_condition(code):
         """Convert WMO weather code to description"""
@@ -133,38 +357,23 @@ class WeatherService:
     
     @staticmethod
     def _get_simulated_weather(lat, lon):
-        """Fallback simulated weather data"""
-        import random
-        
-        current = {
-            'temperature': round(25 + random.uniform(-3, 8), 1),
-            'feels_like': round(27 + random.uniform(-3, 8), 1),
-            'humidity': random.randint(60, 90),
-            'rainfall': round(random.uniform(0, 5), 1),
-            'wind_speed': round(random.uniform(5, 20), 1),
-            'weather_code': random.choice([0, 1, 2, 3, 61, 63]),
-            'condition': random.choice(["Cerah", "Berawan", "Hujan Ringan"]),
-            'timestamp': datetime.now()
-        }
-        
-        forecast = []
-        for i in range(7):
-            forecast.append({
-                'date': (datetime.now() + timedelta(days=i)).strftime("%Y-%m-%d"),
-                'temp_max': round(28 + random.uniform(-3, 5), 1),
-                'temp_min': round(22 + random.uniform(-3, 3), 1),
-                'rainfall': round(random.uniform(0, 30), 1),
-                'rainfall_prob': random.randint(20, 80),
-                'weather_code': random.choice([0, 1, 2, 3, 61, 63]),
-                'condition': random.choice(["Cerah", "Berawan", "Hujan"]),
-                'wind_speed': round(random.uniform(5, 25), 1)
-            })
+        """
+        Fallback simulated weather data
         
-        return {
-            'current': current,
-            'forecast': forecast,
-            'location': {'lat': lat, 'lon': lon}
-        }
+        Seeded from SIMULATION_SEED, location and date, so reruns show
+        the same numbers for the same day.
+        """
+        elevation = WeatherService.get_elevations().get(
+            WeatherClient.round_coords(lat, lon),
+            SimulatedWeatherClient.DEFAULT_ELEVATION_M
+        )
+        data = build_forecast(
+            lat, lon,
+            WeatherService.FORECAST_PARAMS,
+            seed=WeatherService.SIMULATION_SEED,
+            elevation=elevation
+        )
+        return WeatherService._parse_forecast(data, lat, lon)
     
     @staticmethod
     def check_alerts(weather_data):
@@ -0,0 +1,254 @@
+"""
+Field Image Tiling Utilities
+Windowed reads and tile grids for drone orthophotos and wide field shots
+"""
+
+import os
+import tempfile
+import threading
+import warnings
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Upper bound for field images. Drone orthophotos exceed PIL's default
+# decompression-bomb guard, so the tiled reader raises the limit to this
+# cap only while opening a field image; everywhere else PIL's guard stays
+FIELD_MAX_PIXELS = 200_000_000
+
+_open_lock = threading.Lock()
+
+# Rows copied per step when spilling a decoded image into a memmap
+SPILL_BAND_ROWS = 512
+
+
+def open_field_image(source, cache_dir=None):
+    """
+    Open a large field image for windowed access
+
+    Args:
+        source: numpy array (BGR), path to .npy / .tif / .jpg / .png,
+                or a file-like object (Streamlit upload)
+        cache_dir: Directory for the spilled memmap (default: system temp)
+
+    Returns:
+        numpy array or memmap of shape (H, W, 3) in BGR order.
+        Slicing it only touches the requested window.
+
+    Raises:
+        ValueError: image larger than FIELD_MAX_PIXELS
+
+    Only .npy and uncompressed TIFF are read without decoding the full
+    image. JPEG, PNG and compressed TIFF cannot be decoded by window:
+    they are decoded once in full (about 3 bytes per pixel, ~300 MB for
+    100 MP) and spilled to disk band by band, after which the decoded
+    copy is released. Convert very large orthophotos to uncompressed
+    TIFF or .npy to keep them out of RAM entirely.
+    """
+    if isinstance(source, np.ndarray):
+        return source
+
+    if isinstance(source, (str, os.PathLike)):
+        path = str(source)
+        ext = os.path.splitext(path)[1].lower()
+
+        # Pre-converted arrays are memory-mapped directly
+        if ext == '.npy':
+            return np.load(path, mmap_mode='r')
+
+        # Uncompressed TIFF orthophotos can be mapped without decoding
+        if ext in ('.tif', '.tiff'):
+            mapped = _try_tiff_memmap(path)
+            if mapped is not None:
+                return mapped
+
+    return _spill_to_memmap(source, cache_dir)
+
+
+def _try_tiff_memmap(path):
+    """Memory-map an uncompressed RGB TIFF via tifffile when available"""
+    try:
+        import tifffile
+    except ImportError:
+        return None
+
+    try:
+        rgb = tifffile.memmap(path, mode='r')
+    except (ValueError, OSError):
+        # Compressed or tiled TIFF: fall back to spilling
+        return None
+
+    if rgb.ndim != 3 or rgb.shape[2] < 3 or rgb.dtype != np.uint8:
+        return None
+
+    # Reverse channel axis lazily (view, no copy) to get BGR
+    return rgb[:, :, 2::-1]
+
+
+def _open_capped(source):
+    """
+    Image.open with the decompression-bomb limit raised to FIELD_MAX_PIXELS
+
+    The limit is a PIL global, so it is raised only around the header
+    read (serialized by a lock) and restored right after.
+    """
+    with _open_lock:
+        previous = Image.MAX_IMAGE_PIXELS
+        Image.MAX_IMAGE_PIXELS = FIELD_MAX_PIXELS
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+                image = Image.open(source)
+        except Image.DecompressionBombError as e:
+            raise ValueError(
+                f"Gambar terlalu besar (maks {FIELD_MAX_PIXELS / 1e6:.0f} MP)"
+            ) from e
+        finally:
+            Image.MAX_IMAGE_PIXELS = previous
+
+    # PIL only errors at twice its limit; enforce the cap itself here
+    width, height = image.size
+    if width * height > FIELD_MAX_PIXELS:
+        image.close()
+        raise ValueError(f"Gambar terlalu besar (maks {FIELD_MAX_PIXELS / 1e6:.0f} MP)")
+    return image
+
+
+def _spill_to_memmap(source, cache_dir=None):
+    """
+    Decode an image band by band into an on-disk BGR memmap
+
+    The decoder owns one full decoded copy while bands are copied out
+    (JPEG/PNG have no windowed decode); color conversion happens per
+    band so no second full-size copy is made. Every later tile read
+    comes from the page cache instead of an in-memory array.
+    """
+    image = _open_capped(source)
+
+    width, height = image.size
+    fd, path = tempfile.mkstemp(suffix='.npy', dir=cache_dir)
+    os.close(fd)
+
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(height, width, 3))
+    for top in range(0, height, SPILL_BAND_ROWS):
+        bottom = min(height, top + SPILL_BAND_ROWS)
+        band = image.crop((0, top, width, bottom))
+        if band.mode != 'RGB':
+            band = band.convert('RGB')
+        out[top:bottom] = np.asarray(band)[:, :, ::-1]
+    out.flush()
+    image.close()
+    del out
+
+    mapped = np.load(path, mmap_mode='r')
+    # Unlink now; the mapping keeps the data alive until it is released
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+    return mapped
+
+
+def compute_tile_grid(height, width, tile_size=640, overlap=64):
+    """
+    Compute tile windows covering the image
+
+    Args:
+        height, width: Image size in pixels
+        tile_size: Tile edge length in pixels
+        overlap: Overlap between neighbouring tiles in pixels
+
+    Returns:
+        list of dicts with row, col, x, y, w, h
+    """
+    if overlap >= tile_size:
+        raise ValueError("overlap harus lebih kecil dari tile_size")
+
+    stride = tile_size - overlap
+
+    def _starts(length):
+        if length <= tile_size:
+            return [0]
+        starts = list(range(0, length - tile_size + 1, stride))
+        # Last tile is aligned to the edge so nothing is dropped
+        if starts[-1] + tile_size < length:
+            starts.append(length - tile_size)
+        return starts
+
+    tiles = []
+    for row, y in enumerate(_starts(height)):
+        for col, x in enumerate(_starts(width)):
+            tiles.append({
+                'row': row,
+                'col': col,
+                'x': x,
+                'y': y,
+                'w': min(tile_size, width - x),
+                'h': min(tile_size, height - y)
+            })
+
+    return tiles
+
+
+def read_tile(image, tile):
+    """Read one tile window as a contiguous BGR array"""
+    window = image[tile['y']:tile['y'] + tile['h'], tile['x']:tile['x'] + tile['w']]
+    return np.ascontiguousarray(window)
+
+
+def create_preview(image, max_side=1024):
+    """
+    Downsample a (memmapped) field image for display
+
+    Reads strided rows/cols only, so the full image is never loaded.
+
+    Returns:
+        (preview BGR array, scale factor preview/original)
+    """
+    height, width = image.shape[:2]
+    step = max(1, int(np.ceil(max(height, width) / max_side)))
+    preview = np.ascontiguousarray(image[::step, ::step])
+
+    return preview, 1.0 / step
+
+
+def create_health_heatmap(preview, scale, tiles, tile_scores, alpha=0.45):
+    """
+    Overlay per-tile health scores on the preview image
+
+    Overlapping tiles are averaged per pixel.
+
+    Args:
+        preview: Downsampled BGR image
+        scale: Preview/original scale factor
+        tiles: Tile windows from compute_tile_grid
+        tile_scores: Health score (0-100) per tile, same order as tiles
+        alpha: Heatmap opacity
+
+    Returns:
+        heatmap overlay (RGB format)
+    """
+    ph, pw = preview.shape[:2]
+    score_sum = np.zeros((ph, pw), dtype=np.float32)
+    score_count = np.zeros((ph, pw), dtype=np.float32)
+
+    for tile, score in zip(tiles, tile_scores):
+        x0 = int(tile['x'] * scale)
+        y0 = int(tile['y'] * scale)
+        x1 = min(pw, int(np.ceil((tile['x'] + tile['w']) * scale)))
+        y1 = min(ph, int(np.ceil((tile['y'] + tile['h']) * scale)))
+        score_sum[y0:y1, x0:x1] += score
+        score_count[y0:y1, x0:x1] += 1
+
+    health = np.divide(score_sum, score_count, out=np.zeros_like(score_sum), where=score_count > 0)
+
+    # Map 0 (sakit) -> red, 100 (sehat) -> green via hue in HSV
+    hue = (np.clip(health, 0, 100) / 100 * 60).astype(np.uint8)
+    hsv = np.dstack([hue, np.full_like(hue, 255), np.full_like(hue, 255)])
+    colored = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+
+    overlay = cv2.addWeighted(preview, 1 - alpha, colored, alpha, 0)
+
+    return cv2.cvtColor(overlay, cv2.COLOR_BGR2RGB)
@@ -95,8 +95,12 @@ def detect_spots(image, min_area=50):
     """
     Detect dark spots (potential disease indicators)
     
+    Uses connected-component statistics so area, bounding box and centroid
+    of every spot come from a single labelling pass. Contours are not
+    stored; use get_spot_contours() when they are needed for drawing.
+    
     Returns:
-        dict with spot analysis
+        dict with spot analysis (compact arrays, no contour objects)
     """
     # Convert to grayscale
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
@@ -107,24 +111,42 @@ def detect_spots(image, min_area=50):
     # Threshold to find dark spots
     _, thresh = cv2.threshold(blurred, 100, 255, cv2.THRESH_BINARY_INV)
     
-    # Find contours
-    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    # Label connected components (label 0 is background)
+    n_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(thresh, connectivity=8)
+    
+    # Vectorized area filter
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    keep = areas > min_area
     
-    # Filter by area
-    spots = [cnt for cnt in contours if cv2.contourArea(cnt) > min_area]
+    # Mask with only the kept spots (lookup table over labels)
+    lut = np.zeros(n_labels, dtype=np.uint8)
+    lut[1:][keep] = 255
+    spot_mask = lut[labels]
     
     # Calculate spot density
-    total_spot_area = sum(cv2.contourArea(cnt) for cnt in spots)
+    spot_areas = areas[keep].astype(np.int32)
     total_image_area = image.shape[0] * image.shape[1]
-    spot_density = (total_spot_area / total_image_area) * 100
+    spot_density = (int(spot_areas.sum()) / total_image_area) * 100
     
     return {
-        'spot_count': len(spots),
+        'spot_count': int(keep.sum()),
         'spot_density_percentage': round(spot_density, 2),
-        'spots': spots,
-        'spot_mask': thresh
+        'areas': spot_areas,
+        'centroids': centroids[1:][keep].astype(np.float32),
+        'bboxes': stats[1:, :4][keep].astype(np.int32),
+        'spot_mask': spot_mask
     }
 
+def get_spot_contours(spot_analysis):
+    """
+    Extract spot contours for drawing only
+    
+    Returns:
+        list of contours of the detected spots
+    """
+    contours, _ = cv2.findContours(spot_analysis['spot_mask'], cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return contours
+
 def calculate_texture_score(image):
     """
     Calculate texture irregularity (simple variance-based)
@@ -144,34 +166,79 @@ def calculate_texture_score(image):
     
     return round(texture_score, 2)
 
-def create_visualization(image, color_analysis, spot_analysis):
+def create_visualization(image, color_analysis, spot_analysis, max_side=None):
     """
     Create visualization with overlays
     
+    Args:
+        image: BGR image
+        color_analysis: Result of analyze_leaf_color
+        spot_analysis: Result of detect_spots
+        max_side: Render at this longest side (display size); None = full size
+    
     Returns:
         annotated image (RGB format)
     """
+    green_mask = color_analysis['green_mask']
+    yellow_mask = color_analysis['yellow_mask']
+    spot_mask = spot_analysis['spot_mask']
+    
+    # Downscale inputs first so the blends run at display size
+    height, width = image.shape[:2]
+    if max_side and max(height, width) > max_side:
+        scale = max_side / max(height, width)
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        green_mask = cv2.resize(green_mask, size, interpolation=cv2.INTER_NEAREST)
+        yellow_mask = cv2.resize(yellow_mask, size, interpolation=cv2.INTER_NEAREST)
+        spot_mask = cv2.resize(spot_mask, size, interpolation=cv2.INTER_NEAREST)
+    
     # Create copy
     vis_image = image.copy()
     
     # Overlay green mask (semi-transparent)
     green_overlay = np.zeros_like(vis_image)
-    green_overlay[color_analysis['green_mask'] > 0] = [0, 255, 0]
+    green_overlay[green_mask > 0] = [0, 255, 0]
     vis_image = cv2.addWeighted(vis_image, 0.7, green_overlay, 0.3, 0)
     
     # Overlay yellow mask
     yellow_overlay = np.zeros_like(vis_image)
-    yellow_overlay[color_analysis['yellow_mask'] > 0] = [0, 255, 255]
+    yellow_overlay[yellow_mask > 0] = [0, 255, 255]
     vis_image = cv2.addWeighted(vis_image, 0.7, yellow_overlay, 0.3, 0)
     
     # Draw spot contours
-    cv2.drawContours(vis_image, spot_analysis['spots'], -1, (0, 0, 255), 2)
+    cv2.drawContours(vis_image, get_spot_contours({'spot_mask': spot_mask}), -1, (0, 0, 255), 2)
     
     # Convert BGR to RGB for display
     vis_image_rgb = cv2.cvtColor(vis_image, cv2.COLOR_BGR2RGB)
     
     return vis_image_rgb
 
+class VisualizationHandle:
+    """
+    Deferred create_visualization
+    
+    Nothing is allocated until render() is called; each display size is
+    rendered once and cached.
+    """
+    
+    def __init__(self, image, color_analysis, spot_analysis):
+        self._image = image
+        self._color_analysis = color_analysis
+        self._spot_analysis = spot_analysis
+        self._rendered = {}
+    
+    def render(self, max_side=None):
+        """Render (or reuse) the overlay at the given display size"""
+        if max_side not in self._rendered:
+            self._rendered[max_side] = create_visualization(
+                self._image,
+                self._color_analysis,
+                self._spot_analysis,
+                max_side=max_side
+            )
+        return self._rendered[max_side]
+
 def auto_score_leaf_color(green_pct, yellow_pct):
     """
     Auto-score leaf color (1-5) for health assessment
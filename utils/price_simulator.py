@@ -0,0 +1,110 @@
+"""
+Price Simulator
+Seeded daily chili price series per commodity and market (demo data source)
+"""
+
+import zlib
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SEED = 42
+
+# Series start; every day is generated from here so a date always gets
+# the same price regardless of the requested range
+EPOCH = date(2022, 1, 1)
+
+MIN_PRICE = 15000
+
+# Pola musiman bulanan (Jan-Des): harga tinggi di musim hujan
+SEASONAL_FACTOR = np.array([1.4, 1.5, 1.6, 1.2, 1.0, 0.8, 0.7, 0.75, 0.9, 1.1, 1.2, 1.3])
+
+# Kenaikan harga tahunan (inflasi pangan)
+ANNUAL_DRIFT = 0.03
+
+# Daily log-noise: AR(1) so shocks persist for a few weeks
+NOISE_PHI = 0.93
+NOISE_SIGMA = 0.035
+
+COMMODITIES = {
+    'cabai_merah_keriting': {'name': 'Cabai Merah Keriting', 'base_price': 35000},
+    'cabai_merah_besar': {'name': 'Cabai Merah Besar', 'base_price': 32000},
+    'cabai_rawit_merah': {'name': 'Cabai Rawit Merah', 'base_price': 42000}
+}
+
+MARKETS = {
+    'kramat_jati': {'name': 'Pasar Induk Kramat Jati (Jakarta)', 'price_factor': 1.05},
+    'caringin': {'name': 'Pasar Induk Caringin (Bandung)', 'price_factor': 0.97},
+    'keputran': {'name': 'Pasar Keputran (Surabaya)', 'price_factor': 0.95},
+    'beringharjo': {'name': 'Pasar Beringharjo (Yogyakarta)', 'price_factor': 1.0}
+}
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def _series_rng(commodity, market, seed):
+    """Independent stream per (seed, commodity, market)"""
+    return np.random.default_rng([seed, zlib.crc32(f"{commodity}|{market}".encode())])
+
+
+def seasonal_curve(days):
+    """
+    Smooth seasonal factor per date (monthly factors anchored mid-month)
+
+    Args:
+        days: DatetimeIndex
+    """
+    day_of_year = days.dayofyear.values
+    anchors = np.arange(12) * 365 / 12 + 15
+    # Periodic interpolation: wrap December/January around the year end
+    x = np.concatenate([[anchors[-1] - 365], anchors, [anchors[0] + 365]])
+    y = np.concatenate([[SEASONAL_FACTOR[-1]], SEASONAL_FACTOR, [SEASONAL_FACTOR[0]]])
+    return np.interp(day_of_year, x, y)
+
+
+def simulate_prices(commodity, market, start=None, end=None, seed=DEFAULT_SEED):
+    """
+    Daily price series for one commodity at one market
+
+    Args:
+        commodity: COMMODITIES key
+        market: MARKETS key
+        start, end: Date range (default: EPOCH .. yesterday)
+        seed: Simulation seed
+
+    Returns:
+        DataFrame with date and price (Rp/kg)
+    """
+    start = max(_as_date(start), EPOCH) if start else EPOCH
+    end = _as_date(end) if end else date.today() - timedelta(days=1)
+    if end < start:
+        return pd.DataFrame({'date': pd.to_datetime([]), 'price': []})
+
+    days = pd.date_range(EPOCH, end, freq='D')
+    rng = _series_rng(commodity, market, seed)
+    shocks = rng.normal(0, NOISE_SIGMA, len(days))
+
+    noise = np.empty(len(days))
+    level = 0.0
+    for i, shock in enumerate(shocks):
+        level = NOISE_PHI * level + shock
+        noise[i] = level
+
+    years = (days - pd.Timestamp(EPOCH)).days.values / 365.25
+    price = (
+        COMMODITIES[commodity]['base_price']
+        * MARKETS[market]['price_factor']
+        * seasonal_curve(days)
+        * (1 + ANNUAL_DRIFT) ** years
+        * np.exp(noise)
+    )
+
+    df = pd.DataFrame({'date': days, 'price': np.maximum(price, MIN_PRICE).round(-1)})
+    return df[df['date'] >= pd.Timestamp(start)].reset_index(drop=True)
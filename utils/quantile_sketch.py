@@ -0,0 +1,137 @@
+"""
+Quantile Sketch
+Mergeable streaming KLL sketch for approximate ranks and quantiles
+"""
+
+import random
+
+import numpy as np
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang & Liberty)
+
+    Items live in levels of compactors; an item on level h stands for
+    2**h inputs. When a level is full it is sorted and every other item
+    (random offset) moves up one level. Memory is O(k) and rank error
+    is about 1.7 / k of n with high probability. Two sketches merge by
+    concatenating their levels and compacting, so per-segment sketches
+    can be combined into any larger segment.
+    """
+
+    # Capacity decay for lower levels
+    C = 2 / 3
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [[]]
+        self._rng = random.Random(seed)
+        self._table = None
+
+    def __len__(self):
+        return self.n
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * self.C ** depth)), 2)
+
+    def _compress(self):
+        for level in range(len(self.levels)):
+            if len(self.levels[level]) < self._capacity(level):
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append([])
+            items = sorted(self.levels[level])
+            # Odd count: one item stays behind so weights stay exact
+            keep = [items.pop()] if len(items) % 2 else []
+            offset = self._rng.randint(0, 1)
+            self.levels[level + 1].extend(items[offset::2])
+            self.levels[level] = keep
+        self._table = None
+
+    def update(self, value):
+        """Add one value (NaN is ignored)"""
+        value = float(value)
+        if value != value:
+            return
+        self.levels[0].append(value)
+        self.n += 1
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+        self._table = None
+
+    def update_many(self, values):
+        """Add many values (NaN ignored): append to level 0, then compact"""
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.levels[0].extend(values.tolist())
+        self.n += len(values)
+        # A large batch may need several passes before every level fits
+        while any(len(items) >= self._capacity(level) for level, items in enumerate(self.levels)):
+            self._compress()
+        self._table = None
+
+    def merge(self, other):
+        """Merge another sketch into this one (in place)"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.n += other.n
+        self._compress()
+        return self
+
+    def copy(self):
+        clone = KLLSketch(self.k)
+        clone.n = self.n
+        clone.levels = [list(items) for items in self.levels]
+        clone._rng.setstate(self._rng.getstate())
+        return clone
+
+    def _cdf_table(self):
+        """Sorted retained values with cumulative weights (cached until the next update)"""
+        if self._table is None:
+            values = np.concatenate([np.asarray(items, dtype=float) for items in self.levels])
+            weights = np.concatenate([
+                np.full(len(items), 2 ** level, dtype=float) for level, items in enumerate(self.levels)
+            ])
+            order = np.argsort(values, kind='stable')
+            self._table = (values[order], np.cumsum(weights[order]))
+        return self._table
+
+    def rank(self, value, inclusive=True):
+        """Approximate number of inputs <= value (< value if not inclusive)"""
+        if self.n == 0:
+            return 0.0
+        values, cumulative = self._cdf_table()
+        idx = np.searchsorted(values, value, side='right' if inclusive else 'left')
+        return float(cumulative[idx - 1]) if idx else 0.0
+
+    def cdf(self, value):
+        """Fraction of inputs <= value"""
+        return self.rank(value) / self.n if self.n else float('nan')
+
+    def quantile(self, q):
+        """Approximate value at quantile q (0-1)"""
+        if self.n == 0:
+            return float('nan')
+        values, cumulative = self._cdf_table()
+        idx = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        return float(values[min(idx, len(values) - 1)])
+
+    def quantiles(self, qs):
+        return [self.quantile(q) for q in qs]
+
+    def to_dict(self):
+        return {'k': self.k, 'n': self.n, 'levels': self.levels}
+
+    @classmethod
+    def from_dict(cls, data, seed=None):
+        sketch = cls(data['k'], seed)
+        sketch.n = data['n']
+        sketch.levels = [list(items) for items in data['levels']]
+        return sketch
@@ -0,0 +1,156 @@
+"""
+Synthetic Leaf Images
+Deterministic leaf-like images with known colour fractions and spot counts,
+used for classifier bootstrapping and image-analysis benchmarks
+"""
+
+import cv2
+import numpy as np
+
+# HSV (OpenCV scale) colours well inside the ranges of analyze_leaf_color,
+# and bright enough to stay above the detect_spots darkness threshold
+PALETTE_HSV = {
+    'green': (60, 180, 180),
+    'yellow': (28, 200, 210),
+    'brown': (15, 200, 190),
+    'background': (0, 0, 210)
+}
+
+SPOT_BGR = (25, 25, 25)
+
+# Label ids in the ground-truth label map
+LABELS = {'background': 0, 'green': 1, 'yellow': 2, 'brown': 3, 'spot': 4}
+
+
+def _palette_bgr():
+    """Convert the HSV palette to BGR once"""
+    palette = {}
+    for name, hsv in PALETTE_HSV.items():
+        pixel = np.uint8([[hsv]])
+        palette[name] = cv2.cvtColor(pixel, cv2.COLOR_HSV2BGR)[0, 0]
+    return palette
+
+
+def generate_synthetic_leaf(size=(640, 640), green=0.7, yellow=0.1, brown=0.05,
+                            spot_count=5, spot_radius=None, noise=4, seed=0):
+    """
+    Generate one synthetic leaf image with exact ground truth
+
+    Colour classes are laid out as shuffled square cells, then dark
+    circular spots are drawn without overlap.
+
+    Args:
+        size: (width, height) in pixels
+        green, yellow, brown: Target area fractions (0-1), rest is background
+        spot_count: Number of dark spots
+        spot_radius: (min, max) spot radius in pixels (default scales with size)
+        noise: Uniform per-pixel noise amplitude
+        seed: RNG seed
+
+    Returns:
+        (BGR image, ground truth dict)
+    """
+    if green + yellow + brown > 1:
+        raise ValueError("Total fraksi warna tidak boleh lebih dari 1")
+
+    width, height = size
+    rng = np.random.default_rng(seed)
+    palette = _palette_bgr()
+
+    # Shuffled cell layout gives exact fractions at cell granularity
+    cell = max(4, min(width, height) // 40)
+    rows = int(np.ceil(height / cell))
+    cols = int(np.ceil(width / cell))
+    n_cells = rows * cols
+
+    counts = [int(round(frac * n_cells)) for frac in (green, yellow, brown)]
+    cell_labels = np.zeros(n_cells, dtype=np.uint8)
+    start = 0
+    for label, count in zip((1, 2, 3), counts):
+        cell_labels[start:start + count] = label
+        start += count
+    rng.shuffle(cell_labels)
+
+    label_map = np.kron(
+        cell_labels.reshape(rows, cols),
+        np.ones((cell, cell), dtype=np.uint8)
+    )[:height, :width]
+
+    # Non-overlapping dark spots
+    if spot_radius is None:
+        base = max(5, min(width, height) // 64)
+        spot_radius = (base, base * 2)
+
+    placed = []
+    attempts = 0
+    while len(placed) < spot_count and attempts < spot_count * 200:
+        attempts += 1
+        r = int(rng.integers(spot_radius[0], spot_radius[1] + 1))
+        cx = int(rng.integers(r + 2, width - r - 2))
+        cy = int(rng.integers(r + 2, height - r - 2))
+        # Keep a gap so blurred spots never merge into one contour
+        if all((cx - px) ** 2 + (cy - py) ** 2 > (r + pr + 6) ** 2 for px, py, pr in placed):
+            placed.append((cx, cy, r))
+            cv2.circle(label_map, (cx, cy), r, LABELS['spot'], -1)
+
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    for name, label in LABELS.items():
+        color = SPOT_BGR if name == 'spot' else palette[name]
+        image[label_map == label] = color
+
+    if noise:
+        jitter = rng.integers(-noise, noise + 1, size=image.shape, dtype=np.int16)
+        image = np.clip(image.astype(np.int16) + jitter, 0, 255).astype(np.uint8)
+
+    total = float(width * height)
+    truth = {
+        'green_percentage': round(np.count_nonzero(label_map == LABELS['green']) / total * 100, 2),
+        'yellow_percentage': round(np.count_nonzero(label_map == LABELS['yellow']) / total * 100, 2),
+        'brown_percentage': round(np.count_nonzero(label_map == LABELS['brown']) / total * 100, 2),
+        'spot_count': len(placed),
+        'spot_density_percentage': round(np.count_nonzero(label_map == LABELS['spot']) / total * 100, 2)
+    }
+
+    return image, truth
+
+
+def generate_corpus(n_images=50, sizes=((640, 640),), seed=42):
+    """
+    Generate a deterministic corpus of synthetic leaves
+
+    Fractions and spot counts are drawn from ranges that cover healthy,
+    deficient and diseased leaves.
+
+    Args:
+        n_images: Images per size
+        sizes: Iterable of (width, height)
+        seed: Master seed
+
+    Yields:
+        dict with image, truth, size and seed
+    """
+    rng = np.random.default_rng(seed)
+
+    for size in sizes:
+        for _ in range(n_images):
+            green = float(rng.uniform(0.1, 0.9))
+            yellow = float(rng.uniform(0, min(0.6, 1 - green)))
+            brown = float(rng.uniform(0, min(0.3, 1 - green - yellow)))
+            spot_count = int(rng.integers(0, 40))
+            image_seed = int(rng.integers(0, 2**31 - 1))
+
+            image, truth = generate_synthetic_leaf(
+                size=size,
+                green=green,
+                yellow=yellow,
+                brown=brown,
+                spot_count=spot_count,
+                seed=image_seed
+            )
+
+            yield {
+                'image': image,
+                'truth': truth,
+                'size': size,
+                'seed': image_seed
+            }
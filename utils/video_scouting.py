@@ -0,0 +1,120 @@
+"""
+Video Scouting Utilities
+Frame generators and adaptive sampling for row-walk videos
+"""
+
+import cv2
+import numpy as np
+
+# Histogram bins (hue, saturation) used for near-duplicate detection
+HIST_BINS = [30, 16]
+
+
+def iter_video_frames(source, check_fps=4.0):
+    """
+    Read frames from a video file or stream
+
+    Frames between checks are skipped with grab(), which advances the
+    stream without decoding to a BGR image.
+
+    Args:
+        source: Video path, URL or camera index
+        check_fps: How many frames per second to decode and consider
+
+    Yields:
+        (frame_index, timestamp_seconds, BGR frame)
+    """
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise ValueError(f"Video tidak dapat dibuka: {source}")
+
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    step = max(1, int(round(fps / check_fps)))
+
+    frame_index = 0
+    try:
+        while True:
+            if frame_index % step == 0:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                yield frame_index, frame_index / fps, frame
+            elif not capture.grab():
+                break
+            frame_index += 1
+    finally:
+        capture.release()
+
+
+def frame_histogram(frame, size=(160, 120)):
+    """Normalized hue/saturation histogram of a downscaled frame"""
+    small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+    hist = cv2.calcHist([hsv], [0, 1], None, HIST_BINS, [0, 180, 0, 256])
+    cv2.normalize(hist, hist, alpha=1.0, norm_type=cv2.NORM_L1)
+    return hist
+
+
+def sample_distinct_frames(frames, min_distance=0.15, max_gap_seconds=5.0):
+    """
+    Drop near-duplicate frames by histogram distance
+
+    A frame is kept when its Bhattacharyya distance to the last kept frame
+    exceeds min_distance, or when max_gap_seconds passed since the last kept
+    frame (so a slow walk past uniform rows is still sampled).
+
+    Args:
+        frames: Iterable of (frame_index, timestamp, frame)
+        min_distance: Bhattacharyya distance threshold (0-1)
+        max_gap_seconds: Force a sample after this many seconds
+
+    Yields:
+        (frame_index, timestamp, frame) for kept frames
+    """
+    last_hist = None
+    last_time = None
+
+    for frame_index, timestamp, frame in frames:
+        hist = frame_histogram(frame)
+
+        if last_hist is None:
+            keep = True
+        else:
+            distance = cv2.compareHist(last_hist, hist, cv2.HISTCMP_BHATTACHARYYA)
+            keep = distance > min_distance or (timestamp - last_time) >= max_gap_seconds
+
+        if keep:
+            last_hist = hist
+            last_time = timestamp
+            yield frame_index, timestamp, frame
+
+
+def resize_for_analysis(frame, max_side=640):
+    """Downscale a frame so its longest side is max_side"""
+    height, width = frame.shape[:2]
+    if max(height, width) <= max_side:
+        return frame
+    scale = max_side / max(height, width)
+    return cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+
+def summarize_segment(segment_index, segment_seconds, frame_results):
+    """
+    Aggregate per-frame results of one time segment
+
+    Returns:
+        dict with segment time range, mean/min health and colour averages
+    """
+    scores = np.array([r['health_score'] for r in frame_results], dtype=np.float64)
+
+    return {
+        'segment': segment_index,
+        'start_s': segment_index * segment_seconds,
+        'end_s': (segment_index + 1) * segment_seconds,
+        'frames_analyzed': len(frame_results),
+        'health_score': round(float(scores.mean()), 1),
+        'min_health_score': round(float(scores.min()), 1),
+        'green_percentage': round(float(np.mean([r['green_percentage'] for r in frame_results])), 2),
+        'yellow_percentage': round(float(np.mean([r['yellow_percentage'] for r in frame_results])), 2),
+        'spot_density_percentage': round(float(np.mean([r['spot_density_percentage'] for r in frame_results])), 2)
+    }
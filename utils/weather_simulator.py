@@ -0,0 +1,206 @@
+"""
+Seeded Weather Simulator
+Open-Meteo shaped responses from a monthly climatology of Java chili regions
+"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+# Monthly normals for lowland West/Central Java (Jan..Dec)
+MONTHLY_RAIN_MM = np.array([300, 280, 260, 200, 130, 80, 60, 50, 70, 140, 230, 290])
+MONTHLY_WET_DAY_PROB = np.array([0.70, 0.68, 0.65, 0.55, 0.40, 0.28, 0.20, 0.18, 0.25, 0.45, 0.60, 0.68])
+MONTHLY_TMAX_C = np.array([31.0, 31.0, 31.5, 32.0, 32.0, 31.5, 31.5, 32.0, 32.5, 33.0, 32.0, 31.3])
+MONTHLY_TMIN_C = np.array([23.5, 23.5, 23.5, 23.8, 23.5, 23.0, 22.5, 22.5, 23.0, 23.5, 23.7, 23.5])
+MONTHLY_WIND_KMH = np.array([10, 10, 9, 8, 9, 11, 12, 13, 12, 10, 9, 10])
+
+# Suhu turun ~0.6°C per 100 m (dataran tinggi: Garut, Bandung, Malang)
+LAPSE_RATE_C_PER_M = 0.006
+
+# East Java is drier than West Java during the same season
+RAIN_FACTOR_PER_DEG_LON = -0.04
+
+DEFAULT_SEED = 42
+
+
+def _day_rng(seed, lat, lon, day):
+    """Independent RNG per (seed, location, day): any window gives the same day"""
+    lat_key = int(round((lat + 90) * 100))
+    lon_key = int(round((lon + 180) * 100))
+    return np.random.default_rng([seed, lat_key, lon_key, day.toordinal()])
+
+
+def climatology(lat, lon, month, elevation=0):
+    """Monthly normals adjusted for elevation and longitude"""
+    m = month - 1
+    rain_factor = float(np.clip(1 + RAIN_FACTOR_PER_DEG_LON * (lon - 106.8), 0.6, 1.2))
+    cooling = LAPSE_RATE_C_PER_M * max(elevation, 0)
+    return {
+        'rain_mm': MONTHLY_RAIN_MM[m] * rain_factor,
+        'wet_prob': MONTHLY_WET_DAY_PROB[m],
+        'tmax': MONTHLY_TMAX_C[m] - cooling,
+        'tmin': MONTHLY_TMIN_C[m] - cooling,
+        'wind': MONTHLY_WIND_KMH[m]
+    }
+
+
+def simulate_day(lat, lon, day, seed=DEFAULT_SEED, elevation=0):
+    """
+    Simulate one day at one location
+
+    Returns:
+        dict with daily scalars and 24-value hourly arrays
+    """
+    rng = _day_rng(seed, lat, lon, day)
+    clim = climatology(lat, lon, day.month, elevation)
+
+    wet = rng.random() < clim['wet_prob']
+    mean_wet_day = clim['rain_mm'] / 30 / clim['wet_prob']
+    rain = float(rng.gamma(0.8, mean_wet_day / 0.8)) if wet else 0.0
+
+    tmax = clim['tmax'] - (1.5 if wet else 0) + rng.normal(0, 0.8)
+    tmin = clim['tmin'] + rng.normal(0, 0.5)
+    wind_max = clim['wind'] * rng.uniform(0.8, 1.5)
+    prob = float(np.clip(clim['wet_prob'] * 100 + (25 if wet else -15) + rng.normal(0, 10), 0, 100))
+
+    hours = np.arange(24)
+    # Minimum near 06:00, maximum near 14:00
+    diurnal = np.clip(np.sin((hours - 6) / 16 * np.pi), 0, None)
+    temperature = tmin + (tmax - tmin) * diurnal + rng.normal(0, 0.3, 24)
+    humidity = np.clip(95 - 30 * diurnal + (8 if wet else 0) + rng.normal(0, 2, 24), 35, 100)
+    wind = wind_max * (0.35 + 0.65 * np.clip(1 - np.abs(hours - 12) / 6, 0, None))
+
+    # Hujan terkonsentrasi sore hari (13:00-18:00)
+    rain_hourly = np.zeros(24)
+    if wet:
+        weights = rng.dirichlet(np.ones(6))
+        rain_hourly[13:19] = rain * weights
+    prob_hourly = np.where((hours >= 12) & (hours <= 19), prob, prob * 0.3)
+
+    dew_point = temperature - (100 - humidity) / 5
+
+    if rain > 20:
+        code = 63
+    elif rain > 2:
+        code = 61
+    else:
+        code = int(rng.choice([0, 1, 2, 3]))
+    code_hourly = np.where(rain_hourly > 2.5, 63, np.where(rain_hourly > 0.1, 61, min(code, 3)))
+
+    return {
+        'daily': {
+            'temperature_2m_max': round(float(tmax), 1),
+            'temperature_2m_min': round(float(tmin), 1),
+            'temperature_2m_mean': round(float(temperature.mean()), 1),
+            'precipitation_sum': round(rain, 1),
+            'precipitation_probability_max': int(round(prob)),
+            'relative_humidity_2m_mean': int(round(humidity.mean())),
+            'weather_code': code,
+            'wind_speed_10m_max': round(float(wind_max), 1)
+        },
+        'hourly': {
+            'temperature_2m': np.round(temperature, 1),
+            'apparent_temperature': np.round(temperature + (humidity - 60) / 15, 1),
+            'relative_humidity_2m': np.round(humidity).astype(int),
+            'dew_point_2m': np.round(dew_point, 1),
+            'precipitation': np.round(rain_hourly, 1),
+            'precipitation_probability': np.round(prob_hourly).astype(int),
+            'weather_code': code_hourly.astype(int),
+            'wind_speed_10m': np.round(wind, 1)
+        }
+    }
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [v for v in value.split(',') if v]
+    return list(value)
+
+
+def build_response(lat, lon, days, daily=(), hourly=(), current=(), now=None,
+                   seed=DEFAULT_SEED, elevation=0, timezone='Asia/Jakarta'):
+    """
+    Open-Meteo shaped response for a run of days
+
+    Args:
+        lat, lon: Coordinates
+        days: List of datetime.date
+        daily, hourly, current: Requested variable names
+        now: Datetime used for the "current" block
+        seed: Simulation seed
+        elevation: Meters above sea level
+
+    Returns:
+        dict shaped like an Open-Meteo forecast/archive response
+    """
+    simulated = [simulate_day(lat, lon, d, seed, elevation) for d in days]
+    response = {
+        'latitude': lat,
+        'longitude': lon,
+        'elevation': elevation,
+        'timezone': timezone
+    }
+
+    daily = _as_list(daily)
+    if daily:
+        response['daily'] = {'time': [d.isoformat() for d in days]}
+        for var in daily:
+            response['daily'][var] = [s['daily'].get(var) for s in simulated]
+
+    hourly = _as_list(hourly)
+    if hourly:
+        response['hourly'] = {'time': [
+            f"{d.isoformat()}T{h:02d}:00" for d in days for h in range(24)
+        ]}
+        for var in hourly:
+            if var in simulated[0]['hourly']:
+                values = np.concatenate([s['hourly'][var] for s in simulated])
+                response['hourly'][var] = values.tolist()
+
+    current = _as_list(current)
+    if current:
+        now = now or datetime.now()
+        today = simulate_day(lat, lon, now.date(), seed, elevation)
+        hour = now.hour
+        source = {
+            var: values[hour].item() for var, values in today['hourly'].items()
+        }
+        response['current'] = {'time': now.strftime('%Y-%m-%dT%H:00')}
+        for var in current:
+            response['current'][var] = source.get(var)
+
+    return response
+
+
+def build_forecast(lat, lon, params, now=None, seed=DEFAULT_SEED, elevation=0):
+    """Simulated response for forecast query params"""
+    now = now or datetime.now()
+    n_days = int(params.get('forecast_days', 7))
+    days = [now.date() + timedelta(days=i) for i in range(n_days)]
+    return build_response(
+        lat, lon, days,
+        daily=params.get('daily'),
+        hourly=params.get('hourly'),
+        current=params.get('current'),
+        now=now,
+        seed=seed,
+        elevation=elevation,
+        timezone=params.get('timezone', 'Asia/Jakarta')
+    )
+
+
+def build_archive(lat, lon, params, seed=DEFAULT_SEED, elevation=0):
+    """Simulated response for archive query params"""
+    start = date.fromisoformat(str(params['start_date']))
+    end = date.fromisoformat(str(params['end_date']))
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    return build_response(
+        lat, lon, days,
+        daily=params.get('daily'),
+        hourly=params.get('hourly'),
+        seed=seed,
+        elevation=elevation,
+        timezone=params.get('timezone', 'Asia/Jakarta')
+    )
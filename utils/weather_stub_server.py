@@ -0,0 +1,115 @@
+"""
+Local Open-Meteo Stub Server
+Serves seeded simulator responses (utils.weather_simulator) for development and load testing
+
+Usage:
+    python utils/weather_stub_server.py --port 8765
+    # then WeatherClient(base_url="http://127.0.0.1:8765/v1/forecast")
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.weather_simulator import build_archive, build_forecast
+
+
+def _query_params(query):
+    """Flatten parse_qs output into simulator params (variables may come repeated or comma-joined)"""
+    params = {key: values[0] for key, values in query.items()}
+    for key in ('daily', 'hourly', 'current'):
+        if key in query:
+            params[key] = ','.join(query[key])
+    return params
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        try:
+            lats = [float(v) for v in query['latitude'][0].split(',')]
+            lons = [float(v) for v in query['longitude'][0].split(',')]
+        except (KeyError, ValueError):
+            self.send_error(400, "latitude/longitude required")
+            return
+
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+        if server.delay_s:
+            time.sleep(server.delay_s)
+
+        params = _query_params(query)
+        elevations = [float(v) for v in params['elevation'].split(',')] if 'elevation' in params else [0.0] * len(lats)
+        build = build_archive if urlparse(self.path).path.endswith('/archive') else build_forecast
+        try:
+            responses = [
+                build(lat, lon, params, elevation=elevation)
+                for lat, lon, elevation in zip(lats, lons, elevations)
+            ]
+        except (KeyError, ValueError):
+            self.send_error(400, "start_date/end_date required (YYYY-MM-DD)")
+            return
+        # Open-Meteo returns a list for multi-coordinate requests
+        body = json.dumps(responses if len(responses) > 1 else responses[0]).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(port=0, delay_s=0.0):
+    """
+    Start the stub server in a background thread
+
+    Args:
+        port: TCP port (0 = pick a free port)
+        delay_s: Artificial latency per request
+
+    Returns:
+        (server, base_url); call server.shutdown() to stop
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), _StubHandler)
+    server.daemon_threads = True
+    server.request_count = 0
+    server.delay_s = delay_s
+    server.lock = threading.Lock()
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1/forecast"
+    return server, base_url
+
+
+def archive_url_for(base_url):
+    """Archive endpoint of a stub server given its forecast URL"""
+    return base_url.rsplit('/', 1)[0] + '/archive'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0.0, help="Artificial latency (s)")
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.port, args.delay)
+    print(f"Open-Meteo stub listening on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()